@@ -2,7 +2,8 @@ import os
 import io
 from datetime import timedelta
 
-from flask import Flask, redirect, url_for, send_file
+from flask import Flask, redirect, url_for, send_file, g
+from jinja2 import FileSystemBytecodeCache
 from flask_login import LoginManager, current_user
 from flask_cors import CORS
 from flask_migrate import Migrate
@@ -16,42 +17,44 @@ load_dotenv()
 # --------------------------------------------------
 # IMPORTACIONES LOCALES
 # --------------------------------------------------
+from config import Config, opciones_motor
 from database import db
 from models import Usuario, Mesa
 from utils.time_utils import obtener_hora_colombia
-
-# Barcode opcional
-try:
-    import barcode
-    from barcode.writer import ImageWriter
-except ImportError:
-    barcode = None
+from utils.usuarios_cache import cargar_usuario_sesion
+from utils.compresion import init_compresion
+from utils.rendimiento import init_rendimiento
+from utils.metricas import init_metricas, respuesta_metricas
+from utils.perfilador import init_perfilador
+from utils.comandos import init_comandos
 
 
 # --------------------------------------------------
 # CREATE APP
 # --------------------------------------------------
-def create_app():
+def create_app(config=None):
 
     app = Flask(__name__)
 
     # --------------------------------------------------
     # CONFIG BASE DE DATOS (Render Postgres / Local SQLite)
+    # Pool, pre-ping y PRAGMA de SQLite: ver config.py
     # --------------------------------------------------
-    database_url = os.getenv("DATABASE_URL")
+    app.config.from_object(Config)
+    app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(hours=8)
 
-    if database_url:
-        if database_url.startswith("postgres://"):
-            database_url = database_url.replace(
-                "postgres://", "postgresql://", 1
-            )
-        app.config["SQLALCHEMY_DATABASE_URI"] = database_url
-    else:
-        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///licorera.db"
+    # Overrides (benchmarks, scripts): si cambia la URI se recalculan las opciones del motor
+    if config:
+        app.config.update(config)
+        if "SQLALCHEMY_DATABASE_URI" in config and "SQLALCHEMY_ENGINE_OPTIONS" not in config:
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"] = opciones_motor(config["SQLALCHEMY_DATABASE_URI"])
 
-    app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "sanroque-secret")
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(hours=8)
+    os.makedirs(app.instance_path, exist_ok=True)
+
+    # Plantillas compiladas en disco: los workers nuevos no recompilan
+    carpeta_jinja = os.getenv("JINJA_CACHE_DIR", os.path.join(app.instance_path, "jinja_cache"))
+    os.makedirs(carpeta_jinja, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(carpeta_jinja)
 
     # --------------------------------------------------
     # EXTENSIONES
@@ -62,6 +65,22 @@ def create_app():
     # ✅ MIGRACIONES ACTIVAS
     Migrate(app, db)
 
+    # Compresión gzip/brotli y estáticos con huella (va primero: sus
+    # after_request corren al final)
+    init_compresion(app)
+
+    # Tiempos por petición, consultas SQL y log de lentitud
+    init_rendimiento(app)
+
+    # Métricas Prometheus (/metrics)
+    init_metricas(app)
+
+    # Perfilado bajo demanda (?_perfilar=1, solo administradores)
+    init_perfilador(app)
+
+    # Mantenimiento: flask sanroque optimizar|reindexar|verificar|...
+    init_comandos(app)
+
     # --------------------------------------------------
     # FILTRO JINJA (FIX ERROR format_number)
     # --------------------------------------------------
@@ -81,7 +100,7 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        return Usuario.query.get(int(user_id))
+        return cargar_usuario_sesion(user_id)
 
     # --------------------------------------------------
     # BLUEPRINTS (REGISTRAR TODOS)
@@ -94,6 +113,7 @@ def create_app():
     from routes.clientes import clientes_bp
     from routes.proveedores_gastos import proveedores_gastos_bp
     from routes.creditos import creditos_bp
+    from routes.trabajos import trabajos_bp
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(inventario_bp, url_prefix="/inventario")
@@ -103,6 +123,7 @@ def create_app():
     app.register_blueprint(clientes_bp, url_prefix="/clientes")
     app.register_blueprint(proveedores_gastos_bp, url_prefix="/proveedores")
     app.register_blueprint(creditos_bp, url_prefix="/creditos")
+    app.register_blueprint(trabajos_bp, url_prefix="/trabajos")
 
     # --------------------------------------------------
     # RUTA PRINCIPAL
@@ -111,13 +132,24 @@ def create_app():
     def index():
         return redirect(url_for("ventas.dashboard"))
 
+    # --------------------------------------------------
+    # MÉTRICAS PARA PROMETHEUS
+    # --------------------------------------------------
+    @app.route("/metrics")
+    def metricas():
+        return respuesta_metricas()
+
     # --------------------------------------------------
     # GENERAR CODIGO DE BARRAS
     # --------------------------------------------------
     @app.route("/generar_codigo/<codigo>")
     def generar_codigo(codigo):
 
-        if not barcode:
+        # Import diferido: python-barcode/Pillow solo se cargan aquí
+        try:
+            import barcode
+            from barcode.writer import ImageWriter
+        except ImportError:
             return "Barcode no instalado", 404
 
         CODE128 = barcode.get_barcode_class("code128")
@@ -135,18 +167,25 @@ def create_app():
     @app.context_processor
     def inject_utilities():
 
+        # Una sola vez por petición aunque se rendericen varias plantillas
+        utilidades = g.get("utilidades_plantilla")
+        if utilidades is not None:
+            return utilidades
+
         es_admin = False
         if current_user.is_authenticated:
             rol = getattr(current_user, "rol", "")
             if rol and rol.lower() == "administrador":
                 es_admin = True
 
-        return {
-            "ahora_col": obtener_hora_colombia(),
+        ahora = obtener_hora_colombia()
+        g.utilidades_plantilla = {
+            "ahora_col": ahora,
             "timedelta": timedelta,
-            "hoy": obtener_hora_colombia().strftime("%Y-%m-%d"),
+            "hoy": ahora.strftime("%Y-%m-%d"),
             "es_admin": es_admin
         }
+        return g.utilidades_plantilla
 
     return app
 
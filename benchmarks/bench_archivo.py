@@ -0,0 +1,140 @@
+"""
+Efecto del archivo de ventas sobre las tablas calientes.
+
+Siembra una base SQLite con un año de ventas (benchmarks/generar_datos.py),
+mide las consultas que la caja y los reportes hacen a diario, archiva
+con utils/archivo_ventas.py, compacta (VACUUM) y vuelve a medir. También
+verifica que la lectura unificada devuelva los mismos totales antes y
+después.
+
+Uso:
+    python benchmarks/bench_archivo.py --dias 365 --ventas-dia 150 --horizonte 90
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from generar_datos import generar  # noqa: E402
+
+REPETICIONES = 30
+
+
+def _mediana_ms(funcion, repeticiones=REPETICIONES):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tiempos), 2)
+
+
+def _medir(app, cliente):
+    from sqlalchemy import func, select, text
+    from sqlalchemy.exc import OperationalError
+    from database import db
+    from models import Venta, VentaDetalle
+    from utils.archivo_ventas import tabla_ventas
+
+    with app.app_context():
+        filas = {
+            "ventas": db.session.execute(select(func.count(Venta.id))).scalar(),
+            "venta_detalles": db.session.execute(select(func.count(VentaDetalle.id))).scalar(),
+        }
+        # Páginas de las tablas calientes y sus índices (dbstat; None si SQLite no lo trae)
+        try:
+            calientes = db.session.execute(text(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE tbl_name IN ('ventas', 'venta_detalles'))"
+            )).scalar()
+        except OperationalError:
+            db.session.rollback()
+            calientes = None
+
+        # Consultas que recorren la tabla caliente completa (sin índice por estado)
+        def abiertas():
+            db.session.execute(select(func.count(Venta.id)).where(Venta.estado == "abierta")).scalar()
+
+        def vendido_por_producto():
+            db.session.execute(
+                select(VentaDetalle.producto_id, func.sum(VentaDetalle.cantidad))
+                .group_by(VentaDetalle.producto_id)
+            ).all()
+
+        todas = tabla_ventas()
+        total_historico = db.session.execute(select(func.sum(todas.c.total), func.count())).one()
+
+        tiempos = {
+            "ventas_abiertas_ms": _mediana_ms(abiertas),
+            "vendido_por_producto_ms": _mediana_ms(vendido_por_producto, 10),
+        }
+        db.session.rollback()
+
+    tiempos["reportes_ms"] = _mediana_ms(lambda: cliente.get("/reportes/reportes"), 10)
+    return {
+        "filas": filas,
+        "calientes_mb": round(calientes / 1048576, 2) if calientes is not None else None,
+        "tiempos": tiempos,
+        "historico": {"total": round(total_historico[0] or 0, 2), "ventas": total_historico[1]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=3000)
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--ventas-dia", type=int, default=150)
+    parser.add_argument("--horizonte", type=int, default=90, help="Días que quedan en las tablas calientes")
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="sanroque_archivo_")
+    os.environ.setdefault("CACHE_SQLITE_RUTA", os.path.join(carpeta, "cache.sqlite3"))
+    uri = "sqlite:///" + os.path.join(carpeta, "archivo.db")
+
+    from app import create_app
+    from sqlalchemy import text
+    from database import db
+    from utils.archivo_ventas import archivar_ventas
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+    generar(app, productos=args.productos, clientes=args.clientes, dias=args.dias,
+            ventas_dia=args.ventas_dia, semilla=args.semilla)
+
+    cliente = app.test_client()
+    cliente.post("/auth/login", data={"username": "admin", "password": "admin"})
+    cliente.get("/ventas/dashboard")
+
+    antes = _medir(app, cliente)
+
+    with app.app_context():
+        inicio = time.perf_counter()
+        ventas, detalles = archivar_ventas(dias=args.horizonte)
+        archivado_s = time.perf_counter() - inicio
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+            conn.execute(text("VACUUM"))
+            conn.execute(text("ANALYZE"))
+
+    despues = _medir(app, cliente)
+
+    reporte = {
+        "parametros": vars(args),
+        "archivadas": {"ventas": ventas, "detalles": detalles, "segundos": round(archivado_s, 2)},
+        "antes": antes,
+        "despues": despues,
+        "historico_intacto": antes["historico"] == despues["historico"],
+    }
+    print(json.dumps(reporte, indent=2, ensure_ascii=False))
+    return 0 if reporte["historico_intacto"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Presupuesto de arranque en frío de la app.
+
+Importa `app` en procesos nuevos con `python -X importtime`, toma la
+mediana del tiempo acumulado y el RSS máximo, y revisa que las
+librerías pesadas (pandas, numpy, barcode, Pillow, openpyxl,
+xlsxwriter) no se carguen al importar: solo deben cargarse en los
+endpoints de exportación/importación/códigos de barras.
+
+Sale con código 1 si se excede el presupuesto, para usarlo en CI.
+
+Uso:
+    python benchmarks/bench_arranque.py --corridas 5 --max-ms 900 --max-rss-mb 100
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PESADOS = ("pandas", "numpy", "barcode", "PIL", "openpyxl", "xlsxwriter")
+
+SCRIPT = (
+    "import resource, sys, json\n"
+    "import app\n"
+    "print(json.dumps({\n"
+    "    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,\n"
+    f"    'pesados': [m for m in {PESADOS!r} if m in sys.modules],\n"
+    "}))\n"
+)
+
+LINEA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _corrida():
+    entorno = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, check=True
+    )
+
+    propios = []
+    total_us = None
+    for linea in proc.stderr.splitlines():
+        m = LINEA.match(linea)
+        if not m:
+            continue
+        propio, acumulado, sangria, modulo = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        propios.append((propio, modulo))
+        if modulo == "app" and len(sangria) == 1:
+            total_us = acumulado
+
+    datos = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {
+        "ms": round((total_us or 0) / 1000, 1),
+        "rss_mb": round(datos["rss_kb"] / 1024, 1),
+        "pesados": datos["pesados"],
+        "top": sorted(propios, reverse=True)[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corridas", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=float(os.getenv("ARRANQUE_MAX_MS", "900")))
+    parser.add_argument("--max-rss-mb", type=float, default=float(os.getenv("ARRANQUE_MAX_RSS_MB", "100")))
+    args = parser.parse_args()
+
+    corridas = [_corrida() for _ in range(args.corridas)]
+    mediana_ms = statistics.median(c["ms"] for c in corridas)
+    rss_mb = max(c["rss_mb"] for c in corridas)
+    pesados = sorted({m for c in corridas for m in c["pesados"]})
+
+    fallas = []
+    if mediana_ms > args.max_ms:
+        fallas.append(f"import app tardó {mediana_ms} ms (máximo {args.max_ms})")
+    if rss_mb > args.max_rss_mb:
+        fallas.append(f"RSS de {rss_mb} MB (máximo {args.max_rss_mb})")
+    if pesados:
+        fallas.append(f"módulos pesados cargados al importar: {', '.join(pesados)}")
+
+    print(json.dumps({
+        "corridas": args.corridas,
+        "import_ms_mediana": mediana_ms,
+        "import_ms": [c["ms"] for c in corridas],
+        "rss_mb_max": rss_mb,
+        "pesados_cargados": pesados,
+        "top_modulos_us": [{"modulo": m, "us": us} for us, m in corridas[-1]["top"]],
+        "presupuesto": {"max_ms": args.max_ms, "max_rss_mb": args.max_rss_mb},
+        "fallas": fallas,
+    }, indent=2, ensure_ascii=False))
+
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Latencia de los backends de utils/cache.py e invalidación entre procesos.
+
+Mide lecturas/escrituras por segundo de cada backend disponible y
+verifica que una invalidación hecha en otro proceso (otro worker de
+Gunicorn) se vea de inmediato, y que una venta (cambio de stock) no
+invalide el catálogo. Corre sin red: redis solo se prueba si
+CACHE_REDIS_URL responde.
+
+Sale con código 1 si alguna verificación falla.
+
+Uso:
+    python benchmarks/bench_cache.py --operaciones 20000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import cache  # noqa: E402
+
+VALOR = {"productos": [{"id": i, "nombre": f"PRODUCTO {i}", "precio": 1000.0 * i} for i in range(20)]}
+
+
+def _medir(backend, operaciones):
+    cache.configurar_cache(backend)
+    inicio = time.perf_counter()
+    for i in range(operaciones):
+        cache.cache_guardar(f"clave:{i % 500}", VALOR, 60, etiquetas=("catalogo",))
+    escritura = operaciones / (time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    aciertos = 0
+    for i in range(operaciones):
+        aciertos += cache.cache_obtener(f"clave:{i % 500}") is not None
+    lectura = operaciones / (time.perf_counter() - inicio)
+
+    return {
+        "escrituras_s": round(escritura),
+        "lecturas_s": round(lectura),
+        "aciertos": aciertos,
+    }
+
+
+def _invalidar_en_otro_proceso(ruta):
+    cache.configurar_cache(cache.CacheSQLite(ruta))
+    cache.invalidar_etiqueta("catalogo")
+
+
+def _invalidacion_entre_procesos(ruta):
+    cache.configurar_cache(cache.CacheSQLite(ruta))
+    cache.cache_guardar("compartida", VALOR, 60, etiquetas=("catalogo",))
+    antes = cache.cache_obtener("compartida") is not None
+
+    proceso = multiprocessing.get_context("fork").Process(target=_invalidar_en_otro_proceso, args=(ruta,))
+    proceso.start()
+    proceso.join()
+
+    despues = cache.cache_obtener("compartida") is not None
+    return {"visible_antes": antes, "visible_despues_de_invalidar": despues, "ok": antes and not despues}
+
+
+def _invalidacion_por_columnas(ruta):
+    """Mover stock solo cambia la etiqueta 'stock'; renombrar cambia 'catalogo'."""
+    from sqlalchemy import update
+    from app import create_app
+    from database import db
+    from models import Producto
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+    cache.configurar_cache(cache.CacheSQLite(ruta))
+
+    def versiones():
+        return cache.version_etiqueta("catalogo"), cache.version_etiqueta("stock")
+
+    with app.app_context():
+        db.create_all()
+        producto = Producto(codigo="00000001", nombre="PRODUCTO 1", valor_venta=1000, cantidad=10)
+        db.session.add(producto)
+        db.session.commit()
+
+        inicial = versiones()
+        producto.cantidad -= 1
+        db.session.commit()
+        tras_venta = versiones()
+
+        # Como el descuento condicional de las ventas: UPDATE masivo, sin flush
+        db.session.execute(
+            update(Producto)
+            .where(Producto.id == producto.id, Producto.cantidad >= 1)
+            .values(cantidad=Producto.cantidad - 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        tras_update = versiones()
+
+        producto.nombre = "PRODUCTO UNO"
+        db.session.commit()
+        tras_renombrar = versiones()
+
+    ok = (
+        tras_venta[0] == inicial[0] and tras_venta[1] != inicial[1]
+        and tras_update[0] == tras_venta[0] and tras_update[1] != tras_venta[1]
+        and tras_renombrar[0] != tras_update[0]
+    )
+    return {
+        "catalogo_igual_tras_venta": tras_venta[0] == inicial[0],
+        "stock_cambia_tras_venta": tras_venta[1] != inicial[1],
+        "catalogo_igual_tras_update": tras_update[0] == tras_venta[0],
+        "stock_cambia_tras_update": tras_update[1] != tras_venta[1],
+        "catalogo_cambia_tras_renombrar": tras_renombrar[0] != tras_update[0],
+        "ok": ok,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operaciones", type=int, default=20000)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="sanroque_cache_")
+    ruta = os.path.join(carpeta, "cache.sqlite3")
+
+    resultados = {
+        "memoria": _medir(cache.CacheMemoria(), args.operaciones),
+        "sqlite": _medir(cache.CacheSQLite(ruta), args.operaciones),
+    }
+
+    if cache.redis is not None:
+        try:
+            backend = cache.CacheRedis()
+            backend.cliente.ping()
+            resultados["redis"] = _medir(backend, args.operaciones)
+        except Exception as e:
+            resultados["redis"] = {"omitido": str(e)}
+
+    resultados["invalidacion_sqlite"] = _invalidacion_entre_procesos(ruta)
+    resultados["invalidacion_por_columnas"] = _invalidacion_por_columnas(ruta)
+
+    fallas = [
+        f"{nombre}: {datos['aciertos']} aciertos de {args.operaciones} lecturas"
+        for nombre, datos in resultados.items()
+        if "aciertos" in datos and datos["aciertos"] != args.operaciones
+    ]
+    if not resultados["invalidacion_sqlite"]["ok"]:
+        fallas.append("una invalidación en otro proceso no se vio")
+    if not resultados["invalidacion_por_columnas"]["ok"]:
+        fallas.append("las etiquetas 'catalogo'/'stock' no siguieron a las columnas modificadas")
+    resultados["fallas"] = fallas
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Prueba de carga comparando configuraciones de Gunicorn.
+
+Levanta Gunicorn con gunicorn.conf.py sobre una base SQLite temporal,
+variando workers / clase de worker / hilos, y dispara peticiones
+concurrentes a pantallas típicas del POS (dashboard, escaneo de
+producto y el reporte del turno, que recorre en Python miles de ventas
+y sigue siendo síncrono; la exportación Excel ya va a la cola de
+trabajos y no sirve como ruta lenta).
+
+Uso:
+    python benchmarks/bench_gunicorn.py --segundos 10 --clientes 16
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CONFIGURACIONES = [
+    {"nombre": "sync x1 (procfile anterior)", "WEB_CONCURRENCY": "1", "GUNICORN_WORKER_CLASS": "sync", "GUNICORN_THREADS": "1"},
+    {"nombre": "sync x4", "WEB_CONCURRENCY": "4", "GUNICORN_WORKER_CLASS": "sync", "GUNICORN_THREADS": "1"},
+    {"nombre": "gthread 2x4", "WEB_CONCURRENCY": "2", "GUNICORN_WORKER_CLASS": "gthread", "GUNICORN_THREADS": "4"},
+    {"nombre": "gthread 4x4", "WEB_CONCURRENCY": "4", "GUNICORN_WORKER_CLASS": "gthread", "GUNICORN_THREADS": "4"},
+]
+
+# (ruta, peso): el reporte es poco frecuente pero costoso
+RUTAS = [
+    ("/ventas/dashboard", 5),
+    ("/ventas/buscar_producto/00000001", 10),
+    ("/reportes/reportes", 1),
+]
+
+# Ventas cerradas del turno actual que debe recorrer el reporte
+VENTAS_TURNO = 20000
+
+SEMILLA = """
+import json
+import sys
+from datetime import timedelta
+sys.path.insert(0, {raiz!r})
+from app import create_app
+from database import db
+from models import Usuario, Mesa, Producto, Venta
+from utils.time_utils import obtener_rango_turno_colombia
+app = create_app({{"SQLALCHEMY_DATABASE_URI": {uri!r}}})
+with app.app_context():
+    db.create_all()
+    u = Usuario(username="bench", nombre="Bench", rol="Administrador")
+    u.set_password("bench")
+    db.session.add(u)
+    db.session.add_all([Mesa(estado="libre") for _ in range(12)])
+    db.session.add_all([
+        Producto(codigo=str(i).zfill(8), nombre=f"PRODUCTO {{i}}", valor_venta=1000 + i, cantidad=100)
+        for i in range(1, 2001)
+    ])
+    _, inicio, _ = obtener_rango_turno_colombia()
+    inicio = inicio.replace(tzinfo=None)
+    db.session.add_all([
+        Venta(
+            fecha=inicio + timedelta(seconds=i),
+            total=1000 * (i % 50 + 1),
+            estado="cerrada",
+            detalle_pago=json.dumps({{"Efectivo": 1000 * (i % 50 + 1)}}),
+        )
+        for i in range({ventas})
+    ])
+    db.session.commit()
+"""
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_puerto(puerto, limite=30):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def _cliente_autenticado(base):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    datos = urllib.parse.urlencode({"username": "bench", "password": "bench"}).encode()
+    opener.open(base + "/auth/login", datos, timeout=30).read()
+    return opener
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    k = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores))) - 1))
+    return valores[k]
+
+
+def medir(config, uri, segundos, clientes):
+    puerto = _puerto_libre()
+    env = dict(os.environ)
+    env.update({k: v for k, v in config.items() if k != "nombre"})
+    env.update({
+        "DATABASE_URL": uri,
+        "GUNICORN_BIND": f"127.0.0.1:{puerto}",
+        "GUNICORN_ACCESS_LOG": os.devnull,
+        "GUNICORN_LOG_LEVEL": "warning",
+    })
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=RAIZ, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not _esperar_puerto(puerto):
+            return {"configuracion": config["nombre"], "error": "gunicorn no arrancó"}
+
+        base = f"http://127.0.0.1:{puerto}"
+        plan = [ruta for ruta, peso in RUTAS for _ in range(peso)]
+        latencias = {ruta: [] for ruta, _ in RUTAS}
+        errores = [0]
+        lock = threading.Lock()
+        fin = time.monotonic() + segundos
+
+        def trabajar(indice):
+            opener = _cliente_autenticado(base)
+            i = indice
+            while time.monotonic() < fin:
+                ruta = plan[i % len(plan)]
+                i += 1
+                inicio = time.perf_counter()
+                try:
+                    opener.open(base + ruta, timeout=60).read()
+                    duracion = (time.perf_counter() - inicio) * 1000
+                    with lock:
+                        latencias[ruta].append(duracion)
+                except Exception:
+                    with lock:
+                        errores[0] += 1
+
+        hilos = [threading.Thread(target=trabajar, args=(n,)) for n in range(clientes)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        todas = [v for lista in latencias.values() for v in lista]
+        return {
+            "configuracion": config["nombre"],
+            "peticiones_por_segundo": round(len(todas) / segundos, 1),
+            "p50_ms": round(_percentil(todas, 50), 1),
+            "p95_ms": round(_percentil(todas, 95), 1),
+            "errores": errores[0],
+            "por_ruta": {
+                ruta: {
+                    "n": len(v),
+                    "p50_ms": round(statistics.median(v), 1) if v else 0,
+                    "p95_ms": round(_percentil(v, 95), 1),
+                }
+                for ruta, v in latencias.items()
+            },
+        }
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--clientes", type=int, default=16)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="bench_gunicorn_")
+    uri = "sqlite:///" + os.path.join(carpeta, "bench.db")
+    subprocess.run([sys.executable, "-c", SEMILLA.format(raiz=RAIZ, uri=uri, ventas=VENTAS_TURNO)], cwd=RAIZ, check=True,
+                   stdout=subprocess.DEVNULL)
+
+    resultados = [medir(c, uri, args.segundos, args.clientes) for c in CONFIGURACIONES]
+    print(json.dumps({"parametros": vars(args), "resultados": resultados}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Asignación de mesas bajo concurrencia.
+
+Crea MESAS mesas libres y lanza HILOS cajeros que piden pestaña al mismo
+tiempo con utils/mesas.py. Verifica que ninguna mesa quede asignada dos
+veces y que las sobrantes reciban "sin mesa". También compara el costo
+de una asignación contra la búsqueda anterior (cargar ventas abiertas y
+buscar con NOT IN) con muchas ventas abiertas.
+
+Uso:
+    python benchmarks/bench_mesas.py --mesas 40 --hilos 60
+    DATABASE_URL=postgresql://... python benchmarks/bench_mesas.py   # base de prueba: borra mesas y ventas
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _preparar(app, mesas):
+    from database import db
+    from models import Mesa, Venta, VentaDetalle
+
+    with app.app_context():
+        db.create_all()
+        VentaDetalle.query.delete()
+        Venta.query.delete()
+        Mesa.query.delete()
+        db.session.add_all(Mesa(id=i, estado="libre") for i in range(1, mesas + 1))
+        db.session.commit()
+        db.session.remove()
+
+
+def _carrera(app, hilos):
+    """Todos los hilos piden mesa a la vez; retorna las mesas obtenidas."""
+    from database import db
+    from utils.mesas import ocupar_mesa_libre
+
+    salida = threading.Barrier(hilos)
+    obtenidas, errores = [], []
+
+    def cajero():
+        with app.app_context():
+            salida.wait()
+            try:
+                obtenidas.append(ocupar_mesa_libre())
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                errores.append(str(e))
+            finally:
+                db.session.remove()
+
+    trabajadores = [threading.Thread(target=cajero) for _ in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    return obtenidas, errores
+
+
+def _costo(app, mesas):
+    """Mediana (ms) de la búsqueda anterior y de la asignación atómica con casi todo ocupado."""
+    from database import db
+    from models import Mesa, Venta
+    from utils.mesas import ocupar_mesa_libre, liberar_mesa
+
+    with app.app_context():
+        db.session.add_all(Venta(total=0, estado="abierta", mesa_id=i) for i in range(1, mesas))
+        db.session.commit()
+        Mesa.query.filter(Mesa.id < mesas).update({"estado": "ocupada"})
+        Mesa.query.filter(Mesa.id == mesas).update({"estado": "libre"})
+        db.session.commit()
+
+        def anterior():
+            ids_ocupados = [v.mesa_id for v in Venta.query.filter_by(estado="abierta").all()]
+            Mesa.query.filter(~Mesa.id.in_(ids_ocupados)).first()
+            db.session.rollback()
+
+        def atomica():
+            mesa_id = ocupar_mesa_libre()
+            liberar_mesa(mesa_id)
+            db.session.commit()
+
+        resultado = {}
+        for nombre, funcion in (("anterior_ms", anterior), ("atomica_ms", atomica)):
+            tiempos = []
+            for _ in range(50):
+                inicio = time.perf_counter()
+                funcion()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultado[nombre] = round(statistics.median(tiempos), 2)
+        db.session.remove()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mesas", type=int, default=40)
+    parser.add_argument("--hilos", type=int, default=60)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="sanroque_mesas_")
+    os.environ.setdefault("CACHE_SQLITE_RUTA", os.path.join(carpeta, "cache.sqlite3"))
+
+    from app import create_app
+
+    uri = os.getenv("DATABASE_URL") or "sqlite:///" + os.path.join(carpeta, "mesas.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+
+    _preparar(app, args.mesas)
+    obtenidas, errores = _carrera(app, args.hilos)
+    asignadas = [m for m in obtenidas if m is not None]
+
+    resultado = {
+        "parametros": vars(args),
+        "asignadas": len(asignadas),
+        "sin_mesa": obtenidas.count(None),
+        "errores": errores[:3],
+        "duplicadas": len(asignadas) - len(set(asignadas)),
+    }
+
+    muchas = max(args.mesas, 200)
+    _preparar(app, muchas)
+    resultado["costo"] = _costo(app, muchas)
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    correcto = resultado["duplicadas"] == 0 and len(asignadas) == min(args.mesas, args.hilos) and not errores
+    return 0 if correcto else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Benchmark de concurrencia lectura/escritura en SQLite.
+
+Compara el modo por defecto (rollback journal, sin PRAGMA) contra la
+configuración de config.Config.SQLITE_PRAGMAS (WAL, synchronous=NORMAL,
+busy_timeout, mmap, cache). Simula cajas escribiendo ventas mientras
+otras pantallas leen reportes.
+
+Uso:
+    python benchmarks/bench_motor_db.py --segundos 5 --lectores 4 --escritores 2
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import Config  # noqa: E402
+
+ESQUEMA = """
+CREATE TABLE ventas (
+    id INTEGER PRIMARY KEY,
+    fecha REAL,
+    total REAL,
+    estado VARCHAR(20)
+);
+CREATE INDEX ix_ventas_fecha ON ventas (fecha);
+"""
+
+
+def _conectar(ruta, pragmas):
+    conn = sqlite3.connect(ruta, timeout=5, check_same_thread=False)
+    for nombre, valor in pragmas.items():
+        conn.execute(f"PRAGMA {nombre}={valor}")
+    return conn
+
+
+def _preparar(ruta, filas):
+    conn = sqlite3.connect(ruta)
+    conn.executescript(ESQUEMA)
+    ahora = time.time()
+    conn.executemany(
+        "INSERT INTO ventas (fecha, total, estado) VALUES (?, ?, 'cerrada')",
+        [(ahora - random.random() * 86400 * 30, random.randint(5, 200) * 1000) for _ in range(filas)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def ejecutar(nombre, pragmas, segundos, lectores, escritores, filas):
+    carpeta = tempfile.mkdtemp(prefix="bench_db_")
+    ruta = os.path.join(carpeta, "bench.db")
+    _preparar(ruta, filas)
+
+    fin = time.monotonic() + segundos
+    conteo = {"lecturas": 0, "escrituras": 0, "errores": 0}
+    lock = threading.Lock()
+
+    def lector():
+        conn = _conectar(ruta, pragmas)
+        hechas = errores = 0
+        while time.monotonic() < fin:
+            try:
+                desde = time.time() - random.random() * 86400 * 30
+                conn.execute(
+                    "SELECT COUNT(*), SUM(total) FROM ventas WHERE fecha >= ? AND fecha < ?",
+                    (desde, desde + 86400)
+                ).fetchone()
+                hechas += 1
+            except sqlite3.OperationalError:
+                errores += 1
+        conn.close()
+        with lock:
+            conteo["lecturas"] += hechas
+            conteo["errores"] += errores
+
+    def escritor():
+        conn = _conectar(ruta, pragmas)
+        hechas = errores = 0
+        while time.monotonic() < fin:
+            try:
+                conn.execute(
+                    "INSERT INTO ventas (fecha, total, estado) VALUES (?, ?, 'cerrada')",
+                    (time.time(), random.randint(5, 200) * 1000)
+                )
+                conn.commit()
+                hechas += 1
+            except sqlite3.OperationalError:
+                conn.rollback()
+                errores += 1
+        conn.close()
+        with lock:
+            conteo["escrituras"] += hechas
+            conteo["errores"] += errores
+
+    hilos = [threading.Thread(target=lector) for _ in range(lectores)]
+    hilos += [threading.Thread(target=escritor) for _ in range(escritores)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    for archivo in os.listdir(carpeta):
+        os.remove(os.path.join(carpeta, archivo))
+    os.rmdir(carpeta)
+
+    return {
+        "configuracion": nombre,
+        "lecturas_por_segundo": round(conteo["lecturas"] / segundos, 1),
+        "escrituras_por_segundo": round(conteo["escrituras"] / segundos, 1),
+        "errores": conteo["errores"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--lectores", type=int, default=4)
+    parser.add_argument("--escritores", type=int, default=2)
+    parser.add_argument("--filas", type=int, default=50000)
+    args = parser.parse_args()
+
+    resultados = [
+        ejecutar("antes (rollback journal)", {}, args.segundos, args.lectores, args.escritores, args.filas),
+        ejecutar("despues (WAL + PRAGMA)", Config.SQLITE_PRAGMAS, args.segundos, args.lectores, args.escritores, args.filas),
+    ]
+    print(json.dumps({"parametros": vars(args), "resultados": resultados}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
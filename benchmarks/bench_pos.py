@@ -0,0 +1,257 @@
+"""
+Prueba de carga de punta a punta sobre los flujos del POS.
+
+Siembra una base SQLite temporal a la escala indicada (con
+benchmarks/generar_datos.py) y maneja la app Flask real (create_app +
+test_client) desde varias terminales concurrentes. Cada terminal repite una mezcla ponderada de flujos:
+
+    venta      abrir pestaña (ver_mesa) -> escanear (buscar_producto +
+               agregar_producto) N veces -> cerrar_venta
+    reporte    reportes.reportes
+    inventario búsqueda de productos (api_buscar_productos)
+    exportar   encola la exportación Excel del inventario (trabajo en segundo plano)
+
+Reporta en JSON el throughput y los percentiles p50/p95/p99 por paso,
+con el promedio de consultas SQL (leído del header Server-Timing), para
+comparar entre commits.
+
+Uso:
+    python benchmarks/bench_pos.py --productos 5000 --clientes 1000 --dias 90 \\
+        --terminales 8 --segundos 30 --salida resultado.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from generar_datos import generar, ean13  # noqa: E402
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Flujo -> peso relativo en la mezcla
+MEZCLA = {
+    "venta": 10,
+    "inventario": 4,
+    "reporte": 1,
+    "exportar": 0.2,
+}
+
+CONSULTAS_RE = re.compile(r'desc="(\d+) consultas"')
+
+# Pestañas abiertas de antemano (como en una noche de servicio)
+ABIERTAS = 6
+
+
+# --------------------------------------------------
+# SIEMBRA
+# --------------------------------------------------
+def sembrar(app, productos, clientes, dias, ventas_dia, terminales, semilla=7):
+    """
+    Datos sintéticos con benchmarks/generar_datos.py: las pestañas ya
+    abiertas ocupan las primeras mesas y cada terminal usa una mesa libre
+    propia. Retorna filas por tabla.
+    """
+    from sqlalchemy import update
+    from database import db
+    from models import Producto
+
+    conteos = generar(
+        app, productos=productos, clientes=clientes, dias=dias, ventas_dia=ventas_dia,
+        abiertas=ABIERTAS, creditos=min(300, clientes), mesas=ABIERTAS + terminales, semilla=semilla
+    )
+    # Stock de sobra: la prueba mide tiempos, no quiebres de inventario
+    with app.app_context():
+        db.session.execute(update(Producto).values(cantidad=1000000))
+        db.session.commit()
+    return conteos
+
+
+# --------------------------------------------------
+# TERMINALES
+# --------------------------------------------------
+class Terminal(threading.Thread):
+    """Un cliente HTTP (test_client con sesión propia) que repite la mezcla de flujos."""
+
+    def __init__(self, app, numero, mesa_id, productos, fin, resultados, lock, semilla):
+        super().__init__(daemon=True)
+        self.app = app
+        self.numero = numero
+        self.mesa_id = mesa_id
+        self.productos = productos
+        self.fin = fin
+        self.resultados = resultados
+        self.lock = lock
+        self.rnd = random.Random(semilla)
+        self.cliente = app.test_client()
+
+    def _medir(self, paso, metodo, url, **kwargs):
+        inicio = time.perf_counter()
+        response = getattr(self.cliente, metodo)(url, **kwargs)
+        ms = (time.perf_counter() - inicio) * 1000
+        m = CONSULTAS_RE.search(response.headers.get("Server-Timing", ""))
+        with self.lock:
+            datos = self.resultados[paso]
+            datos["ms"].append(ms)
+            datos["consultas"].append(int(m.group(1)) if m else 0)
+            if response.status_code >= 400:
+                datos["errores"] += 1
+        return response
+
+    def _venta(self):
+        r = self._medir("ver_mesa", "get", f"/ventas/mesa/{self.mesa_id}")
+        m = re.search(rb"let ventaIdActual = (\d+);", r.data)
+        if not m:
+            return
+        venta_id = int(m.group(1))
+
+        for _ in range(self.rnd.randint(1, 6)):
+            codigo = ean13(self.rnd.randint(1, self.productos))
+            r = self._medir("buscar_producto", "get", f"/ventas/buscar_producto/{codigo}")
+            datos = r.get_json(silent=True) or {}
+            if datos.get("success"):
+                self._medir("agregar_producto", "post", "/ventas/agregar_producto",
+                            json={"venta_id": venta_id, "producto_id": datos["producto_id"]})
+
+        self._medir("cerrar_venta", "post", "/ventas/cerrar_venta",
+                    json={"venta_id": venta_id, "metodo_pago": "EFECTIVO", "pago_efectivo": 0})
+
+    def _inventario(self):
+        termino = self.rnd.choice(["CORONA", "AGUILA", "RON", "SMIRNOFF", "770000001"])
+        self._medir("buscar_inventario", "get", "/inventario/api/productos/buscar", query_string={"q": termino})
+
+    def _reporte(self):
+        self._medir("reportes", "get", "/reportes/reportes")
+
+    def _exportar(self):
+        self._medir("exportar_inventario", "get", "/inventario/exportar")
+
+    def run(self):
+        r = self.cliente.post("/auth/login", data={"username": "admin", "password": "admin"})
+        if r.status_code != 302:
+            raise RuntimeError(f"Login falló en la terminal {self.numero}: {r.status_code}")
+        # Consume el flash de bienvenida
+        self.cliente.get("/ventas/dashboard")
+
+        flujos = list(MEZCLA)
+        pesos = [MEZCLA[f] for f in flujos]
+        while time.monotonic() < self.fin:
+            flujo = self.rnd.choices(flujos, weights=pesos)[0]
+            getattr(self, f"_{flujo}")()
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[k]
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=2000)
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=60)
+    parser.add_argument("--ventas-dia", type=int, default=100)
+    parser.add_argument("--terminales", type=int, default=6)
+    parser.add_argument("--segundos", type=float, default=20)
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--salida", help="Archivo JSON donde guardar el resultado")
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="sanroque_pos_")
+    uri = "sqlite:///" + os.path.join(carpeta, "pos.db")
+    # Cache compartido aislado para no mezclarse con la instancia local
+    os.environ.setdefault("CACHE_SQLITE_RUTA", os.path.join(carpeta, "cache.sqlite3"))
+    # Las consultas por paso se leen del header Server-Timing
+    os.environ.setdefault("RENDIMIENTO_SERVER_TIMING", "todos")
+
+    from app import create_app
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+    # Las peticiones lentas bajo carga no interesan aquí: ya salen en el JSON
+    logging.getLogger("sanroque.rendimiento").disabled = True
+
+    t0 = time.perf_counter()
+    conteos = sembrar(
+        app, args.productos, args.clientes, args.dias, args.ventas_dia,
+        args.terminales, semilla=args.semilla
+    )
+    siembra_s = time.perf_counter() - t0
+
+    resultados = defaultdict(lambda: {"ms": [], "consultas": [], "errores": 0})
+    lock = threading.Lock()
+    fin = time.monotonic() + args.segundos
+
+    terminales = [
+        Terminal(app, n, ABIERTAS + n + 1, args.productos, fin, resultados, lock, args.semilla + n)
+        for n in range(args.terminales)
+    ]
+    inicio = time.perf_counter()
+    for t in terminales:
+        t.start()
+    for t in terminales:
+        t.join()
+    duracion = time.perf_counter() - inicio
+
+    pasos = {}
+    total = 0
+    for paso, datos in sorted(resultados.items()):
+        n = len(datos["ms"])
+        total += n
+        pasos[paso] = {
+            "peticiones": n,
+            "errores": datos["errores"],
+            "req_s": round(n / duracion, 1),
+            "p50_ms": round(_percentil(datos["ms"], 50), 1),
+            "p95_ms": round(_percentil(datos["ms"], 95), 1),
+            "p99_ms": round(_percentil(datos["ms"], 99), 1),
+            "max_ms": round(max(datos["ms"]), 1) if n else 0.0,
+            "consultas_prom": round(statistics.mean(datos["consultas"]), 1) if n else 0.0,
+        }
+
+    reporte = {
+        "commit": _commit_actual(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "parametros": vars(args),
+        "filas": conteos,
+        "siembra_s": round(siembra_s, 1),
+        "duracion_s": round(duracion, 1),
+        "peticiones": total,
+        "req_s": round(total / duracion, 1),
+        "errores": sum(p["errores"] for p in pasos.values()),
+        "pasos": pasos,
+    }
+
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Tiempos de respaldo y restauración con un año de datos.
+
+Siembra una base (benchmarks/generar_datos.py) y mide:
+  - respaldo completo (API de backup y volcado JSONL), con una "caja"
+    escribiendo en paralelo para ver cuánto esperan sus escrituras;
+  - respaldo incremental tras un día más de ventas;
+  - un segundo incremental tras editar una venta vieja (debe detectarlo
+    y hacer un respaldo completo);
+  - restauración de cada cadena sobre una base vacía.
+Compara fila por fila la base restaurada con la original y termina con
+código 1 si alguna difiere.
+
+Uso:
+    python benchmarks/bench_respaldo.py --dias 365 --ventas-dia 150
+    python benchmarks/bench_respaldo.py --dias 30 \
+        --destino-url postgresql://localhost/sanroque_restaurada   # restaura en Postgres (la vacía)
+    python benchmarks/bench_respaldo.py --dias 30 \
+        --origen-url postgresql://localhost/sanroque_origen \
+        --destino-url postgresql://localhost/sanroque_restaurada   # todo en Postgres
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from generar_datos import generar  # noqa: E402
+
+
+def _normalizar(valor):
+    if isinstance(valor, float):
+        return round(valor, 4)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _firma(app):
+    """Filas y huella del contenido de cada tabla (ordenado por llave primaria)."""
+    from sqlalchemy import select
+    from database import db
+
+    with app.app_context():
+        firma = {}
+        for tabla in db.metadata.sorted_tables:
+            huella = hashlib.sha1()
+            filas = 0
+            consulta = select(tabla).order_by(*tabla.primary_key.columns)
+            for fila in db.session.execute(consulta):
+                huella.update(repr([_normalizar(v) for v in fila]).encode("utf-8"))
+                filas += 1
+            firma[tabla.name] = [filas, huella.hexdigest()]
+        db.session.remove()
+    return firma
+
+
+def _diferencias(obtenida, esperada):
+    return sorted(t for t in esperada if obtenida.get(t) != esperada[t])
+
+
+class Caja(threading.Thread):
+    """Inserta una venta cada 20 ms y registra cuánto tarda cada commit."""
+
+    def __init__(self, app):
+        super().__init__(daemon=True)
+        self.app = app
+        self.parar = threading.Event()
+        self.tiempos = []
+
+    def run(self):
+        from models import Venta
+        from database import db
+
+        with self.app.app_context():
+            while not self.parar.is_set():
+                inicio = time.perf_counter()
+                db.session.add(Venta(total=1000, estado="cerrada"))
+                db.session.commit()
+                self.tiempos.append((time.perf_counter() - inicio) * 1000)
+                time.sleep(0.02)
+            db.session.remove()
+
+
+def _respaldar_con_caja(app, **kwargs):
+    from utils.respaldos import respaldar
+
+    caja = Caja(app)
+    caja.start()
+    time.sleep(0.1)
+    with app.app_context():
+        manifiesto = respaldar(**kwargs)
+    caja.parar.set()
+    caja.join()
+    return manifiesto, {
+        "escrituras": len(caja.tiempos),
+        "max_escritura_ms": round(max(caja.tiempos), 1) if caja.tiempos else 0.0,
+    }
+
+
+def _restaurar(carpeta, ruta_respaldo, destino_url=None):
+    from app import create_app
+    from database import db
+    from utils.respaldos import restaurar
+
+    uri = destino_url or "sqlite:///" + os.path.join(carpeta, f"restaurada_{time.time_ns()}.db")
+    destino = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+    with destino.app_context():
+        if destino_url:
+            # Base de prueba reutilizada entre restauraciones
+            db.drop_all()
+        db.create_all()
+        inicio = time.perf_counter()
+        restaurar(ruta_respaldo)
+        segundos = time.perf_counter() - inicio
+        db.session.remove()
+    return destino, round(segundos, 2)
+
+
+def _un_dia_de_ventas(app, ventas_dia):
+    from database import db
+    from models import Venta, VentaDetalle
+
+    with app.app_context():
+        for _ in range(ventas_dia):
+            venta = Venta(total=5000, estado="cerrada")
+            db.session.add(venta)
+            db.session.flush()
+            db.session.add(VentaDetalle(venta_id=venta.id, producto_id=1, cantidad=1, precio_unitario=5000, subtotal=5000))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=5000)
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--ventas-dia", type=int, default=150)
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--origen-url", default=None, help="Base de prueba a sembrar (se borra). Por defecto SQLite temporal")
+    parser.add_argument("--destino-url", default=None, help="Base de prueba donde restaurar (se borra). Por defecto SQLite")
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="sanroque_respaldo_")
+    os.environ.setdefault("CACHE_SQLITE_RUTA", os.path.join(carpeta, "cache.sqlite3"))
+    respaldos = os.path.join(carpeta, "respaldos")
+
+    from app import create_app
+    from database import db
+    from models import Venta
+    from utils.respaldos import respaldar
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.origen_url or "sqlite:///" + os.path.join(carpeta, "origen.db")})
+    if args.origen_url:
+        with app.app_context():
+            db.drop_all()
+            db.session.remove()
+    filas = generar(app, productos=args.productos, clientes=args.clientes, dias=args.dias,
+                    ventas_dia=args.ventas_dia, semilla=args.semilla)
+    with app.app_context():
+        motor = db.engine.dialect.name
+
+    resultado = {
+        "parametros": {k: v for k, v in vars(args).items() if not k.endswith("_url")},
+        "origen": motor,
+        "destino": "postgresql" if args.destino_url else "sqlite",
+        "filas": sum(filas.values()),
+    }
+
+    # Completo: copia con la API de backup (solo SQLite) y volcado JSONL por tabla
+    cadenas = {"jsonl": {"jsonl": True}}
+    if motor == "sqlite":
+        cadenas = {"sqlite": {}, **cadenas}
+    for nombre, opciones in cadenas.items():
+        completo, caja = _respaldar_con_caja(app, directorio=os.path.join(respaldos, nombre), **opciones)
+        resultado[f"completo_{nombre}"] = {"segundos": completo["segundos"], **caja}
+
+    # Un día más de ventas y respaldo incremental sobre cada base
+    # (sin caja: todas las cadenas deben terminar en el mismo estado para compararlas)
+    _un_dia_de_ventas(app, args.ventas_dia)
+    with app.app_context():
+        incrementales = {n: respaldar(incremental=True, directorio=os.path.join(respaldos, n)) for n in cadenas}
+    esperadas = {"incremental": _firma(app)}
+    primero = next(iter(incrementales.values()))
+    resultado["incremental"] = {"tipo": primero["tipo"], "segundos": primero["segundos"], "ventas": primero["tablas"].get("ventas")}
+
+    # Corrección de una venta vieja: el incremental no la vería, debe pasar a completo
+    with app.app_context():
+        vieja = Venta.query.filter_by(estado="cerrada").order_by(Venta.id).first()
+        vieja.total = (vieja.total or 0) + 1234
+        db.session.commit()
+    _un_dia_de_ventas(app, 5)
+    with app.app_context():
+        finales = {n: respaldar(incremental=True, directorio=os.path.join(respaldos, n)) for n in cadenas}
+    resultado["tras_editar_venta_vieja"] = {n: m["tipo"] for n, m in finales.items()}
+
+    esperadas["final"] = _firma(app)
+    resultado["restaurar"] = {}
+    for nombre in cadenas:
+        directorio = os.path.join(respaldos, nombre)
+        # Cadena completo -> incremental, y la última (completa tras la edición)
+        for etapa, manifiesto in (("incremental", incrementales[nombre]), ("final", finales[nombre])):
+            destino, segundos = _restaurar(carpeta, os.path.join(directorio, manifiesto["nombre"]), args.destino_url)
+            diferentes = _diferencias(_firma(destino), esperadas[etapa])
+            resultado["restaurar"][f"{nombre}_{etapa}"] = {
+                "segundos": segundos, "identica": not diferentes, "diferentes": diferentes
+            }
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    correcto = (
+        all(r["identica"] for r in resultado["restaurar"].values())
+        and resultado["incremental"]["tipo"] == "incremental"
+        and all(t == "completo" for t in resultado["tras_editar_venta_vieja"].values())
+    )
+    return 0 if correcto else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
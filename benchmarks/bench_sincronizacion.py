@@ -0,0 +1,167 @@
+"""
+Sincronización de la cola offline de varias terminales a la vez.
+
+Siembra productos con pocas unidades y lanza N terminales (test_client
+con sesión propia) que sincronizan a la vez lotes de "agregar" sobre
+sus propias pestañas, como al volver la red en todas las cajas. Mide el
+tiempo por lote y verifica que:
+  - ningún producto quede con stock negativo;
+  - las operaciones aplicadas sean exactamente las unidades que había
+    (el resto debe volver como 'sin_stock');
+  - repetir los mismos lotes no aplique nada dos veces.
+Termina con código 1 si algo de esto falla.
+
+Uso:
+    python benchmarks/bench_sincronizacion.py --terminales 8 --productos 20 --stock 5
+    python benchmarks/bench_sincronizacion.py \
+        --url postgresql://localhost/sanroque_sync   # base vacía en Postgres
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _sembrar(app, terminales, productos, stock):
+    from database import db
+    from models import Usuario, Producto, Venta
+
+    with app.app_context():
+        db.create_all()
+        usuario = Usuario(username="bench", nombre="BENCH", rol="Administrador")
+        usuario.set_password("bench")
+        db.session.add(usuario)
+        filas = [
+            Producto(codigo=f"S{i:07d}", nombre=f"PRODUCTO {i}", valor_venta=1000, cantidad=stock)
+            for i in range(productos)
+        ]
+        ventas = [Venta(total=0, estado="abierta") for _ in range(terminales)]
+        db.session.add_all(filas + ventas)
+        db.session.commit()
+        return [p.id for p in filas], [v.id for v in ventas]
+
+
+def _lote(terminal, venta_id, productos, por_producto):
+    """Operaciones 'agregar' que la terminal acumuló sin red."""
+    return [
+        {
+            "id": f"t{terminal}-p{producto_id}-{n}",
+            "tipo": "agregar",
+            "venta_id": venta_id,
+            "producto_id": producto_id,
+            "ts": n,
+        }
+        for producto_id in productos
+        for n in range(por_producto)
+    ]
+
+
+def _sincronizar_todas(app, lotes):
+    """Envía cada lote desde su terminal a la vez. Retorna (resultados, ms por lote, estados != 200)."""
+    resultados = {}
+    tiempos = []
+    errores = []
+    lock = threading.Lock()
+    barrera = threading.Barrier(len(lotes))
+
+    def terminal(lote):
+        cliente = app.test_client()
+        cliente.post("/auth/login", data={"username": "bench", "password": "bench"}, follow_redirects=True)
+        barrera.wait()
+        inicio = time.perf_counter()
+        r = cliente.post("/ventas/sincronizar", json={"operaciones": lote})
+        ms = (time.perf_counter() - inicio) * 1000
+        with lock:
+            if r.status_code != 200:
+                errores.append(r.status_code)
+                return
+            resultados.update(r.get_json()["resultados"])
+            tiempos.append(ms)
+
+    hilos = [threading.Thread(target=terminal, args=(lote,)) for lote in lotes]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return resultados, tiempos, errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terminales", type=int, default=8)
+    parser.add_argument("--productos", type=int, default=20)
+    parser.add_argument("--stock", type=int, default=5, help="Unidades iniciales de cada producto")
+    parser.add_argument("--por-producto", type=int, default=2, help="Unidades que pide cada terminal por producto")
+    parser.add_argument("--url", help="Base vacía donde correr (por defecto SQLite temporal)")
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="sanroque_sync_")
+    os.environ.setdefault("CACHE_SQLITE_RUTA", os.path.join(carpeta, "cache.sqlite3"))
+    uri = args.url or "sqlite:///" + os.path.join(carpeta, "sync.db")
+
+    from app import create_app
+    from database import db
+    from models import Producto
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+    logging.getLogger("sanroque.rendimiento").disabled = True
+
+    productos, ventas = _sembrar(app, args.terminales, args.productos, args.stock)
+    lotes = [_lote(n, ventas[n], productos, args.por_producto) for n in range(args.terminales)]
+
+    resultados, tiempos, errores = _sincronizar_todas(app, lotes)
+    estados = Counter(r.get("motivo", r["estado"]) for r in resultados.values())
+
+    with app.app_context():
+        stock = dict(db.session.query(Producto.id, Producto.cantidad).filter(Producto.id.in_(productos)).all())
+        db.session.remove()
+
+    pedidas = args.por_producto * args.terminales
+    esperadas = args.productos * min(args.stock, pedidas)
+
+    # Mismos lotes otra vez (la terminal no recibió la respuesta): nada debe aplicarse de nuevo
+    repetidos, _, errores_repeticion = _sincronizar_todas(app, lotes)
+    with app.app_context():
+        stock_repetido = dict(
+            db.session.query(Producto.id, Producto.cantidad).filter(Producto.id.in_(productos)).all()
+        )
+        db.session.remove()
+
+    fallas = []
+    if errores or errores_repeticion:
+        fallas.append(f"respuestas no 200: {errores + errores_repeticion}")
+    negativos = sorted(pid for pid, cantidad in stock.items() if cantidad < 0)
+    if negativos:
+        fallas.append(f"stock negativo en {len(negativos)} productos")
+    if estados["aplicada"] != esperadas:
+        fallas.append(f"{estados['aplicada']} operaciones aplicadas, se esperaban {esperadas}")
+    if estados["aplicada"] + estados["sin_stock"] != len(resultados):
+        fallas.append(f"resultados inesperados: {dict(estados)}")
+    if stock_repetido != stock:
+        fallas.append("repetir los lotes volvió a mover el stock")
+    if any(r.get("estado") == "rechazada" and r.get("motivo") != "sin_stock" for r in repetidos.values()):
+        fallas.append("repetir los lotes dio rechazos distintos de 'sin_stock'")
+
+    print(json.dumps({
+        "parametros": vars(args),
+        "motor": uri.split(":", 1)[0],
+        "operaciones": sum(len(lote) for lote in lotes),
+        "resultados": dict(estados),
+        "lote_ms_p50": round(statistics.median(tiempos), 1) if tiempos else 0.0,
+        "lote_ms_max": round(max(tiempos), 1) if tiempos else 0.0,
+        "stock_final_total": sum(stock.values()),
+        "fallas": fallas,
+    }, indent=2, ensure_ascii=False))
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
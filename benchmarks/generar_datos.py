@@ -0,0 +1,466 @@
+"""
+Generador de datos sintéticos a escala a partir del catálogo real.
+
+Toma productos_backup.csv como semilla (nombres, presentaciones y
+precios reales) y construye un catálogo de miles de SKUs con códigos
+EAN-13 válidos, clientes, pestañas abiertas, años de ventas con picos
+de viernes/sábado y de la noche, movimientos de stock, créditos con
+abonos, facturas de proveedores con abonos, gastos y cierres de caja.
+
+Todo se inserta con Core en lotes, así que millones de filas cargan en
+minutos. Lo usan benchmarks/bench_pos.py y sirve para perfilar a mano:
+
+    python benchmarks/generar_datos.py --db /tmp/escala.db \\
+        --productos 20000 --clientes 5000 --dias 730 --ventas-dia 150
+
+Luego: DATABASE_URL=sqlite:////tmp/escala.db flask run
+(usuario admin / admin).
+"""
+import argparse
+import bisect
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CSV_SEMILLA = os.path.join(RAIZ, "productos_backup.csv")
+
+LOTE = 10000
+
+PRESENTACIONES = ["", "LATA", "BOT", "330", "275", "375", "750", "1000", "UND", "SIX PACK", "CAJA X24", "LATON", "MEDIA", "GARRAFA"]
+VARIANTES = ["ORIGINAL", "LIGHT", "ZERO", "LIMON", "MANGO", "APPLE", "FRESA", "RESERVA", "AÑEJO", "PREMIUM", "TRADICIONAL"]
+NOMBRES = ["JUAN", "CARLOS", "ANDRÉS", "LUIS", "JOSÉ", "MARÍA", "ANA", "LAURA", "DIANA", "SOFÍA", "CAMILO", "JULIÁN", "PAOLA", "NATALIA", "JORGE", "ÓSCAR"]
+APELLIDOS = ["GÓMEZ", "RODRÍGUEZ", "LÓPEZ", "MARTÍNEZ", "GARCÍA", "PÉREZ", "SÁNCHEZ", "RAMÍREZ", "TORRES", "DÍAZ", "MUÑOZ", "ROJAS", "CASTAÑO", "OSPINA", "VARGAS"]
+PROVEEDORES = ["BAVARIA", "DISTRIBUIDORA DEL EJE", "INDUSTRIA LICORERA DE CALDAS", "DIAGEO", "POSTOBÓN", "COCA-COLA FEMSA", "FRITO LAY", "PERNOD RICARD"]
+CATEGORIAS_GASTO = ["SERVICIOS", "ARRIENDO", "NÓMINA", "MANTENIMIENTO", "ASEO", "TRANSPORTE"]
+MEDIOS_PAGO = [("Efectivo", 60), ("Nequi", 20), ("Daviplata", 8), ("Tarjeta/Bold", 12)]
+
+# Volumen relativo por día de la semana (lunes=0) y por hora del día
+PESO_DIA = [0.6, 0.6, 0.7, 0.9, 1.6, 2.2, 1.2]
+PESO_HORA = [3, 2, 1, 0.3, 0.1, 0.1, 0.1, 0.1, 0.2, 0.3, 0.5, 0.7, 1, 1, 1, 1, 1.2, 1.5, 2, 3, 4, 5, 5.5, 4.5]
+
+
+def _leer_semilla():
+    productos = []
+    with open(CSV_SEMILLA, encoding="utf-8") as archivo:
+        for fila in csv.DictReader(archivo):
+            precio = float(fila["valor_venta"] or 0)
+            if precio <= 0:
+                continue
+            interno = float(fila["valor_interno"] or 0)
+            productos.append({
+                "nombre": (fila["nombre"] or "PRODUCTO").strip().upper(),
+                "marca": " ".join((fila["marca"] or "").split()).upper(),
+                "precio": precio,
+                # Margen real si existe; si no, uno típico de licorera
+                "margen": interno / precio if 0 < interno < precio else 0.72,
+            })
+    return productos
+
+
+def ean13(numero):
+    """Código EAN-13 con prefijo colombiano (770) y dígito de control."""
+    base = f"770{numero:09d}"
+    suma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(base))
+    return base + str((10 - suma % 10) % 10)
+
+
+def _redondear(valor, paso=100):
+    return float(max(paso, int(round(valor / paso)) * paso))
+
+
+def _acumulados(pesos):
+    return list(itertools.accumulate(pesos))
+
+
+def _elegir(rnd, acumulados):
+    return bisect.bisect_left(acumulados, rnd.random() * acumulados[-1])
+
+
+class Generador:
+    def __init__(self, conn, semilla=7):
+        self.conn = conn
+        self.rnd = random.Random(semilla)
+        self.conteos = {}
+
+    def _insertar(self, tabla, filas):
+        if filas:
+            self.conn.execute(tabla.insert(), filas)
+            self.conteos[tabla.name] = self.conteos.get(tabla.name, 0) + len(filas)
+
+    def _por_lotes(self, tabla, generador):
+        lote = []
+        for fila in generador:
+            lote.append(fila)
+            if len(lote) >= LOTE:
+                self._insertar(tabla, lote)
+                lote = []
+        self._insertar(tabla, lote)
+
+    # --------------------------------------------------
+    def usuarios_y_mesas(self, cajeros, mesas):
+        from werkzeug.security import generate_password_hash
+        from models import Usuario, Mesa
+
+        clave = generate_password_hash("admin")
+        filas = [{"id": 1, "username": "admin", "password": clave, "rol": "Administrador", "nombre": "ADMIN", "version_sesion": 1}]
+        filas += [
+            {"id": i + 2, "username": f"caja{i + 1}", "password": clave, "rol": "Vendedor", "nombre": f"CAJA {i + 1}", "version_sesion": 1}
+            for i in range(cajeros)
+        ]
+        self._insertar(Usuario.__table__, filas)
+        self._insertar(Mesa.__table__, [{"id": i + 1, "estado": "libre", "total_cuenta": 0.0} for i in range(mesas)])
+        self.usuarios = [f["id"] for f in filas]
+        self.mesas = mesas
+
+    def catalogo(self, total):
+        from models import Producto
+
+        semilla = _leer_semilla()
+        self.precios = []
+
+        def filas():
+            vistos = set()
+            for i in range(total):
+                base = semilla[i % len(semilla)] if i < len(semilla) else self.rnd.choice(semilla)
+                marca = base["marca"]
+                if i >= len(semilla):
+                    extra = " ".join(p for p in (self.rnd.choice(VARIANTES), self.rnd.choice(PRESENTACIONES)) if p)
+                    marca = f"{marca} {extra}".strip()
+                # Evita descripciones repetidas con un consecutivo
+                if (base["nombre"], marca) in vistos:
+                    marca = f"{marca} #{i}"
+                vistos.add((base["nombre"], marca))
+
+                # Precio log-normal alrededor del precio real del producto semilla
+                precio = _redondear(base["precio"] * math.exp(self.rnd.gauss(0, 0.35)))
+                self.precios.append(precio)
+                yield {
+                    "id": i + 1,
+                    "codigo": ean13(i + 1),
+                    "nombre": base["nombre"],
+                    "marca": marca,
+                    "valor_venta": precio,
+                    "valor_interno": _redondear(precio * base["margen"]),
+                    "cantidad": self.rnd.randint(0, 240),
+                    "categoria": base["nombre"],
+                }
+
+        self._por_lotes(Producto.__table__, filas())
+        self.productos = total
+        # Popularidad tipo Zipf: pocos productos concentran la mayoría de las ventas
+        orden = list(range(1, total + 1))
+        self.rnd.shuffle(orden)
+        self.orden_popularidad = orden
+        self.popularidad = _acumulados([1 / (r ** 1.1) for r in range(1, total + 1)])
+
+    def _producto_popular(self):
+        return self.orden_popularidad[_elegir(self.rnd, self.popularidad)]
+
+    def clientes(self, total):
+        from models import Cliente
+        from utils.texto_utils import normalizar_nombre
+
+        def filas():
+            for i in range(total):
+                nombre = f"{self.rnd.choice(NOMBRES)} {self.rnd.choice(APELLIDOS)} {self.rnd.choice(APELLIDOS)}"
+                if i >= len(NOMBRES) * len(APELLIDOS):
+                    nombre = f"{nombre} {i}"
+                yield {
+                    "id": i + 1,
+                    "nombre": nombre,
+                    "nombre_clave": normalizar_nombre(nombre),
+                    "tipo": "premium" if self.rnd.random() < 0.05 else "estandar",
+                    "telefono": f"3{self.rnd.randint(100000000, 199999999)}",
+                }
+
+        self._por_lotes(Cliente.__table__, filas())
+        self.total_clientes = total
+
+    def ventas(self, dias, ventas_dia, hasta):
+        """Histórico de ventas cerradas, detalles y movimientos de stock, más un cierre por día."""
+        from models import Venta, VentaDetalle, MovimientoStock, CierreCaja
+
+        medios = [m for m, _ in MEDIOS_PAGO]
+        peso_medios = _acumulados([p for _, p in MEDIOS_PAGO])
+        peso_horas = _acumulados(PESO_HORA)
+        promedio_dia = sum(PESO_DIA) / 7
+
+        inicio = datetime.combine(hasta.date() - timedelta(days=dias), datetime.min.time())
+        venta_id = 0
+        ventas, detalles, movimientos, cierres = [], [], [], []
+
+        for d in range(dias):
+            dia = inicio + timedelta(days=d)
+            factor = PESO_DIA[dia.weekday()] / promedio_dia
+            cantidad_dia = max(0, int(self.rnd.gauss(ventas_dia * factor, ventas_dia * factor * 0.15)))
+            efectivo_dia = otros_dia = 0.0
+
+            for _ in range(cantidad_dia):
+                venta_id += 1
+                fecha = dia + timedelta(hours=_elegir(self.rnd, peso_horas), seconds=self.rnd.randint(0, 3599))
+                total = 0.0
+                for _ in range(min(8, 1 + int(self.rnd.expovariate(0.7)))):
+                    producto_id = self._producto_popular()
+                    precio = self.precios[producto_id - 1]
+                    cantidad = 1 + int(self.rnd.expovariate(0.8))
+                    subtotal = precio * cantidad
+                    total += subtotal
+                    detalles.append({
+                        "venta_id": venta_id,
+                        "producto_id": producto_id,
+                        "cantidad": cantidad,
+                        "precio_unitario": precio,
+                        "subtotal": subtotal,
+                    })
+                    movimientos.append({
+                        "producto_id": producto_id,
+                        "usuario_id": None,
+                        "cantidad": -cantidad,
+                        "tipo": "VENTA",
+                        "fecha": fecha,
+                        "motivo": f"Venta #{venta_id}",
+                    })
+
+                medio = medios[_elegir(self.rnd, peso_medios)]
+                if medio == "Efectivo":
+                    efectivo_dia += total
+                else:
+                    otros_dia += total
+                ventas.append({
+                    "id": venta_id,
+                    "fecha": fecha,
+                    "total": total,
+                    "estado": "cerrada",
+                    "nombre_cliente": f"ORDEN {self.rnd.randint(1, self.mesas)}",
+                    "metodo_pago": medio.upper(),
+                    "detalle_pago": json.dumps({medio: total}),
+                    "usuario_id": self.rnd.choice(self.usuarios),
+                    "mesa_id": self.rnd.randint(1, self.mesas),
+                    "cliente_id": self.rnd.randint(1, self.total_clientes) if self.total_clientes and self.rnd.random() < 0.25 else None,
+                })
+
+            # Reposición semanal de los productos más vendidos
+            if dia.weekday() == 0:
+                for _ in range(min(50, self.productos)):
+                    movimientos.append({
+                        "producto_id": self._producto_popular(),
+                        "usuario_id": 1,
+                        "cantidad": self.rnd.choice([12, 24, 48]),
+                        "tipo": "AJUSTE",
+                        "fecha": dia + timedelta(hours=10),
+                        "motivo": "Reposición",
+                    })
+
+            cierres.append({
+                "fecha_apertura": dia + timedelta(hours=6),
+                "fecha_cierre": dia + timedelta(days=1, hours=5, minutes=59),
+                "monto_inicial": 200000.0,
+                "ingresos_efectivo": efectivo_dia,
+                "ingresos_otros": otros_dia,
+                "egresos": 0.0,
+                "saldo_final": 200000.0 + efectivo_dia,
+                "estado": "cerrado",
+                "usuario_id": 1,
+            })
+
+            if len(detalles) >= LOTE:
+                self._insertar(Venta.__table__, ventas)
+                self._insertar(VentaDetalle.__table__, detalles)
+                self._insertar(MovimientoStock.__table__, movimientos)
+                ventas, detalles, movimientos = [], [], []
+
+        self._insertar(Venta.__table__, ventas)
+        self._insertar(VentaDetalle.__table__, detalles)
+        self._insertar(MovimientoStock.__table__, movimientos)
+        self._insertar(CierreCaja.__table__, cierres)
+        self.ultima_venta = venta_id
+
+    def pestanas_abiertas(self, total, ahora):
+        """Ventas abiertas en mesas distintas, como un viernes en la noche."""
+        from sqlalchemy import update
+        from models import Venta, VentaDetalle, Mesa
+
+        total = min(total, self.mesas)
+        ventas, detalles = [], []
+        for n in range(total):
+            venta_id = self.ultima_venta + n + 1
+            lineas = []
+            for _ in range(self.rnd.randint(1, 4)):
+                producto_id = self._producto_popular()
+                precio = self.precios[producto_id - 1]
+                lineas.append({"venta_id": venta_id, "producto_id": producto_id, "cantidad": 1, "precio_unitario": precio, "subtotal": precio})
+            detalles.extend(lineas)
+            ventas.append({
+                "id": venta_id,
+                "fecha": ahora - timedelta(minutes=self.rnd.randint(5, 180)),
+                "total": sum(l["subtotal"] for l in lineas),
+                "estado": "abierta",
+                "nombre_cliente": f"ORDEN {n + 1}",
+                "usuario_id": self.rnd.choice(self.usuarios),
+                "mesa_id": n + 1,
+            })
+        self._insertar(Venta.__table__, ventas)
+        self._insertar(VentaDetalle.__table__, detalles)
+        if total:
+            self.conn.execute(update(Mesa.__table__).where(Mesa.__table__.c.id <= total).values(estado="ocupada"))
+
+    def creditos(self, total, ahora):
+        from models import Credito, CreditoItem, AbonoCredito
+
+        creditos, items, abonos = [], [], []
+        for credito_id in range(1, total + 1):
+            inicio = ahora - timedelta(days=self.rnd.randint(1, 365))
+            valor = 0.0
+            for _ in range(self.rnd.randint(1, 6)):
+                producto_id = self._producto_popular()
+                cantidad = self.rnd.randint(1, 12)
+                subtotal = self.precios[producto_id - 1] * cantidad
+                valor += subtotal
+                items.append({"credito_id": credito_id, "producto_id": producto_id, "cantidad": cantidad, "subtotal": subtotal})
+            abonado = 0.0
+            for _ in range(self.rnd.randint(0, 4)):
+                monto = _redondear(valor * self.rnd.uniform(0.1, 0.4), 1000)
+                if abonado + monto > valor:
+                    break
+                abonado += monto
+                abonos.append({
+                    "credito_id": credito_id,
+                    "monto": monto,
+                    "fecha": inicio + timedelta(days=self.rnd.randint(1, 60)),
+                    "medio_pago": self.rnd.choice(["EFECTIVO", "NEQUI"]),
+                })
+            creditos.append({
+                "id": credito_id,
+                "cliente_id": self.rnd.randint(1, self.total_clientes),
+                "fecha_inicio": inicio,
+                "fecha_vencimiento": inicio + timedelta(days=30),
+                "total": valor,
+                "estado": "pagado" if abonado >= valor else "pendiente",
+                "tipo": self.rnd.choice(["PERSONAL", "largo"]),
+            })
+        self._insertar(Credito.__table__, creditos)
+        self._insertar(CreditoItem.__table__, items)
+        self._insertar(AbonoCredito.__table__, abonos)
+
+    def proveedores_y_gastos(self, dias, facturas_mes, gastos_mes, hasta):
+        from models import Factura, Gasto, Abono
+
+        meses = max(1, dias // 30)
+        facturas, gastos, abonos = [], [], []
+        for n in range(meses * facturas_mes):
+            fecha = hasta - timedelta(days=self.rnd.randint(0, dias))
+            total = _redondear(self.rnd.lognormvariate(math.log(1500000), 0.6), 1000)
+            factura_id = n + 1
+            facturas.append({"id": factura_id, "numero": f"FV-{factura_id:06d}", "proveedor": self.rnd.choice(PROVEEDORES), "total": total, "fecha": fecha})
+            # Las facturas viejas casi siempre están pagadas; las recientes, a medias
+            pagado = total if (hasta - fecha).days > 45 and self.rnd.random() < 0.9 else total * self.rnd.choice([0, 0, 0.5])
+            if pagado:
+                abonos.append({
+                    "monto": pagado,
+                    "fecha": min(hasta, fecha + timedelta(days=self.rnd.randint(1, 40))),
+                    "medio_pago": "TRANSFERENCIA",
+                    "factura_id": factura_id,
+                    "gasto_id": None,
+                })
+        for n in range(meses * gastos_mes):
+            fecha = hasta - timedelta(days=self.rnd.randint(0, dias))
+            total = _redondear(self.rnd.lognormvariate(math.log(250000), 0.8), 1000)
+            gasto_id = n + 1
+            categoria = self.rnd.choice(CATEGORIAS_GASTO)
+            gastos.append({"id": gasto_id, "categoria": categoria, "concepto": f"{categoria} {fecha:%m/%Y}", "total": total, "fecha": fecha})
+            if self.rnd.random() < 0.85:
+                abonos.append({"monto": total, "fecha": fecha, "medio_pago": "EFECTIVO", "factura_id": None, "gasto_id": gasto_id})
+        self._insertar(Factura.__table__, facturas)
+        self._insertar(Gasto.__table__, gastos)
+        self._insertar(Abono.__table__, abonos)
+
+
+def generar(app, productos=10000, clientes=2000, dias=365, ventas_dia=150, abiertas=6,
+            creditos=300, facturas_mes=20, gastos_mes=15, mesas=20, cajeros=3, semilla=7):
+    """
+    Llena la base de `app` (vacía) con datos sintéticos. Retorna filas por tabla.
+    Los acumulados por cliente se reconstruyen al final.
+    """
+    from database import db
+    from utils.resumen_clientes import reconstruir_resumenes
+    from utils.respaldos import _ajustar_secuencias
+
+    ahora = datetime.now()
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            g = Generador(conn, semilla)
+            g.usuarios_y_mesas(cajeros, mesas)
+            g.catalogo(productos)
+            g.clientes(clientes)
+            g.ventas(dias, ventas_dia, ahora)
+            g.pestanas_abiertas(abiertas, ahora)
+            if clientes:
+                g.creditos(creditos, ahora)
+            g.proveedores_y_gastos(dias, facturas_mes, gastos_mes, ahora)
+            if conn.dialect.name == "postgresql":
+                # Los ids se insertaron explícitos: las secuencias siguen en 1
+                _ajustar_secuencias(conn)
+
+        reconstruir_resumenes()
+        db.session.commit()
+    return g.conteos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Ruta del archivo SQLite a crear")
+    parser.add_argument("--reemplazar", action="store_true", help="Borra el archivo si ya existe")
+    parser.add_argument("--productos", type=int, default=10000)
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--ventas-dia", type=int, default=150)
+    parser.add_argument("--abiertas", type=int, default=6)
+    parser.add_argument("--creditos", type=int, default=300)
+    parser.add_argument("--facturas-mes", type=int, default=20)
+    parser.add_argument("--gastos-mes", type=int, default=15)
+    parser.add_argument("--mesas", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    ruta = os.path.abspath(args.db)
+    if os.path.exists(ruta):
+        if not args.reemplazar:
+            parser.error(f"{ruta} ya existe (use --reemplazar)")
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+
+    from app import create_app
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + ruta})
+
+    inicio = time.perf_counter()
+    conteos = generar(
+        app, args.productos, args.clientes, args.dias, args.ventas_dia, args.abiertas,
+        args.creditos, args.facturas_mes, args.gastos_mes, args.mesas, semilla=args.semilla
+    )
+    segundos = time.perf_counter() - inicio
+
+    print(json.dumps({
+        "db": ruta,
+        "segundos": round(segundos, 1),
+        "filas": conteos,
+        "filas_totales": sum(conteos.values()),
+        "filas_s": round(sum(conteos.values()) / segundos),
+        "tamano_mb": round(os.path.getsize(ruta) / 1024 / 1024, 1),
+    }, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,27 +7,79 @@ load_dotenv()
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
-class Config:
+def _env_int(nombre, defecto):
+    try:
+        return int(os.environ.get(nombre, defecto))
+    except (TypeError, ValueError):
+        return defecto
 
-    # 🔐 Clave secreta Flask
-    SECRET_KEY = os.environ.get("SECRET_KEY", "licorera-pro-secret")
-
-    # --------------------------------------------------
-    # BASE DE DATOS
-    # - Producción (Render): PostgreSQL usando DATABASE_URL
-    # - Local (Tu PC): SQLite usando sanroque.db
-    # --------------------------------------------------
 
+def resolver_database_url():
+    """
+    - Producción (Render): PostgreSQL usando DATABASE_URL
+    - Local (Tu PC): SQLite en instance/licorera.db
+    """
     database_url = os.environ.get("DATABASE_URL")
 
     # Render a veces usa postgres:// pero SQLAlchemy necesita postgresql://
     if database_url and database_url.startswith("postgres://"):
         database_url = database_url.replace("postgres://", "postgresql://", 1)
 
-    # ✅ Si existe DATABASE_URL → estamos en Render
-    # ✅ Si NO existe → usamos SQLite local sanroque.db
-    SQLALCHEMY_DATABASE_URI = database_url or (
-        "sqlite:///" + os.path.join(basedir, "sanroque.db")
+    return database_url or (
+        "sqlite:///" + os.path.join(basedir, "instance", "licorera.db")
     )
 
+
+def opciones_motor(database_url):
+    """
+    Opciones del engine de SQLAlchemy según el motor.
+    Los PRAGMA de SQLite se aplican al conectar (ver database.py).
+    """
+    if database_url.startswith("sqlite"):
+        return {
+            # Espera (segundos) por el bloqueo de escritura antes de fallar
+            "connect_args": {
+                "timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000,
+                "check_same_thread": False,
+            },
+        }
+
+    # PostgreSQL: pool acotado por worker y verificación de conexiones
+    # viejas (Render cierra conexiones inactivas). Un worker no usa más
+    # conexiones a la vez que sus hilos de petición (GUNICORN_THREADS) más
+    # los de trabajos en segundo plano (TRABAJOS_HILOS); el total es
+    # WEB_CONCURRENCY x (pool_size + max_overflow) y debe caber en el
+    # límite de conexiones del plan de Postgres.
+    hilos = _env_int("GUNICORN_THREADS", 4) + _env_int("TRABAJOS_HILOS", 2)
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", hilos),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 2),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,
+    }
+
+
+class Config:
+
+    # 🔐 Clave secreta Flask
+    SECRET_KEY = os.environ.get("SECRET_KEY", "sanroque-secret")
+
+    # --------------------------------------------------
+    # BASE DE DATOS
+    # --------------------------------------------------
+    SQLALCHEMY_DATABASE_URI = resolver_database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = opciones_motor(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # PRAGMA aplicados a cada conexión SQLite
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        "mmap_size": _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        # Negativo = KiB (64 MB de cache de páginas)
+        "cache_size": _env_int("SQLITE_CACHE_SIZE", -64000),
+        "temp_store": "MEMORY",
+    }
@@ -1,5 +1,25 @@
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 # Creamos el objeto db sin pasarle la aplicación (Flask) todavía.
 # Esto nos permite importar 'db' en models.py y en las rutas sin problemas.
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+
+# --------------------------------------------------
+# PRAGMA DE SQLITE AL CONECTAR
+# --------------------------------------------------
+@event.listens_for(Engine, "connect")
+def _configurar_sqlite(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    from config import Config
+
+    cursor = dbapi_connection.cursor()
+    for nombre, valor in Config.SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {nombre}={valor}")
+    cursor.close()
@@ -0,0 +1,111 @@
+"""
+Configuración de Gunicorn para el POS (Render / local).
+
+Todo se puede ajustar con variables de entorno:
+    WEB_CONCURRENCY      número de workers (por defecto 2 x núcleos + 1, máx. 8)
+    GUNICORN_THREADS     hilos por worker (gthread)
+    GUNICORN_TIMEOUT     segundos antes de reiniciar un worker colgado
+    GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER
+    PORT                 puerto (Render lo define)
+
+Conexiones a Postgres: cada worker abre hasta GUNICORN_THREADS +
+TRABAJOS_HILOS + 2 (ver opciones_motor en config.py). Con los valores por
+defecto y 8 workers son 64; en planes con menos conexiones bajar
+WEB_CONCURRENCY o DB_POOL_SIZE.
+
+Eventos en vivo (/ventas/eventos, utils/eventos.py): cada flujo SSE abierto
+retiene un hilo hasta SSE_MAX_SEGUNDOS. SSE_MAX_FLUJOS vale por defecto
+GUNICORN_THREADS - 2 (mínimo 1): con 4 hilos, dos pantallas en vivo por
+worker y dos hilos siempre libres para las peticiones del POS. Para más
+pantallas subir GUNICORN_THREADS; subir solo SSE_MAX_FLUJOS le quita hilos
+a las cajas.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+
+def _env_int(nombre, defecto):
+    try:
+        return int(os.environ.get(nombre, defecto))
+    except (TypeError, ValueError):
+        return defecto
+
+
+# --------------------------------------------------
+# SOCKET
+# --------------------------------------------------
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+backlog = _env_int("GUNICORN_BACKLOG", 2048)
+
+# --------------------------------------------------
+# WORKERS
+# El POS es I/O (base de datos, SMTP): hilos por worker para que un
+# reporte lento o un correo no bloquee las demás terminales.
+# --------------------------------------------------
+workers = _env_int("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = _env_int("GUNICORN_THREADS", 4)
+
+# Carga la app una sola vez en el master: arranque más rápido y memoria
+# compartida entre workers (copy-on-write)
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+# --------------------------------------------------
+# TIEMPOS
+# --------------------------------------------------
+timeout = _env_int("GUNICORN_TIMEOUT", 60)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+# Reciclar workers para contener fugas de memoria; el jitter evita
+# que todos se reinicien a la vez
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+
+# --------------------------------------------------
+# LOGS (con duración de cada petición en microsegundos: %(D)s)
+# --------------------------------------------------
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = os.environ.get("GUNICORN_ERROR_LOG", "-")
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+access_log_format = '%(h)s "%(r)s" %(s)s %(b)s %(D)sus "%(a)s"'
+
+
+# --------------------------------------------------
+# MÉTRICAS MULTIPROCESO (prometheus_client)
+# Debe definirse antes de que la app importe prometheus_client
+# --------------------------------------------------
+# (con preload_app la app se importa antes de cualquier hook, por eso
+# la carpeta se limpia aquí al leer la configuración)
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "sanroque_metricas")
+)
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+# --------------------------------------------------
+# HOOKS
+# --------------------------------------------------
+def child_exit(server, worker):
+    """Descarta los gauges 'live' del worker que terminó."""
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
+
+
+def post_fork(server, worker):
+    """Con preload_app el engine nace en el master: cada worker abre sus propias conexiones."""
+    try:
+        from app import app
+        from database import db
+
+        with app.app_context():
+            db.engine.dispose(close=False)
+    except Exception as e:
+        server.log.warning(f"No se pudo reiniciar el pool de conexiones: {e}")
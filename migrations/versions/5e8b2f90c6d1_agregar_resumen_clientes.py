@@ -0,0 +1,50 @@
+"""Agregar acumulados de compra por cliente
+
+Revision ID: 5e8b2f90c6d1
+Revises: a3d9c1e47b20
+Create Date: 2026-10-19 10:03:27.551940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b2f90c6d1'
+down_revision = 'a3d9c1e47b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'clientes_resumen',
+        sa.Column('cliente_id', sa.Integer(), nullable=False),
+        sa.Column('total_gastado', sa.Float(), nullable=True),
+        sa.Column('visitas', sa.Integer(), nullable=True),
+        sa.Column('primera_visita', sa.DateTime(), nullable=True),
+        sa.Column('ultima_visita', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['cliente_id'], ['clientes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('cliente_id')
+    )
+    op.create_table(
+        'clientes_productos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cliente_id', sa.Integer(), nullable=False),
+        sa.Column('producto_id', sa.Integer(), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=True),
+        sa.Column('total', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['cliente_id'], ['clientes.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['producto_id'], ['productos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cliente_id', 'producto_id', name='uq_cliente_producto')
+    )
+    with op.batch_alter_table('clientes_productos', schema=None) as batch_op:
+        batch_op.create_index('ix_clientes_productos_cliente_id', ['cliente_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('clientes_productos', schema=None) as batch_op:
+        batch_op.drop_index('ix_clientes_productos_cliente_id')
+    op.drop_table('clientes_productos')
+    op.drop_table('clientes_resumen')
@@ -0,0 +1,26 @@
+"""Agregar version_sesion a usuario
+
+Revision ID: 8c41d7a2e5f3
+Revises: 5e8b2f90c6d1
+Create Date: 2026-10-19 11:20:05.104872
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41d7a2e5f3'
+down_revision = '5e8b2f90c6d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version_sesion', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.drop_column('version_sesion')
@@ -0,0 +1,33 @@
+"""Índice text_pattern_ops para buscar clientes por prefijo en PostgreSQL
+
+Revision ID: a1c7e3f9d2b5
+Revises: f8c2a4d6b193
+Create Date: 2026-10-19 22:14:05.318442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c7e3f9d2b5'
+down_revision = 'f8c2a4d6b193'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Con una collation distinta de "C" el índice normal no sirve para LIKE 'x%'.
+    # SQLite sigue buscando por rango con el índice que ya tiene.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index(
+        'ix_clientes_nombre_clave_patron', 'clientes', ['nombre_clave'],
+        unique=False, postgresql_ops={'nombre_clave': 'text_pattern_ops'}
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_clientes_nombre_clave_patron', table_name='clientes')
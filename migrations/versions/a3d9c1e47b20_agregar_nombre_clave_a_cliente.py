@@ -0,0 +1,41 @@
+"""Agregar nombre_clave indexado a cliente
+
+Revision ID: a3d9c1e47b20
+Revises: 03c65de77c74
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.texto_utils import normalizar_nombre
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d9c1e47b20'
+down_revision = '03c65de77c74'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('clientes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('nombre_clave', sa.String(length=100), nullable=True))
+        batch_op.create_index('ix_clientes_nombre_clave', ['nombre_clave'], unique=False)
+
+    # Rellenar la clave de los clientes existentes
+    conn = op.get_bind()
+    clientes = sa.table('clientes', sa.column('id'), sa.column('nombre'), sa.column('nombre_clave'))
+    filas = conn.execute(sa.select(clientes.c.id, clientes.c.nombre)).all()
+    for id_, nombre in filas:
+        conn.execute(
+            clientes.update()
+            .where(clientes.c.id == id_)
+            .values(nombre_clave=normalizar_nombre(nombre))
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('clientes', schema=None) as batch_op:
+        batch_op.drop_index('ix_clientes_nombre_clave')
+        batch_op.drop_column('nombre_clave')
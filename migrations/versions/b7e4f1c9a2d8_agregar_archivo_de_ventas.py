@@ -0,0 +1,77 @@
+"""Agregar tablas de archivo de ventas e índices por fecha
+
+Revision ID: b7e4f1c9a2d8
+Revises: 8c41d7a2e5f3
+Create Date: 2026-10-19 16:42:08.311274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4f1c9a2d8'
+down_revision = '8c41d7a2e5f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ventas_archivo',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('fecha', sa.DateTime(), nullable=True),
+        sa.Column('total', sa.Float(), nullable=True),
+        sa.Column('estado', sa.String(length=20), nullable=True),
+        sa.Column('nombre_cliente', sa.String(length=100), nullable=True),
+        sa.Column('metodo_pago', sa.String(length=50), nullable=True),
+        sa.Column('pago_efectivo', sa.Float(), nullable=True),
+        sa.Column('cambio', sa.Float(), nullable=True),
+        sa.Column('detalle_pago', sa.String(length=255), nullable=True),
+        sa.Column('mesa_id', sa.Integer(), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=True),
+        sa.Column('cliente_id', sa.Integer(), nullable=True),
+        sa.Column('archivada_en', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ventas_archivo', schema=None) as batch_op:
+        batch_op.create_index('ix_ventas_archivo_fecha', ['fecha'], unique=False)
+        batch_op.create_index('ix_ventas_archivo_cliente_id', ['cliente_id'], unique=False)
+
+    op.create_table(
+        'venta_detalles_archivo',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('venta_id', sa.Integer(), nullable=True),
+        sa.Column('producto_id', sa.Integer(), nullable=True),
+        sa.Column('cantidad', sa.Integer(), nullable=True),
+        sa.Column('precio_unitario', sa.Float(), nullable=True),
+        sa.Column('subtotal', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['producto_id'], ['productos.id']),
+        sa.ForeignKeyConstraint(['venta_id'], ['ventas_archivo.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('venta_detalles_archivo', schema=None) as batch_op:
+        batch_op.create_index('ix_venta_detalles_archivo_venta_id', ['venta_id'], unique=False)
+
+    # Las tablas calientes se filtran por fecha (reportes, archivado) y
+    # los detalles por venta: sin índice cada lote recorre la tabla entera
+    with op.batch_alter_table('ventas', schema=None) as batch_op:
+        batch_op.create_index('ix_ventas_fecha', ['fecha'], unique=False)
+    with op.batch_alter_table('venta_detalles', schema=None) as batch_op:
+        batch_op.create_index('ix_venta_detalles_venta_id', ['venta_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('venta_detalles', schema=None) as batch_op:
+        batch_op.drop_index('ix_venta_detalles_venta_id')
+    with op.batch_alter_table('ventas', schema=None) as batch_op:
+        batch_op.drop_index('ix_ventas_fecha')
+
+    with op.batch_alter_table('venta_detalles_archivo', schema=None) as batch_op:
+        batch_op.drop_index('ix_venta_detalles_archivo_venta_id')
+    op.drop_table('venta_detalles_archivo')
+
+    with op.batch_alter_table('ventas_archivo', schema=None) as batch_op:
+        batch_op.drop_index('ix_ventas_archivo_cliente_id')
+        batch_op.drop_index('ix_ventas_archivo_fecha')
+    op.drop_table('ventas_archivo')
@@ -0,0 +1,46 @@
+"""Agregar tabla de trabajos en segundo plano
+
+Revision ID: d2a6c8e1f054
+Revises: b7e4f1c9a2d8
+Create Date: 2026-10-19 19:25:44.902157
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a6c8e1f054'
+down_revision = 'b7e4f1c9a2d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'trabajos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('progreso', sa.Integer(), nullable=False),
+        sa.Column('mensaje', sa.String(length=255), nullable=True),
+        sa.Column('parametros', sa.Text(), nullable=True),
+        sa.Column('resultado_ruta', sa.String(length=255), nullable=True),
+        sa.Column('resultado_nombre', sa.String(length=150), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('trabajador', sa.String(length=100), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=True),
+        sa.Column('creado_en', sa.DateTime(), nullable=True),
+        sa.Column('iniciado_en', sa.DateTime(), nullable=True),
+        sa.Column('terminado_en', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('trabajos', schema=None) as batch_op:
+        batch_op.create_index('ix_trabajos_estado', ['estado'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('trabajos', schema=None) as batch_op:
+        batch_op.drop_index('ix_trabajos_estado')
+    op.drop_table('trabajos')
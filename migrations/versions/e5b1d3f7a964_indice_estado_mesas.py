@@ -0,0 +1,37 @@
+"""Índice por estado en mesas para asignar mesas libres
+
+Revision ID: e5b1d3f7a964
+Revises: d2a6c8e1f054
+Create Date: 2026-10-19 21:08:31.527604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1d3f7a964'
+down_revision = 'd2a6c8e1f054'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # abrir_pestana busca la primera mesa con estado 'libre' en cada clic
+    with op.batch_alter_table('mesas', schema=None) as batch_op:
+        batch_op.create_index('ix_mesas_estado', ['estado'], unique=False)
+
+    # Alinear el estado con las ventas abiertas: desde ahora es la única fuente de verdad
+    op.execute(
+        "UPDATE mesas SET estado = 'ocupada' WHERE estado <> 'ocupada' AND EXISTS "
+        "(SELECT 1 FROM ventas WHERE ventas.mesa_id = mesas.id AND ventas.estado = 'abierta')"
+    )
+    op.execute(
+        "UPDATE mesas SET estado = 'libre' WHERE estado IS NULL OR (estado <> 'libre' AND NOT EXISTS "
+        "(SELECT 1 FROM ventas WHERE ventas.mesa_id = mesas.id AND ventas.estado = 'abierta'))"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('mesas', schema=None) as batch_op:
+        batch_op.drop_index('ix_mesas_estado')
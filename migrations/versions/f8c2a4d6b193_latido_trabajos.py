@@ -0,0 +1,26 @@
+"""Latido de trabajos en segundo plano para detectar huérfanos
+
+Revision ID: f8c2a4d6b193
+Revises: e5b1d3f7a964
+Create Date: 2026-10-19 23:41:12.204318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8c2a4d6b193'
+down_revision = 'e5b1d3f7a964'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trabajos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latido_en', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('trabajos', schema=None) as batch_op:
+        batch_op.drop_column('latido_en')
@@ -1,5 +1,6 @@
 from database import db
 from datetime import datetime
+from sqlalchemy import event
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -16,6 +17,8 @@ class Usuario(db.Model, UserMixin):
     nombre = db.Column(db.String(100))
     apellido = db.Column(db.String(100))
     cedula = db.Column(db.String(20))
+    # Sube con cada edición o cambio de clave; invalida sesiones y cache
+    version_sesion = db.Column(db.Integer, default=1, nullable=False, server_default='1')
 
     # Relaciones
     cierres = db.relationship('CierreCaja', backref='usuario_rel', lazy=True)
@@ -72,7 +75,7 @@ class Mesa(db.Model):
     __tablename__ = 'mesas'
 
     id = db.Column(db.Integer, primary_key=True)
-    estado = db.Column(db.String(20), default='libre')
+    estado = db.Column(db.String(20), default='libre', index=True)
     total_cuenta = db.Column(db.Float, default=0.0)
 
     items = db.relationship(
@@ -100,9 +103,18 @@ class MesaItem(db.Model):
 # ======================================================
 class Cliente(db.Model):
     __tablename__ = 'clientes'
+    __table_args__ = (
+        # Búsqueda por prefijo (LIKE 'x%') en PostgreSQL con cualquier collation
+        db.Index(
+            'ix_clientes_nombre_clave_patron', 'nombre_clave',
+            postgresql_ops={'nombre_clave': 'text_pattern_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
+    # Nombre normalizado (mayúsculas, sin tildes) para búsquedas indexadas
+    nombre_clave = db.Column(db.String(100), index=True)
     tipo = db.Column(db.String(20), default='estandar')
     telefono = db.Column(db.String(20))
     email = db.Column(db.String(120))
@@ -116,6 +128,49 @@ class Cliente(db.Model):
     )
 
 
+@event.listens_for(Cliente, 'before_insert')
+@event.listens_for(Cliente, 'before_update')
+def _actualizar_nombre_clave(mapper, connection, cliente):
+    from utils.texto_utils import normalizar_nombre
+    cliente.nombre_clave = normalizar_nombre(cliente.nombre)
+
+
+class ClienteResumen(db.Model):
+    """Acumulados de compra por cliente, actualizados al cerrar cada venta."""
+    __tablename__ = 'clientes_resumen'
+
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id', ondelete='CASCADE'), primary_key=True)
+    total_gastado = db.Column(db.Float, default=0.0)
+    visitas = db.Column(db.Integer, default=0)
+    primera_visita = db.Column(db.DateTime)
+    ultima_visita = db.Column(db.DateTime)
+
+    cliente = db.relationship(
+        'Cliente',
+        backref=db.backref('resumen', uselist=False, cascade="all, delete-orphan")
+    )
+
+
+class ClienteProducto(db.Model):
+    """Unidades compradas por cliente y producto (para sus favoritos)."""
+    __tablename__ = 'clientes_productos'
+    __table_args__ = (
+        db.UniqueConstraint('cliente_id', 'producto_id', name='uq_cliente_producto'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id', ondelete='CASCADE'), nullable=False, index=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id', ondelete='CASCADE'), nullable=False)
+    cantidad = db.Column(db.Integer, default=0)
+    total = db.Column(db.Float, default=0.0)
+
+    producto = db.relationship('Producto')
+    cliente = db.relationship(
+        'Cliente',
+        backref=db.backref('productos_comprados', lazy=True, cascade="all, delete-orphan")
+    )
+
+
 # ======================================================
 # 5. CRÉDITOS
 # ======================================================
@@ -221,7 +276,7 @@ class Abono(db.Model):
 class Venta(db.Model):
     __tablename__ = 'ventas'
     id = db.Column(db.Integer, primary_key=True)
-    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     total = db.Column(db.Float, default=0.0)
     estado = db.Column(db.String(20), default='abierta')
     nombre_cliente = db.Column(db.String(100))
@@ -240,9 +295,69 @@ class Venta(db.Model):
 class VentaDetalle(db.Model):
     __tablename__ = 'venta_detalles'
     id = db.Column(db.Integer, primary_key=True)
-    venta_id = db.Column(db.Integer, db.ForeignKey('ventas.id'))
+    venta_id = db.Column(db.Integer, db.ForeignKey('ventas.id'), index=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'))
+    cantidad = db.Column(db.Integer)
+    precio_unitario = db.Column(db.Float)
+    subtotal = db.Column(db.Float)
+    producto = db.relationship('Producto')
+
+# ======================================================
+# 9. ARCHIVO DE VENTAS (ver utils/archivo_ventas.py)
+# ======================================================
+# Ventas cerradas antiguas, movidas por lotes fuera de las tablas
+# calientes. Conservan el id original; mesa, usuario y cliente quedan
+# como enteros sueltos para no impedir borrar esos registros.
+class VentaArchivada(db.Model):
+    __tablename__ = 'ventas_archivo'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    fecha = db.Column(db.DateTime, index=True)
+    total = db.Column(db.Float, default=0.0)
+    estado = db.Column(db.String(20))
+    nombre_cliente = db.Column(db.String(100))
+    metodo_pago = db.Column(db.String(50))
+    pago_efectivo = db.Column(db.Float, default=0.0)
+    cambio = db.Column(db.Float, default=0.0)
+    detalle_pago = db.Column(db.String(255))
+
+    mesa_id = db.Column(db.Integer)
+    usuario_id = db.Column(db.Integer)
+    cliente_id = db.Column(db.Integer, index=True)
+    archivada_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+    detalles = db.relationship('VentaDetalleArchivada', backref='venta_rel', lazy=True, cascade="all, delete-orphan")
+
+
+class VentaDetalleArchivada(db.Model):
+    __tablename__ = 'venta_detalles_archivo'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    venta_id = db.Column(db.Integer, db.ForeignKey('ventas_archivo.id'), index=True)
     producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'))
     cantidad = db.Column(db.Integer)
     precio_unitario = db.Column(db.Float)
     subtotal = db.Column(db.Float)
-    producto = db.relationship('Producto')
\ No newline at end of file
+    producto = db.relationship('Producto')
+
+
+# ======================================================
+# 10. TRABAJOS EN SEGUNDO PLANO (ver utils/trabajos.py)
+# ======================================================
+class Trabajo(db.Model):
+    __tablename__ = 'trabajos'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    estado = db.Column(db.String(20), default='pendiente', nullable=False, index=True)
+    progreso = db.Column(db.Integer, default=0, nullable=False)
+    mensaje = db.Column(db.String(255))
+    parametros = db.Column(db.Text)
+    resultado_ruta = db.Column(db.String(255))
+    resultado_nombre = db.Column(db.String(150))
+    error = db.Column(db.Text)
+    # host:pid del worker que lo ejecuta (para detectar trabajos huérfanos)
+    trabajador = db.Column(db.String(100))
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_en = db.Column(db.DateTime)
+    terminado_en = db.Column(db.DateTime)
+    # Última señal de vida del worker (un trabajo activo sin latido quedó huérfano)
+    latido_en = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,11 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, abort
 from flask_login import login_required, current_user
 from database import db
 from models import Usuario, Producto, Venta, VentaDetalle, CierreCaja, AcumuladoMensual
 from sqlalchemy.exc import IntegrityError, OperationalError
-import pandas as pd
-from io import BytesIO
+import os
 from datetime import datetime
+from utils.usuarios_cache import marcar_usuario_modificado, invalidar_usuario, registrar_version_sesion
+from utils.rendimiento import resumen_endpoints, UMBRAL_PETICION_MS, UMBRAL_SQL_MS
+from utils.perfilador import listar_perfiles, ruta_perfil, resumen_perfil
+from utils.trabajos import tarea, encolar, responder_encolado, ruta_entrada
 
 # Definimos el Blueprint con el nombre 'admin'
 admin_bp = Blueprint('admin', __name__)
@@ -78,8 +81,15 @@ def editar_usuario(usuario_id):
         password = request.form.get('password')
         if password and password.strip() != "":
             usuario.set_password(password.strip())
+
+        # Invalida las sesiones abiertas del usuario y su copia en cache
+        marcar_usuario_modificado(usuario)
             
         db.session.commit()
+
+        # Si el admin se editó a sí mismo, conserva su sesión
+        if usuario.id == current_user.id:
+            registrar_version_sesion(usuario)
         flash(f'✅ Usuario {usuario.username} actualizado correctamente.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -98,6 +108,7 @@ def eliminar_usuario(usuario_id):
     try:
         db.session.delete(usuario)
         db.session.commit()
+        invalidar_usuario(usuario_id)
         flash(f'🗑️ Usuario {usuario.username} eliminado definitivamente.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -122,64 +133,109 @@ def importar_productos_excel():
         flash('No seleccionaste ningún archivo.', 'warning')
         return redirect(url_for('admin.vista_importar'))
 
+    # El archivo se procesa en segundo plano; aquí solo se guarda
+    ruta = ruta_entrada(file.filename)
+    file.save(ruta)
+    trabajo = encolar('importar_productos', ruta=ruta)
+    return responder_encolado(trabajo, '⏳ Importación en curso. Puede seguir trabajando.')
+
+@tarea('importar_productos')
+def tarea_importar_productos(progreso, ruta):
+    import pandas as pd  # diferido: solo lo usan importación/exportación
+
     try:
-        excel_data = BytesIO(file.read())
-        df_productos = pd.read_excel(excel_data, sheet_name='Producto')
-        
-        for _, row in df_productos.iterrows():
+        progreso.avanzar(5, 'Leyendo el archivo')
+        df_productos = pd.read_excel(ruta, sheet_name='Producto')
+        total = len(df_productos)
+
+        nuevos = []
+        for i, (_, row) in enumerate(df_productos.iterrows(), start=1):
             row_l = {str(k).lower().strip(): v for k, v in row.items()}
-            
+
             # Validación de datos nulos para evitar errores de conversión
-            nuevo = Producto(
+            nuevos.append(Producto(
                 codigo=str(row_l.get('codigo')) if pd.notna(row_l.get('codigo')) else None,
                 nombre=str(row_l.get('nombre')) if pd.notna(row_l.get('nombre')) else "Sin Nombre",
                 cantidad=int(row_l.get('cantidad')) if pd.notna(row_l.get('cantidad')) else 0,
                 valor_venta=float(row_l.get('valor_venta')) if pd.notna(row_l.get('valor_venta')) else 0.0,
                 valor_interno=float(row_l.get('valor_interno')) if pd.notna(row_l.get('valor_interno')) else 0.0
-            )
-            db.session.add(nuevo)
-            
+            ))
+            if i % 200 == 0:
+                progreso.avanzar(5 + 85 * i / total, f'{i} de {total} filas leídas')
+
+        # Todo o nada, como antes: una sola transacción al final
+        progreso.avanzar(90, 'Guardando productos')
+        db.session.add_all(nuevos)
         db.session.commit()
-        flash('✅ Productos importados correctamente.', 'success')
-    except Exception as e:
-        db.session.rollback()
-        flash(f'❌ Error durante la importación: {str(e)}', 'danger')
-        
-    return redirect(url_for('inventario.inventario'))
+        return f'✅ {total} productos importados correctamente.'
+    finally:
+        os.remove(ruta)
 
 @admin_bp.route('/exportar_productos_excel')
 def exportar_productos():
-    try:
-        productos = Producto.query.all()
-        data = [
-            {
-                "ID": p.id, 
-                "Código": p.codigo, 
-                "Nombre": p.nombre, 
-                "Stock": p.cantidad, 
-                "Precio": p.valor_venta
-            } for p in productos
-        ]
-        
-        if not data:
-            flash('No hay productos para exportar.', 'info')
-            return redirect(url_for('inventario.inventario'))
-
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Productos')
-        
-        output.seek(0)
-        
-        nombre_archivo = f"inventario_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-        
-        return send_file(
-            output, 
-            as_attachment=True, 
-            download_name=nombre_archivo, 
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-    except Exception as e:
-        flash(f'❌ Error al exportar: {str(e)}', 'danger')
-        return redirect(url_for('inventario.inventario'))
\ No newline at end of file
+    trabajo = encolar('exportar_productos')
+    return responder_encolado(trabajo)
+
+@tarea('exportar_productos')
+def tarea_exportar_productos(progreso):
+    import pandas as pd
+
+    progreso.avanzar(10, 'Consultando productos')
+    productos = Producto.query.all()
+    data = [
+        {
+            "ID": p.id, 
+            "Código": p.codigo, 
+            "Nombre": p.nombre, 
+            "Stock": p.cantidad, 
+            "Precio": p.valor_venta
+        } for p in productos
+    ]
+
+    if not data:
+        return 'No hay productos para exportar.'
+
+    progreso.avanzar(50, f'Escribiendo {len(data)} productos')
+    nombre_archivo = f"inventario_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
+    df = pd.DataFrame(data)
+    with pd.ExcelWriter(progreso.archivo_resultado(nombre_archivo), engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Productos')
+
+    return f'✅ {len(data)} productos exportados.'
+
+# -------------------- RENDIMIENTO --------------------
+
+@admin_bp.route('/rendimiento')
+def rendimiento():
+    """Percentiles de tiempo, tiempo en DB y consultas por endpoint (este worker)."""
+    return render_template(
+        'rendimiento.html',
+        endpoints=resumen_endpoints(),
+        umbral_peticion=UMBRAL_PETICION_MS,
+        umbral_sql=UMBRAL_SQL_MS
+    )
+
+@admin_bp.route('/perfiles')
+def perfiles():
+    """Perfiles capturados con ?_perfilar=1."""
+    nombre = request.args.get('ver')
+    resumen = None
+    if nombre:
+        ruta = ruta_perfil(nombre)
+        if not ruta:
+            abort(404)
+        resumen = resumen_perfil(ruta)
+
+    return render_template(
+        'perfiles.html',
+        perfiles=listar_perfiles(),
+        seleccionado=nombre,
+        resumen=resumen
+    )
+
+@admin_bp.route('/perfiles/descargar/<nombre>')
+def descargar_perfil(nombre):
+    ruta = ruta_perfil(nombre)
+    if not ruta:
+        abort(404)
+    return send_file(ruta, as_attachment=True, download_name=nombre, mimetype='application/octet-stream')
@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from models import Usuario
 from sqlalchemy.exc import OperationalError
 from urllib.parse import urlparse
+from utils.usuarios_cache import registrar_version_sesion
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -28,6 +29,7 @@ def login():
             # Verificamos usuario y contraseña
             if user and user.check_password(password):
                 login_user(user)
+                registrar_version_sesion(user)
                 flash(f'¡Bienvenido, {user.nombre}! 🍷', 'success')
                 
                 # Manejo de redirección dinámica (parámetro next)
@@ -1,8 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required
 from database import db
 from models import Cliente
 from sqlalchemy.exc import IntegrityError
+from utils.texto_utils import normalizar_nombre
+from utils.resumen_clientes import obtener_resumenes
 
 clientes_bp = Blueprint('clientes', __name__)
 
@@ -10,11 +12,98 @@ clientes_bp = Blueprint('clientes', __name__)
 # ===============================
 # LISTAR CLIENTES
 # ===============================
+def filtrar_por_nombre(query, texto, contiene=False):
+    """Filtra por la clave normalizada; por prefijo (usa el índice) o por subcadena."""
+    clave = normalizar_nombre(texto)
+    if contiene:
+        clave = clave.replace('%', '').replace('_', '')
+        return query.filter(Cliente.nombre_clave.like(f"%{clave}%"))
+
+    if not clave:
+        return query
+
+    if db.engine.dialect.name == 'postgresql':
+        # El orden de un rango depende de la collation de la base (es_CO.UTF-8
+        # no ordena byte a byte); LIKE 'x%' usa ix_clientes_nombre_clave_patron
+        clave = clave.replace('%', '').replace('_', '')
+        return query.filter(Cliente.nombre_clave.like(f"{clave}%"))
+
+    # SQLite compara en binario y su LIKE no usa el índice: rango hasta el
+    # siguiente punto de código del último carácter
+    return query.filter(
+        Cliente.nombre_clave >= clave,
+        Cliente.nombre_clave < clave[:-1] + chr(ord(clave[-1]) + 1)
+    )
+
+
+def buscar_cliente_por_nombre(nombre):
+    """Cliente cuyo nombre coincide ignorando tildes, mayúsculas y espacios."""
+    clave = normalizar_nombre(nombre)
+    if not clave:
+        return None
+    return Cliente.query.filter_by(nombre_clave=clave).first()
+
+
 @clientes_bp.route('/clientes')
 @login_required
 def clientes():
-    clientes_list = Cliente.query.order_by(Cliente.nombre.asc()).all()
-    return render_template('clientes.html', clientes=clientes_list)
+    page = request.args.get('page', 1, type=int)
+    search_query = request.args.get('search', '').strip()
+
+    query = Cliente.query
+    if search_query:
+        query = filtrar_por_nombre(query, search_query, contiene=True)
+
+    clientes_paginados = query.order_by(Cliente.nombre_clave.asc()).paginate(
+        page=page,
+        per_page=25,
+        error_out=False
+    )
+
+    return render_template(
+        'clientes.html',
+        clientes=clientes_paginados.items,
+        clientes_paginados=clientes_paginados,
+        resumenes=obtener_resumenes([c.id for c in clientes_paginados.items]),
+        search_query=search_query
+    )
+
+
+# ===============================
+# API TYPEAHEAD (POS, CRÉDITOS, CLIENTES)
+# ===============================
+@clientes_bp.route('/api/buscar')
+@login_required
+def api_buscar_clientes():
+    texto = request.args.get('q', '').strip()
+    limite = min(request.args.get('limit', 10, type=int), 50)
+
+    if not normalizar_nombre(texto):
+        return jsonify([])
+
+    # Primero coincidencias por prefijo (índice), luego por subcadena
+    encontrados = filtrar_por_nombre(Cliente.query, texto).order_by(
+        Cliente.nombre_clave.asc()
+    ).limit(limite).all()
+
+    if len(encontrados) < limite:
+        ids = [c.id for c in encontrados]
+        extra = filtrar_por_nombre(Cliente.query, texto, contiene=True)
+        if ids:
+            extra = extra.filter(~Cliente.id.in_(ids))
+        encontrados += extra.order_by(Cliente.nombre_clave.asc()).limit(
+            limite - len(encontrados)
+        ).all()
+
+    return jsonify([
+        {
+            "id": c.id,
+            "nombre": (c.nombre or "").upper(),
+            "tipo": c.tipo or "estandar",
+            "telefono": c.telefono or ""
+        }
+        for c in encontrados
+    ])
 
 
 # ===============================
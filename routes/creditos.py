@@ -3,6 +3,10 @@ from flask_login import login_required, current_user
 from database import db
 from models import Credito, CreditoItem, AbonoCredito, Producto, Cliente, Venta, VentaDetalle
 from datetime import datetime, date
+import json
+from sqlalchemy import insert, update
+from routes.clientes import buscar_cliente_por_nombre
+from utils.idempotencia import idempotente
 
 creditos_bp = Blueprint('creditos', __name__, url_prefix='/creditos')
 
@@ -53,7 +57,7 @@ def creditos_largo():
             return redirect(url_for('creditos.creditos_largo'))
 
         # Buscar o crear cliente
-        cliente_db = Cliente.query.filter_by(nombre=nombre_cliente).first()
+        cliente_db = buscar_cliente_por_nombre(nombre_cliente)
         if not cliente_db:
             cliente_db = Cliente(nombre=nombre_cliente)
             db.session.add(cliente_db)
@@ -114,25 +118,177 @@ def creditos_largo():
     )
 
 
+# --------------------------------------------------
+# CARGA MASIVA A CRÉDITO (VARIOS PRODUCTOS EN UNA PETICIÓN)
+# --------------------------------------------------
+@creditos_bp.route('/largo/lote', methods=['POST'])
+@login_required
+def cargar_lote_credito():
+    """
+    Carga varios productos a la cuenta de un cliente en una sola transacción.
+    JSON: {"cliente": "NOMBRE" | "cliente_id": 1, "fecha": "YYYY-MM-DD",
+           "items": [{"codigo": "...", "cantidad": 2}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('items') or []
+
+    if not items:
+        return jsonify({"success": False, "message": "No hay productos para cargar"}), 400
+
+    # Agrupar por código para que un producto repetido descuente una sola vez
+    cantidades = {}
+    try:
+        for item in items:
+            codigo = str(item.get('codigo') or '').strip()
+            cantidad = int(item.get('cantidad') or 1)
+            if not codigo or cantidad <= 0:
+                raise ValueError
+            cantidades[codigo] = cantidades.get(codigo, 0) + cantidad
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({"success": False, "message": "Items inválidos"}), 400
+
+    fecha_str = data.get('fecha')
+    try:
+        fecha_item = datetime.strptime(fecha_str, '%Y-%m-%d') if fecha_str else datetime.now()
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Fecha inválida, use AAAA-MM-DD"}), 400
+
+    # Buscar cliente por id o por nombre
+    cliente_db = None
+    if data.get('cliente_id'):
+        cliente_db = Cliente.query.get(data.get('cliente_id'))
+    else:
+        nombre_cliente = (data.get('cliente') or '').strip().upper()
+        if nombre_cliente:
+            cliente_db = buscar_cliente_por_nombre(nombre_cliente)
+            if not cliente_db:
+                cliente_db = Cliente(nombre=nombre_cliente)
+                db.session.add(cliente_db)
+                db.session.flush()
+
+    if not cliente_db:
+        return jsonify({"success": False, "message": "Debe indicar el cliente"}), 400
+
+    try:
+        # Todos los productos en una sola consulta IN (bloqueados en PostgreSQL)
+        productos = {
+            p.codigo: p
+            for p in Producto.query.filter(Producto.codigo.in_(list(cantidades)))
+            .with_for_update().all()
+        }
+
+        faltantes = [c for c in cantidades if c not in productos]
+        if faltantes:
+            db.session.rollback()
+            return jsonify({
+                "success": False,
+                "message": "Productos no encontrados",
+                "codigos": faltantes
+            }), 404
+
+        sin_stock = [
+            {"codigo": c, "nombre": productos[c].nombre, "disponible": productos[c].cantidad or 0}
+            for c, cant in cantidades.items()
+            if (productos[c].cantidad or 0) < cant
+        ]
+        if sin_stock:
+            db.session.rollback()
+            return jsonify({
+                "success": False,
+                "message": "Stock insuficiente",
+                "productos": sin_stock
+            }), 409
+
+        # Descuento condicional: si otra caja vendió en el intermedio, se revierte todo
+        for codigo, cant in cantidades.items():
+            resultado = db.session.execute(
+                update(Producto)
+                .where(Producto.id == productos[codigo].id, Producto.cantidad >= cant)
+                .values(cantidad=Producto.cantidad - cant)
+                .execution_options(synchronize_session=False)
+            )
+            if resultado.rowcount != 1:
+                db.session.rollback()
+                return jsonify({
+                    "success": False,
+                    "message": f"Stock insuficiente para {productos[codigo].nombre}"
+                }), 409
+
+        db.session.flush()
+
+        # Buscar o abrir el crédito largo del cliente
+        credito = Credito.query.filter_by(
+            cliente_id=cliente_db.id,
+            tipo='largo',
+            estado='abierto'
+        ).first()
+
+        if not credito:
+            credito = Credito(
+                cliente_id=cliente_db.id,
+                tipo='largo',
+                estado='abierto',
+                fecha_inicio=fecha_item,
+                total=0
+            )
+            db.session.add(credito)
+            db.session.flush()
+
+        filas = [
+            {
+                "credito_id": credito.id,
+                "producto_id": productos[codigo].id,
+                "cantidad": cant,
+                "subtotal": (productos[codigo].valor_venta or 0) * cant
+            }
+            for codigo, cant in cantidades.items()
+        ]
+        db.session.execute(insert(CreditoItem), filas)
+
+        total_lote = sum(f["subtotal"] for f in filas)
+        credito.total = (credito.total or 0) + total_lote
+
+        db.session.commit()
+
+        return jsonify({
+            "success": True,
+            "credito_id": credito.id,
+            "cliente": cliente_db.nombre,
+            "items": len(filas),
+            "total_lote": total_lote,
+            "nuevo_total": credito.total
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
 # --------------------------------------------------
 # REGISTRAR ABONO
 # --------------------------------------------------
 @creditos_bp.route('/registrar_abono', methods=['POST'])
 @login_required
+@idempotente
 def registrar_abono():
-    credito_id = request.form.get('credito_id')
-    monto_raw = request.form.get('monto_abono', '0')
-    monto = float(monto_raw) if monto_raw else 0.0
+    credito_id = request.form.get('credito_id', type=int)
+    monto = request.form.get('monto_abono', 0, type=float)
     medio = request.form.get('medio_pago', 'Efectivo')
     fecha_pago_str = request.form.get('fecha_pago')
 
-    credito = Credito.query.get_or_404(credito_id)
-
     if monto <= 0:
         flash("Monto inválido", "danger")
         return redirect(url_for('creditos.creditos_largo'))
 
-    fecha_pago = datetime.strptime(fecha_pago_str, '%Y-%m-%d').date() if fecha_pago_str else date.today()
+    try:
+        fecha_pago = datetime.strptime(fecha_pago_str, '%Y-%m-%d') if fecha_pago_str else datetime.now()
+    except ValueError:
+        flash("Fecha de pago inválida", "danger")
+        return redirect(url_for('creditos.creditos_largo'))
+
+    # Bloquea el crédito (PostgreSQL): dos abonos a la vez no calculan el saldo sobre el mismo valor
+    credito = Credito.query.filter_by(id=credito_id).with_for_update().first_or_404()
+    nombre_cliente = credito.cliente_rel.nombre if credito.cliente_rel else ""
 
     # Registrar abono
     nuevo_abono = AbonoCredito(
@@ -143,16 +299,18 @@ def registrar_abono():
     )
     db.session.add(nuevo_abono)
 
-    credito.abonado += monto
-    credito.fecha_ultimo_abono = fecha_pago
-
     # Registrar el abono como venta diaria
+    # Cerrada y sin cliente_id: es dinero del día, no una compra del cliente
     venta = Venta(
         fecha=datetime.now(),
         total=monto,
+        estado='cerrada',
         usuario_id=current_user.id,
-        tipo_pago=medio,
-        detalle_pago=f"ABONO CRÉDITO - CLIENTE: {credito.cliente}"
+        nombre_cliente=f"ABONO CRÉDITO - {nombre_cliente}"[:100],
+        metodo_pago=medio.upper(),
+        pago_efectivo=monto if medio.upper() == 'EFECTIVO' else 0,
+        # Mismo formato que leen los reportes de caja: {"Nequi": 20000}
+        detalle_pago=json.dumps({medio.capitalize(): monto})
     )
     db.session.add(venta)
     db.session.flush()
@@ -166,11 +324,14 @@ def registrar_abono():
     )
     db.session.add(detalle)
 
+    abonado = db.session.query(
+        db.func.coalesce(db.func.sum(AbonoCredito.monto), 0)
+    ).filter(AbonoCredito.credito_id == credito.id).scalar()
+
     # Cerrar crédito si está saldado (o sobre-saldado)
-    if (credito.total_consumido - credito.abonado) <= 0:
+    if (credito.total or 0) - abonado <= 0:
         credito.estado = 'cerrado'
-        credito.fecha_cierre = date.today()
-        flash(f"🎉 Cuenta de {credito.cliente} SALDADA.", "success")
+        flash(f"🎉 Cuenta de {nombre_cliente} SALDADA.", "success")
     else:
         flash(f"💰 Abono de ${monto:,.0f} registrado.", "success")
 
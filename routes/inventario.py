@@ -1,13 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
 from flask_login import login_required, current_user
 from sqlalchemy.orm import joinedload
-import barcode
-from barcode.writer import ImageWriter
 import io
-import pandas as pd
 
 from database import db
 from models import Producto, MovimientoStock, MesaItem
+from utils.cache import memorizar, version_etiqueta
+from utils.http_cache import respuesta_condicional
+from utils.trabajos import tarea, encolar, responder_encolado
 
 
 # =========================================================
@@ -36,6 +36,7 @@ def es_admin():
 # =========================================================
 @inventario_bp.route("/api/productos/buscar")
 @login_required
+@respuesta_condicional(lambda: (version_etiqueta("catalogo"), version_etiqueta("stock")))
 def api_buscar_productos():
 
     query = request.args.get("q", "").strip()
@@ -43,24 +44,41 @@ def api_buscar_productos():
     if not query:
         return jsonify([])
 
-    productos = Producto.query.filter(
-        (Producto.nombre.ilike(f"%{query}%")) |
-        (Producto.codigo.ilike(f"%{query}%")) |
-        (Producto.marca.ilike(f"%{query}%"))
-    ).limit(20).all()
+    def buscar():
+        productos = Producto.query.filter(
+            (Producto.nombre.ilike(f"%{query}%")) |
+            (Producto.codigo.ilike(f"%{query}%")) |
+            (Producto.marca.ilike(f"%{query}%"))
+        ).limit(20).all()
+
+        return [
+            {
+                "id": p.id,
+                "codigo": p.codigo or "",
+                "nombre": (p.nombre or "SIN NOMBRE").upper(),
+                "precio": p.valor_venta or 0,
+                "marca": (p.marca or "S.M").upper(),
+                "valor_interno": p.valor_interno or 0
+            }
+            for p in productos
+        ]
+
+    # Solo cambios en columnas del catálogo invalidan "catalogo" (utils/cache.py);
+    # el stock cambia con cada venta y se lee aparte, por id
+    resultados = memorizar(
+        f"catalogo:buscar:{query.lower()}",
+        buscar,
+        etiquetas=("catalogo",),
+        metrica="catalogo"
+    )
 
-    return jsonify([
-        {
-            "id": p.id,
-            "codigo": p.codigo or "",
-            "nombre": (p.nombre or "SIN NOMBRE").upper(),
-            "stock": p.cantidad or 0,
-            "precio": p.valor_venta or 0,
-            "marca": (p.marca or "S.M").upper(),
-            "valor_interno": p.valor_interno or 0
-        }
-        for p in productos
-    ])
+    stock = dict(
+        db.session.query(Producto.id, Producto.cantidad)
+        .filter(Producto.id.in_([r["id"] for r in resultados]))
+        .all()
+    ) if resultados else {}
+
+    return jsonify([dict(r, stock=stock.get(r["id"]) or 0) for r in resultados])
 
 
 # =========================================================
@@ -259,6 +277,16 @@ def exportar_excel():
     if not es_admin():
         return redirect(url_for("inventario.inventario"))
 
+    # El Excel se arma en segundo plano; la página del trabajo ofrece la descarga
+    trabajo = encolar("exportar_inventario")
+    return responder_encolado(trabajo)
+
+
+@tarea("exportar_inventario")
+def tarea_exportar_inventario(progreso):
+    import pandas as pd  # diferido: solo lo usa la exportación
+
+    progreso.avanzar(10, "Consultando productos")
     productos = Producto.query.all()
 
     data = [
@@ -273,21 +301,13 @@ def exportar_excel():
         for p in productos
     ]
 
+    progreso.avanzar(50, f"Escribiendo {len(data)} productos")
     df = pd.DataFrame(data)
 
-    output = io.BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+    with pd.ExcelWriter(progreso.archivo_resultado("Inventario_SanRoque.xlsx"), engine="xlsxwriter") as writer:
         df.to_excel(writer, index=False, sheet_name="Inventario")
 
-    output.seek(0)
-
-    return send_file(
-        output,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        as_attachment=True,
-        download_name="Inventario_SanRoque.xlsx"
-    )
+    return f"✅ {len(data)} productos exportados."
 
 
 # =========================================================
@@ -298,6 +318,9 @@ def exportar_excel():
 def generar_codigo(codigo):
 
     try:
+        import barcode
+        from barcode.writer import ImageWriter
+
         CODE128 = barcode.get_barcode_class("code128")
         buffer = io.BytesIO()
 
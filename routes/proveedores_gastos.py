@@ -2,14 +2,14 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from sqlalchemy import func
 from datetime import date, datetime
-import pandas as pd
-from io import BytesIO
 import os
 import json
 from werkzeug.utils import secure_filename
 
 from database import db
 from models import Factura, Abono, Gasto
+from utils.cuentas_por_pagar import obtener_cuentas_por_pagar, RANGOS_ANTIGUEDAD
+from utils.trabajos import tarea, encolar, responder_encolado
 
 # ======================================================
 # BLUEPRINT
@@ -87,6 +87,23 @@ def enlista_proveedores():
         hoy=date.today().strftime("%Y-%m-%d")
     )
 
+# ======================================================
+# CUENTAS POR PAGAR (ANTIGÜEDAD Y PROYECCIÓN)
+# ======================================================
+
+@proveedores_gastos_bp.route("/cuentas_por_pagar")
+@login_required
+def cuentas_por_pagar():
+    if current_user.rol.lower() not in ["administrador", "administradora"]:
+        flash("Permiso denegado. Se requiere rol de administrador.", "danger")
+        return redirect(url_for("ventas.dashboard"))
+
+    return render_template(
+        "cuentas_por_pagar.html",
+        resumen=obtener_cuentas_por_pagar(),
+        rangos=RANGOS_ANTIGUEDAD
+    )
+
 @proveedores_gastos_bp.route("/factura/editar/<int:factura_id>", methods=["POST"])
 @login_required
 def editar_factura(factura_id):
@@ -254,10 +271,25 @@ def eliminar_gasto(gasto_id):
 @proveedores_gastos_bp.route("/exportar_proveedores")
 @login_required
 def exportar_proveedores():
+    trabajo = encolar("exportar_proveedores")
+    return responder_encolado(trabajo)
+
+
+@tarea("exportar_proveedores")
+def tarea_exportar_proveedores(progreso):
+    import pandas as pd  # diferido: solo lo usa la exportación
+
     facturas = Factura.query.all()
+    # Abonado por factura en una sola consulta
+    abonado_por_factura = dict(
+        db.session.query(Abono.factura_id, func.sum(Abono.monto))
+        .filter(Abono.factura_id.isnot(None))
+        .group_by(Abono.factura_id)
+        .all()
+    )
     data = []
-    for f in facturas:
-        abonado = db.session.query(func.sum(Abono.monto)).filter(Abono.factura_id == f.id).scalar() or 0
+    for i, f in enumerate(facturas, start=1):
+        abonado = abonado_por_factura.get(f.id) or 0
         data.append({
             "Fecha": f.fecha.strftime("%Y-%m-%d") if f.fecha else "",
             "Factura": f.numero,
@@ -266,16 +298,11 @@ def exportar_proveedores():
             "Abonado": abonado,
             "Saldo": f.total - abonado
         })
+        if i % 200 == 0:
+            progreso.avanzar(80 * i / len(facturas), f"{i} de {len(facturas)} facturas")
 
     df = pd.DataFrame(data)
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+    with pd.ExcelWriter(progreso.archivo_resultado(f"proveedores_{date.today()}.xlsx"), engine="openpyxl") as writer:
         df.to_excel(writer, index=False)
-    output.seek(0)
-
-    return send_file(
-        output,
-        download_name=f"proveedores_{date.today()}.xlsx",
-        as_attachment=True,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
\ No newline at end of file
+
+    return f"✅ {len(data)} facturas exportadas."
\ No newline at end of file
@@ -6,10 +6,12 @@ from utils.time_utils import (
     obtener_rango_turno_colombia,
     obtener_rango_turno_por_fecha_comercial
 )
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, select
 from datetime import timedelta, datetime
 import json
 import pytz
+from utils.archivo_ventas import tabla_ventas
+from utils.trabajos import tarea, encolar, responder_encolado
 
 reportes_bp = Blueprint("reportes", __name__)
 
@@ -147,8 +149,6 @@ def reportes():
 @reportes_bp.route("/enviar_reporte_email", methods=["POST"])
 @login_required
 def enviar_reporte_email():
-    from utils.correo_utils import enviar_correo
-
     email = request.form.get("email")
     f_ini_str = request.form.get("fecha_inicio")
     f_fin_str = request.form.get("fecha_fin")
@@ -157,12 +157,26 @@ def enviar_reporte_email():
         flash("Datos incompletos para enviar el reporte.", "warning")
         return redirect(url_for("reportes.reportes"))
 
+    # Consulta y envío SMTP en segundo plano: no bloquean el worker
+    trabajo = encolar("enviar_reporte", email=email, f_ini_str=f_ini_str, f_fin_str=f_fin_str)
+    return responder_encolado(trabajo, "⏳ Preparando el reporte para enviarlo por correo.")
+
+
+@tarea("enviar_reporte")
+def tarea_enviar_reporte(progreso, email, f_ini_str, f_fin_str):
+    from utils.correo_utils import enviar_correo
+
     inicio = datetime.strptime(f_ini_str, "%Y-%m-%d")
     fin = datetime.strptime(f_fin_str, "%Y-%m-%d") + timedelta(days=1)
 
-    ventas = Venta.query.filter(
-        Venta.fecha >= inicio,
-        Venta.fecha < fin
+    progreso.avanzar(10, "Consultando ventas")
+    # Periodo libre: puede caer en ventas ya archivadas
+    todas = tabla_ventas()
+    ventas = db.session.execute(
+        select(todas.c.total, todas.c.detalle_pago).where(
+            todas.c.fecha >= inicio,
+            todas.c.fecha < fin
+        )
     ).all()
 
     efectivo = nequi = daviplata = tarjeta = 0
@@ -194,11 +208,13 @@ def enviar_reporte_email():
         "tarjeta": tarjeta
     }
 
+    progreso.avanzar(60, "Enviando correo")
     html = generar_html_reporte(f_ini_str, f_fin_str, datos)
-    enviar_correo(email, f"Reporte San Roque MB ({f_ini_str})", html, [])
-    flash("✅ Reporte enviado correctamente por correo.", "success")
+    enviado, error = enviar_correo(email, f"Reporte San Roque MB ({f_ini_str})", html, [])
+    if not enviado:
+        raise RuntimeError(f"No se pudo enviar el correo: {error}")
 
-    return redirect(url_for("reportes.reportes"))
+    return f"✅ Reporte enviado correctamente a {email}."
 
 # --------------------------------------------------
 # CIERRE DE CAJA
@@ -0,0 +1,66 @@
+from flask import Blueprint, render_template, jsonify, send_file, abort
+from flask_login import login_required, current_user
+
+from models import Trabajo
+from utils.trabajos import estado_trabajo, marcar_si_huerfano
+
+
+# =========================================================
+# BLUEPRINT TRABAJOS EN SEGUNDO PLANO
+# =========================================================
+trabajos_bp = Blueprint("trabajos", __name__)
+
+
+def _es_admin():
+    return bool(current_user.rol) and current_user.rol.lower() == "administrador"
+
+
+def _obtener(trabajo_id):
+    """Cada usuario ve sus trabajos; el administrador, todos."""
+    trabajo = Trabajo.query.get_or_404(trabajo_id)
+    if trabajo.usuario_id != current_user.id and not _es_admin():
+        abort(404)
+    return marcar_si_huerfano(trabajo)
+
+
+# =========================================================
+# LISTADO Y DETALLE
+# =========================================================
+@trabajos_bp.route("/")
+@login_required
+def listar():
+    consulta = Trabajo.query
+    if not _es_admin():
+        consulta = consulta.filter_by(usuario_id=current_user.id)
+    trabajos = [marcar_si_huerfano(t) for t in consulta.order_by(Trabajo.id.desc()).limit(50).all()]
+    return render_template("trabajos.html", trabajos=trabajos, seleccionado=None)
+
+
+@trabajos_bp.route("/<int:trabajo_id>")
+@login_required
+def ver(trabajo_id):
+    trabajo = _obtener(trabajo_id)
+    return render_template("trabajos.html", trabajos=[trabajo], seleccionado=trabajo.id)
+
+
+# =========================================================
+# API DE ESTADO (POLLING)
+# =========================================================
+@trabajos_bp.route("/<int:trabajo_id>/estado")
+@login_required
+def estado(trabajo_id):
+    response = jsonify(estado_trabajo(_obtener(trabajo_id)))
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@trabajos_bp.route("/<int:trabajo_id>/descargar")
+@login_required
+def descargar(trabajo_id):
+    trabajo = _obtener(trabajo_id)
+    if trabajo.estado != "terminado" or not trabajo.resultado_ruta:
+        abort(404)
+    try:
+        return send_file(trabajo.resultado_ruta, as_attachment=True, download_name=trabajo.resultado_nombre)
+    except FileNotFoundError:
+        abort(410)
@@ -1,9 +1,20 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for
+from flask import Blueprint, Response, render_template, request, jsonify, redirect, url_for, abort
 from flask_login import login_required, current_user
 from database import db
 from models import Producto, Venta, VentaDetalle, Mesa, Cliente
 from datetime import datetime
 import json
+import math
+from sqlalchemy import update
+from utils.resumen_clientes import registrar_venta_cliente
+from utils.metricas import registrar_venta_cerrada, registrar_producto_agotado
+from utils.cache import version_etiqueta
+from utils.http_cache import respuesta_condicional
+from utils.archivo_ventas import obtener_venta
+from utils.eventos import publicar_al_confirmar, datos_pestana, tomar_flujo, soltar_flujo, flujo_eventos
+from utils.mesas import ocupar_mesa_libre, ocupar_mesa, liberar_mesa
+from utils.idempotencia import idempotente, IDEMPOTENCIA_TTL, TTL_EN_CURSO
+from utils.cache import cache_agregar, cache_obtener, cache_guardar, cache_borrar
 
 ventas_bp = Blueprint("ventas", __name__)
 
@@ -22,23 +33,68 @@ def dashboard():
         ventas_abiertas=ventas_abiertas
     )
 
+# =========================================================
+# EVENTOS EN VIVO (SSE)
+# =========================================================
+@ventas_bp.route("/eventos")
+@login_required
+def eventos():
+    """Flujo de cambios de mesas y pestañas; el navegador se reconecta solo."""
+    if not tomar_flujo():
+        # Todos los hilos reservados para flujos están ocupados: que reintente luego
+        response = Response(status=429)
+        response.headers["Retry-After"] = "10"
+        return response
+
+    try:
+        desde = request.headers.get("Last-Event-ID") or request.args.get("desde")
+        # El flujo no usa la base ni el contexto de la petición: libera la conexión ya
+        db.session.remove()
+
+        response = Response(flujo_eventos(desde), mimetype="text/event-stream")
+        response.headers["Cache-Control"] = "no-store"
+        response.headers["X-Accel-Buffering"] = "no"
+        response.call_on_close(soltar_flujo)
+    except Exception:
+        # Sin respuesta no hay call_on_close: el lugar se devuelve aquí o se pierde
+        soltar_flujo()
+        raise
+    return response
+
 # =========================================================
 # GESTIÓN DE PESTAÑAS (ABRIR Y ELIMINAR)
 # =========================================================
 
+def _crear_pestana(mesa_id, alias=None):
+    """Venta abierta para una mesa ya ocupada por esta petición (mismo commit)."""
+    venta = Venta(
+        fecha=datetime.now(),
+        total=0,
+        usuario_id=current_user.id,
+        estado="abierta",
+        mesa_id=mesa_id,
+        nombre_cliente=alias or f"ORDEN {mesa_id}"
+    )
+    db.session.add(venta)
+    db.session.flush()
+    publicar_al_confirmar("pestana_abierta", **datos_pestana(venta))
+    return venta
+
+
 @ventas_bp.route("/abrir_pestana")
 @login_required
 def abrir_pestana():
     """Crea una orden genérica en la primera mesa libre disponible."""
-    ventas_abiertas = Venta.query.filter_by(estado="abierta").all()
-    ids_ocupados = [v.mesa_id for v in ventas_abiertas]
+    mesa_id = ocupar_mesa_libre()
 
-    mesa_libre = Mesa.query.filter(~Mesa.id.in_(ids_ocupados)).first()
-
-    if not mesa_libre:
+    if not mesa_id:
+        db.session.rollback()
         return jsonify({"success": False, "message": "No hay mesas disponibles"}), 400
 
-    return redirect(url_for("ventas.ver_mesa", mesa_id=mesa_libre.id))
+    _crear_pestana(mesa_id)
+    db.session.commit()
+
+    return redirect(url_for("ventas.ver_mesa", mesa_id=mesa_id))
 
 
 @ventas_bp.route("/eliminar_venta/<int:venta_id>", methods=["POST"])
@@ -49,10 +105,10 @@ def eliminar_venta(venta_id):
 
     try:
         # Liberar mesa
-        if venta.mesa_id:
-            mesa = Mesa.query.get(venta.mesa_id)
-            if mesa:
-                mesa.estado = "libre"
+        if venta.estado == "abierta":
+            liberar_mesa(venta.mesa_id)
+
+        publicar_al_confirmar("pestana_cerrada", venta_id=venta.id, mesa_id=venta.mesa_id, motivo="eliminada")
 
         # Eliminar detalles
         VentaDetalle.query.filter_by(venta_id=venta.id).delete()
@@ -85,24 +141,17 @@ def ver_mesa(mesa_id):
 
     # Si no existe venta abierta, crear una nueva
     if not venta:
-        alias = nombre_cliente if nombre_cliente else f"ORDEN {mesa_id}"
-
-        venta = Venta(
-            fecha=datetime.now(),
-            total=0,
-            usuario_id=current_user.id,
-            estado="abierta",
-            mesa_id=mesa_id,
-            nombre_cliente=alias
-        )
-
-        db.session.add(venta)
-        mesa.estado = "ocupada"
+        # Si otra terminal ocupó la mesa al mismo tiempo, se usa su venta
+        if not ocupar_mesa(mesa_id):
+            venta = Venta.query.filter_by(mesa_id=mesa_id, estado="abierta").first()
+        if not venta:
+            venta = _crear_pestana(mesa_id, nombre_cliente)
         db.session.commit()
 
     # Si se cambia el nombre cliente
     elif nombre_cliente:
         venta.nombre_cliente = nombre_cliente
+        publicar_al_confirmar("pestana_actualizada", **datos_pestana(venta))
         db.session.commit()
 
     return render_template(
@@ -112,7 +161,7 @@ def ver_mesa(mesa_id):
         productos=Producto.query.filter(Producto.cantidad > 0).all(),
         detalles=VentaDetalle.query.filter_by(venta_id=venta.id).all(),
         pestañas_activas=Venta.query.filter_by(estado="abierta").all(),
-        clientes=Cliente.query.all()
+        cliente_actual=Cliente.query.get(venta.cliente_id) if venta.cliente_id else None
     )
 
 # =========================================================
@@ -133,6 +182,7 @@ def asignar_cliente():
     venta.cliente_id = cliente.id
     venta.nombre_cliente = cliente.nombre
 
+    publicar_al_confirmar("pestana_actualizada", **datos_pestana(venta))
     db.session.commit()
     return jsonify({"success": True})
 
@@ -142,6 +192,7 @@ def asignar_cliente():
 
 @ventas_bp.route("/buscar_producto/<codigo>")
 @login_required
+@respuesta_condicional(lambda codigo: version_etiqueta("catalogo"))
 def buscar_producto(codigo):
     producto = Producto.query.filter_by(codigo=codigo).first()
 
@@ -156,21 +207,58 @@ def buscar_producto(codigo):
     return jsonify({"success": False, "message": "Producto no encontrado"})
 
 # =========================================================
-# AGREGAR PRODUCTO A LA VENTA
+# CATÁLOGO PARA TRABAJAR SIN CONEXIÓN
 # =========================================================
 
-@ventas_bp.route("/agregar_producto", methods=["POST"])
+@ventas_bp.route("/catalogo")
 @login_required
-def agregar_producto():
-    data = request.get_json()
+@respuesta_condicional(lambda: (version_etiqueta("catalogo"), version_etiqueta("stock")))
+def catalogo():
+    """Código, id, nombre, precio y stock de cada producto; la terminal lo guarda localmente."""
+    filas = db.session.query(
+        Producto.codigo, Producto.id, Producto.nombre, Producto.valor_venta, Producto.cantidad
+    ).filter(Producto.codigo.isnot(None)).all()
+    return jsonify({"productos": [list(f) for f in filas]})
 
-    venta = Venta.query.get_or_404(data.get("venta_id"))
-    producto = Producto.query.get_or_404(data.get("producto_id"))
+# =========================================================
+# OPERACIONES SOBRE UNA VENTA ABIERTA
+# (las usan las rutas y la sincronización de terminales)
+# =========================================================
 
-    if producto.cantidad <= 0:
-        return jsonify({"success": False, "message": "Sin stock disponible"}), 400
+def _mover_stock(producto, delta):
+    """Suma delta al stock en la base; si resta, solo cuando alcanza. Retorna False si no alcanzó."""
+    # Condicional en una sola sentencia: dos terminales no pueden vender la misma última unidad
+    sentencia = update(Producto).where(Producto.id == producto.id)
+    if delta < 0:
+        sentencia = sentencia.where(Producto.cantidad >= -delta)
+    resultado = db.session.execute(
+        sentencia
+        .values(cantidad=Producto.cantidad + delta)
+        .execution_options(synchronize_session=False)
+    )
+    # El valor en memoria quedó viejo: se recarga al leerlo
+    db.session.expire(producto, ["cantidad"])
+    return resultado.rowcount == 1
 
-    try:
+
+def _agregar_unidad(venta, producto):
+    """Resta una unidad del stock y la suma al detalle del producto.
+
+    Retorna el detalle, o None si ya no había stock.
+    """
+    if not _mover_stock(producto, -1):
+        return None
+
+    # Buscar si ya existe en detalle
+    detalle = VentaDetalle.query.filter_by(
+        venta_id=venta.id,
+        producto_id=producto.id
+    ).first()
+
+    if detalle:
+        detalle.cantidad += 1
+        detalle.subtotal = detalle.cantidad * detalle.precio_unitario
+    else:
         cliente = Cliente.query.get(venta.cliente_id) if venta.cliente_id else None
 
         precio = (
@@ -179,36 +267,89 @@ def agregar_producto():
             else producto.valor_venta
         )
 
-        # Restar stock
-        producto.cantidad -= 1
-
-        # Buscar si ya existe en detalle
-        detalle = VentaDetalle.query.filter_by(
+        detalle = VentaDetalle(
             venta_id=venta.id,
-            producto_id=producto.id
-        ).first()
-
-        if detalle:
-            detalle.cantidad += 1
-            detalle.subtotal = detalle.cantidad * detalle.precio_unitario
-        else:
-            detalle = VentaDetalle(
-                venta_id=venta.id,
-                producto_id=producto.id,
-                cantidad=1,
-                precio_unitario=precio,
-                subtotal=precio
-            )
-            db.session.add(detalle)
-
-        # Recalcular total
-        venta.total = sum(
-            d.subtotal for d in VentaDetalle.query.filter_by(venta_id=venta.id).all()
+            producto_id=producto.id,
+            cantidad=1,
+            precio_unitario=precio,
+            subtotal=precio
         )
+        db.session.add(detalle)
+
+    return detalle
+
+
+def _recalcular_total(venta):
+    venta.total = sum(
+        d.subtotal for d in VentaDetalle.query.filter_by(venta_id=venta.id).all()
+    )
+    publicar_al_confirmar("pestana_actualizada", **datos_pestana(venta))
 
+
+def _cerrar(venta, metodo, efectivo):
+    """Marca la venta como cerrada. Retorna True si ya lo estaba."""
+    ya_cerrada = venta.estado == "cerrada"
+
+    venta.estado = "cerrada"
+    venta.tipo_pago = metodo
+
+    venta.detalle_pago = json.dumps({
+        "metodo": metodo,
+        "recibido": efectivo,
+        "cambio": efectivo - venta.total if efectivo > 0 else 0
+    })
+
+    # Liberar mesa (una venta ya cerrada no la tiene: podría ser de otra pestaña)
+    if not ya_cerrada:
+        liberar_mesa(venta.mesa_id)
+        publicar_al_confirmar("pestana_cerrada", venta_id=venta.id, mesa_id=venta.mesa_id, motivo="cerrada")
+
+    # Acumulados del cliente (solo la primera vez que se cierra)
+    if venta.cliente_id and not ya_cerrada:
+        registrar_venta_cliente(venta)
+
+    return ya_cerrada
+
+# =========================================================
+# AGREGAR PRODUCTO A LA VENTA
+# =========================================================
+
+@ventas_bp.route("/agregar_producto", methods=["POST"])
+@login_required
+@idempotente
+def agregar_producto():
+    data = request.get_json()
+
+    venta = Venta.query.get_or_404(data.get("venta_id"))
+    producto = Producto.query.get_or_404(data.get("producto_id"))
+
+    if producto.cantidad <= 0:
+        return jsonify({"success": False, "message": "Sin stock disponible"}), 400
+
+    try:
+        detalle = _agregar_unidad(venta, producto)
+        if detalle is None:
+            db.session.rollback()
+            return jsonify({"success": False, "message": "Sin stock disponible"}), 400
+        _recalcular_total(venta)
         db.session.commit()
 
-        return jsonify({"success": True, "nuevo_total": venta.total})
+        if producto.cantidad <= 0:
+            registrar_producto_agotado()
+
+        # La terminal actualiza la fila sin recargar la página
+        return jsonify({
+            "success": True,
+            "nuevo_total": venta.total,
+            "detalle": {
+                "id": detalle.id,
+                "producto_id": producto.id,
+                "nombre": producto.nombre,
+                "cantidad": detalle.cantidad,
+                "precio_unitario": detalle.precio_unitario,
+                "subtotal": detalle.subtotal
+            }
+        })
 
     except Exception as e:
         db.session.rollback()
@@ -239,13 +380,12 @@ def actualizar_cantidad():
         detalle.cantidad = nueva_cantidad
         detalle.subtotal = nueva_cantidad * detalle.precio_unitario
 
-        # Recalcular total
-        venta.total = sum(
-            d.subtotal for d in VentaDetalle.query.filter_by(venta_id=venta.id).all()
-        )
-
+        _recalcular_total(venta)
         db.session.commit()
 
+        if diferencia > 0 and producto.cantidad <= 0:
+            registrar_producto_agotado()
+
         return jsonify({
             "success": True,
             "nuevo_total": venta.total,
@@ -276,11 +416,7 @@ def eliminar_producto():
         # Eliminar detalle
         db.session.delete(detalle)
 
-        # Recalcular total
-        venta.total = sum(
-            d.subtotal for d in VentaDetalle.query.filter_by(venta_id=venta.id).all()
-        )
-
+        _recalcular_total(venta)
         db.session.commit()
 
         return jsonify({"success": True, "nuevo_total": venta.total})
@@ -295,6 +431,7 @@ def eliminar_producto():
 
 @ventas_bp.route("/cerrar_venta", methods=["POST"])
 @login_required
+@idempotente
 def cerrar_venta():
     data = request.get_json()
 
@@ -304,23 +441,12 @@ def cerrar_venta():
     efectivo = float(data.get("pago_efectivo", 0))
 
     try:
-        venta.estado = "cerrada"
-        venta.tipo_pago = metodo
-
-        venta.detalle_pago = json.dumps({
-            "metodo": metodo,
-            "recibido": efectivo,
-            "cambio": efectivo - venta.total if efectivo > 0 else 0
-        })
-
-        # Liberar mesa
-        if venta.mesa_id:
-            mesa = Mesa.query.get(venta.mesa_id)
-            if mesa:
-                mesa.estado = "libre"
-
+        ya_cerrada = _cerrar(venta, metodo, efectivo)
         db.session.commit()
 
+        if not ya_cerrada:
+            registrar_venta_cerrada(venta.total)
+
         return jsonify({
             "success": True,
             "redirect_url": url_for("ventas.ver_ticket", venta_id=venta.id)
@@ -330,6 +456,215 @@ def cerrar_venta():
         db.session.rollback()
         return jsonify({"success": False, "message": str(e)}), 500
 
+# =========================================================
+# SINCRONIZACIÓN DE TERMINALES SIN CONEXIÓN
+# =========================================================
+# Sin red, la terminal guarda escaneos, cambios de cantidad y cierres en
+# una cola local con un id y una marca de tiempo por operación. Al volver
+# la conexión envía toda la cola en una sola petición: se aplica en orden,
+# una transacción por venta, y cada operación vuelve como 'aplicada',
+# 'rechazada' (con el motivo del conflicto) o 'error' (reintentar).
+# El id de cada operación se recuerda en el cache: reenviar la misma cola
+# tras perder la respuesta no repite nada.
+SINCRONIZAR_MAX_OPERACIONES = 500
+TIPOS_OPERACION = ("agregar", "cantidad", "eliminar", "cerrar")
+
+# Si el envío en línea falló sin respuesta, la terminal encola la operación
+# con la misma clave de idempotencia: si sí se aplicó, no se repite
+RUTA_EQUIVALENTE = {"agregar": "ventas.agregar_producto", "cerrar": "ventas.cerrar_venta"}
+
+
+def _validar_operacion(op):
+    """Copia normalizada de una operación de la cola, o None si no se puede aplicar."""
+    try:
+        limpia = {
+            "id": op["id"],
+            "tipo": op["tipo"],
+            "venta_id": int(op["venta_id"]),
+            "ts": float(op.get("ts") or 0),
+        }
+        if limpia["tipo"] not in TIPOS_OPERACION or not math.isfinite(limpia["ts"]):
+            return None
+        if limpia["tipo"] == "cerrar":
+            limpia["metodo_pago"] = str(op.get("metodo_pago") or "EFECTIVO")
+            limpia["pago_efectivo"] = float(op.get("pago_efectivo") or 0)
+            if not math.isfinite(limpia["pago_efectivo"]):
+                return None
+        else:
+            limpia["producto_id"] = int(op["producto_id"])
+        if limpia["tipo"] == "cantidad":
+            limpia["cantidad"] = int(op.get("cantidad") or 0)
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None
+    return limpia
+
+
+def _aplicar_operacion(venta, op, agotados):
+    """Aplica una operación sobre la venta. Retorna None o el motivo del rechazo."""
+    if venta is None:
+        return "venta_eliminada"
+    if venta.estado != "abierta":
+        return "venta_cerrada"
+
+    tipo = op["tipo"]
+
+    if tipo == "cerrar":
+        _recalcular_total(venta)
+        if not venta.total:
+            return "venta_vacia"
+        _cerrar(venta, op["metodo_pago"], op["pago_efectivo"])
+        return None
+
+    producto = Producto.query.get(op["producto_id"])
+    if producto is None:
+        return "producto_inexistente"
+
+    detalle = VentaDetalle.query.filter_by(venta_id=venta.id, producto_id=producto.id).first()
+
+    if tipo == "agregar":
+        if _agregar_unidad(venta, producto) is None:
+            return "sin_stock"
+    elif tipo == "cantidad":
+        nueva_cantidad = op["cantidad"]
+        if nueva_cantidad < 1:
+            return "cantidad_invalida"
+        if detalle is None:
+            return "no_esta_en_venta"
+        diferencia = nueva_cantidad - detalle.cantidad
+        if diferencia and not _mover_stock(producto, -diferencia):
+            return "sin_stock"
+        detalle.cantidad = nueva_cantidad
+        detalle.subtotal = nueva_cantidad * detalle.precio_unitario
+    elif detalle is not None:
+        # eliminar: si ya no está, el resultado es el mismo
+        _mover_stock(producto, detalle.cantidad)
+        db.session.delete(detalle)
+        db.session.flush()
+
+    if producto.cantidad <= 0:
+        agotados.add(producto.id)
+    _recalcular_total(venta)
+    return None
+
+
+def _sincronizar_venta(venta_id, operaciones):
+    """Aplica las operaciones de una venta en una transacción. Retorna {op_id: resultado}."""
+    resultados = {}
+    pendientes = []
+    for op in operaciones:
+        if op["tipo"] in RUTA_EQUIVALENTE:
+            en_linea = cache_obtener(f"idem:{current_user.get_id()}:{RUTA_EQUIVALENTE[op['tipo']]}:{op['id']}")
+            if en_linea:
+                if en_linea["estado"] != "listo":
+                    resultados[op["id"]] = {"estado": "en_proceso"}
+                elif en_linea["status"] < 400:
+                    resultados[op["id"]] = {"estado": "aplicada"}
+                else:
+                    motivo = json.loads(en_linea["cuerpo"]).get("message", "rechazada")
+                    resultados[op["id"]] = {"estado": "rechazada", "motivo": motivo}
+                continue
+
+        clave = f"sync:{current_user.get_id()}:{op['id']}"
+        if not cache_agregar(clave, {"estado": "en_proceso"}, TTL_EN_CURSO):
+            # Ya aplicada en un envío anterior (o en curso en otra petición)
+            resultados[op["id"]] = cache_obtener(clave) or {"estado": "en_proceso"}
+            continue
+        pendientes.append((clave, op))
+
+    if not pendientes:
+        return resultados
+
+    agotados = set()
+    try:
+        # Bloquea la venta (Postgres) para que otra terminal no la cierre a mitad
+        venta = db.session.query(Venta).filter(Venta.id == venta_id).with_for_update().first()
+        cerrada_antes = venta is not None and venta.estado == "cerrada"
+
+        for clave, op in pendientes:
+            motivo = _aplicar_operacion(venta, op, agotados)
+            resultados[op["id"]] = {"estado": "rechazada", "motivo": motivo} if motivo else {"estado": "aplicada"}
+
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        for clave, op in pendientes:
+            cache_borrar(clave)
+            resultados[op["id"]] = {"estado": "error", "motivo": str(e)}
+        return resultados
+
+    for clave, op in pendientes:
+        cache_guardar(clave, resultados[op["id"]], IDEMPOTENCIA_TTL)
+
+    for _ in agotados:
+        registrar_producto_agotado()
+    if venta is not None and venta.estado == "cerrada" and not cerrada_antes:
+        registrar_venta_cerrada(venta.total)
+
+    return resultados
+
+
+def _estado_venta(venta_id):
+    """Estado con el que la terminal redibuja la venta tras sincronizar."""
+    venta = Venta.query.get(venta_id)
+    if venta is None:
+        return {"estado": "eliminada"}
+
+    detalles = VentaDetalle.query.filter_by(venta_id=venta.id).all()
+    return {
+        "estado": venta.estado,
+        "total": venta.total,
+        "ticket_url": url_for("ventas.ver_ticket", venta_id=venta.id) if venta.estado == "cerrada" else None,
+        "detalles": [
+            {
+                "id": d.id,
+                "producto_id": d.producto_id,
+                "nombre": d.producto.nombre if d.producto else "",
+                "cantidad": d.cantidad,
+                "precio_unitario": d.precio_unitario,
+                "subtotal": d.subtotal
+            }
+            for d in detalles
+        ]
+    }
+
+
+@ventas_bp.route("/sincronizar", methods=["POST"])
+@login_required
+def sincronizar():
+    datos = request.get_json(silent=True)
+    operaciones = datos.get("operaciones") if isinstance(datos, dict) else None
+    if not isinstance(operaciones, list):
+        operaciones = []
+
+    if len(operaciones) > SINCRONIZAR_MAX_OPERACIONES:
+        return jsonify({
+            "success": False,
+            "message": f"Máximo {SINCRONIZAR_MAX_OPERACIONES} operaciones por envío"
+        }), 413
+
+    resultados = {}
+    por_venta = {}
+    for posicion, op in enumerate(operaciones):
+        # Sin un id usable no hay cómo reportarla a la terminal
+        if not isinstance(op, dict) or not isinstance(op.get("id"), (str, int)) or op["id"] == "":
+            continue
+        op = dict(op, id=str(op["id"])[:100])
+        limpia = _validar_operacion(op)
+        if limpia is None:
+            resultados[op["id"]] = {"estado": "rechazada", "motivo": "operacion_invalida"}
+            continue
+        por_venta.setdefault(limpia["venta_id"], []).append((limpia["ts"], posicion, limpia))
+
+    ventas = {}
+    for venta_id, lista in por_venta.items():
+        # Orden en que ocurrieron en la terminal; el de la cola desempata
+        lista.sort(key=lambda t: (t[0], t[1]))
+        resultados.update(_sincronizar_venta(venta_id, [op for _, _, op in lista]))
+        ventas[venta_id] = _estado_venta(venta_id)
+
+    return jsonify({"success": True, "resultados": resultados, "ventas": ventas})
+
 # =========================================================
 # VER TICKET
 # =========================================================
@@ -337,9 +672,10 @@ def cerrar_venta():
 @ventas_bp.route("/ticket/<int:venta_id>")
 @login_required
 def ver_ticket(venta_id):
-    venta = Venta.query.get_or_404(venta_id)
+    venta, detalles = obtener_venta(venta_id)
+    if venta is None:
+        abort(404)
 
-    detalles = VentaDetalle.query.filter_by(venta_id=venta.id).all()
     pagos = json.loads(venta.detalle_pago) if venta.detalle_pago else {}
 
     return render_template(
@@ -0,0 +1,158 @@
+/* ============================================
+   COLA DE OPERACIONES SIN CONEXIÓN (POS)
+   Guarda en localStorage lo que la terminal no pudo enviar y lo
+   sincroniza por lotes cuando vuelve la red.
+============================================ */
+const ColaOffline = (function () {
+    const CLAVE_COLA = "sanroque_cola_operaciones";
+    const CLAVE_CATALOGO = "sanroque_catalogo";
+    // Igual que SINCRONIZAR_MAX_OPERACIONES en routes/ventas.py
+    const LOTE_MAXIMO = 500;
+    // Una operación que falla en el servidor tantas veces se descarta y se avisa
+    const MAX_INTENTOS = 5;
+
+    let urlSincronizar = null;
+    let urlCatalogo = null;
+    let alSincronizar = () => {};
+    let enviando = false;
+
+    function nuevoId() {
+        return window.crypto && crypto.randomUUID ? crypto.randomUUID() : Date.now() + "-" + Math.random();
+    }
+
+    function leer(clave, defecto) {
+        try {
+            return JSON.parse(localStorage.getItem(clave)) || defecto;
+        } catch (e) {
+            return defecto;
+        }
+    }
+
+    function operaciones() {
+        return leer(CLAVE_COLA, []);
+    }
+
+    function guardar(lista) {
+        localStorage.setItem(CLAVE_COLA, JSON.stringify(lista));
+    }
+
+    function pendientes(ventaId) {
+        return operaciones().filter(op => ventaId === undefined || op.venta_id === ventaId);
+    }
+
+    // Con operaciones en cola, las nuevas también se encolan: el orden se respeta
+    function debeEncolar() {
+        return !navigator.onLine || operaciones().length > 0;
+    }
+
+    function encolar(op) {
+        const lista = operaciones();
+        op.id = op.id || nuevoId();
+        op.ts = op.ts || Date.now();
+        lista.push(op);
+        guardar(lista);
+        return op;
+    }
+
+    /* Envía un lote (las más antiguas primero); quita lo aplicado o rechazado y deja lo demás */
+    function enviarLote() {
+        const lote = operaciones().slice(0, LOTE_MAXIMO);
+        if (!lote.length) return Promise.resolve(null);
+
+        return fetch(urlSincronizar, {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify({operaciones: lote})
+        })
+        .then(res => res.ok ? res.json() : null)
+        .then(datos => {
+            if (!datos || !datos.success) return null;
+
+            const terminadas = new Set();
+            const fallidas = new Set();
+            const rechazadas = [];
+            Object.entries(datos.resultados).forEach(([id, r]) => {
+                if (r.estado === "aplicada" || r.estado === "rechazada") terminadas.add(id);
+                if (r.estado === "rechazada") {
+                    rechazadas.push(Object.assign({}, lote.find(op => op.id === id), {motivo: r.motivo}));
+                }
+                if (r.estado === "error") fallidas.add(id);
+            });
+
+            // Lo encolado mientras se enviaba sigue en la cola
+            const cola = operaciones();
+            const restantes = [];
+            cola.forEach(op => {
+                if (terminadas.has(op.id)) return;
+                if (fallidas.has(op.id)) {
+                    op.intentos = (op.intentos || 0) + 1;
+                    if (op.intentos >= MAX_INTENTOS) {
+                        rechazadas.push(Object.assign({}, op, {motivo: "error"}));
+                        return;
+                    }
+                }
+                restantes.push(op);
+            });
+            guardar(restantes);
+
+            alSincronizar(datos.ventas, rechazadas);
+            // Un lote lleno que avanzó: puede quedar más cola detrás
+            return {datos: datos, seguir: lote.length === LOTE_MAXIMO && restantes.length < cola.length};
+        });
+    }
+
+    /* Envía la cola por lotes hasta vaciarla o hasta que un lote no avance */
+    function sincronizar() {
+        if (enviando || !operaciones().length || !urlSincronizar) return Promise.resolve(null);
+        enviando = true;
+
+        let ultimo = null;
+        const siguiente = () => enviarLote().then(r => {
+            if (!r) return ultimo;
+            ultimo = r.datos;
+            return r.seguir ? siguiente() : ultimo;
+        });
+
+        return siguiente()
+        .catch(() => null)
+        .finally(() => { enviando = false; });
+    }
+
+    /* Catálogo local para escanear sin red (se revalida con ETag) */
+    function actualizarCatalogo() {
+        if (!urlCatalogo || !navigator.onLine) return;
+        fetch(urlCatalogo)
+        .then(res => res.ok ? res.json() : null)
+        .then(datos => {
+            if (!datos) return;
+            const mapa = {};
+            datos.productos.forEach(([codigo, id, nombre, precio, stock]) => {
+                mapa[codigo] = {producto_id: id, nombre: nombre, precio: precio, stock: stock};
+            });
+            try {
+                localStorage.setItem(CLAVE_CATALOGO, JSON.stringify(mapa));
+            } catch (e) {
+                // Sin espacio: se sigue funcionando sin catálogo local
+            }
+        })
+        .catch(() => {});
+    }
+
+    function buscarEnCatalogo(codigo) {
+        return leer(CLAVE_CATALOGO, {})[codigo] || null;
+    }
+
+    function iniciar(opciones) {
+        urlSincronizar = opciones.urlSincronizar;
+        urlCatalogo = opciones.urlCatalogo;
+        alSincronizar = opciones.alSincronizar || alSincronizar;
+
+        window.addEventListener("online", sincronizar);
+        setInterval(() => { if (navigator.onLine) sincronizar(); }, 15000);
+
+        actualizarCatalogo();
+        sincronizar();
+    }
+
+    return {iniciar, encolar, debeEncolar, pendientes, sincronizar, buscarEnCatalogo, nuevoId};
+})();
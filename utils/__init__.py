@@ -2,10 +2,8 @@ import os
 import json
 import base64
 import pytz
-import barcode
 from io import BytesIO
 from datetime import datetime, date, timedelta, time
-from barcode.writer import ImageWriter
 from database import db
 from .time_utils import (
     obtener_hora_colombia,
@@ -41,6 +39,8 @@ def obtener_rango_turno_por_fecha_comercial(fecha_comercial):
 def generar_barcode_base64(codigo):
     if not codigo: return ""
     try:
+        import barcode
+        from barcode.writer import ImageWriter
         code128 = barcode.get_barcode_class('code128')
         instance = code128(str(codigo), writer=ImageWriter())
         buffer = BytesIO()
@@ -0,0 +1,150 @@
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select, union_all, DateTime
+
+from database import db
+
+# ======================================================
+# ARCHIVO DE VENTAS (TABLAS CALIENTES / FRÍAS)
+# ======================================================
+# Las ventas cerradas más viejas que ARCHIVO_VENTAS_DIAS pasan, con sus
+# detalles y su detalle de pago, a ventas_archivo/venta_detalles_archivo.
+# Así 'ventas' y 'venta_detalles' solo guardan el turno en curso y los
+# meses recientes, que es lo que leen la caja y los reportes del día.
+#
+# - Los acumulados (cierres_caja, clientes_resumen) no se tocan.
+# - Los reportes históricos leen con tabla_ventas()/tabla_detalles(),
+#   que unen ambas tablas.
+# - El archivado va por lotes: cada lote es una transacción corta
+#   (copiar, borrar, commit), así que se puede correr con el local abierto.
+ARCHIVO_VENTAS_DIAS = int(os.getenv("ARCHIVO_VENTAS_DIAS", "180"))
+ARCHIVO_VENTAS_LOTE = int(os.getenv("ARCHIVO_VENTAS_LOTE", "2000"))
+
+# Reportes y gráfico de 7 días leen solo las tablas calientes
+DIAS_MINIMOS = 8
+
+COLUMNAS_VENTA = (
+    "id", "fecha", "total", "estado", "nombre_cliente", "metodo_pago",
+    "pago_efectivo", "cambio", "detalle_pago", "mesa_id", "usuario_id", "cliente_id",
+)
+COLUMNAS_DETALLE = ("id", "venta_id", "producto_id", "cantidad", "precio_unitario", "subtotal")
+
+
+# --------------------------------------------------
+# LECTURA UNIFICADA
+# --------------------------------------------------
+def tabla_ventas():
+    """Subconsulta con las ventas calientes y archivadas (mismas columnas que Venta)."""
+    from models import Venta, VentaArchivada
+
+    caliente = Venta.__table__.c
+    fria = VentaArchivada.__table__.c
+    return union_all(
+        select(*(caliente[n] for n in COLUMNAS_VENTA)),
+        select(*(fria[n] for n in COLUMNAS_VENTA)),
+    ).subquery("ventas_todas")
+
+
+def tabla_detalles():
+    """Subconsulta con los detalles calientes y archivados (mismas columnas que VentaDetalle)."""
+    from models import VentaDetalle, VentaDetalleArchivada
+
+    caliente = VentaDetalle.__table__.c
+    fria = VentaDetalleArchivada.__table__.c
+    return union_all(
+        select(*(caliente[n] for n in COLUMNAS_DETALLE)),
+        select(*(fria[n] for n in COLUMNAS_DETALLE)),
+    ).subquery("detalles_todos")
+
+
+def obtener_venta(venta_id):
+    """Retorna (venta, detalles) buscando primero en la tabla caliente, o (None, [])."""
+    from models import Venta, VentaDetalle, VentaArchivada
+
+    venta = db.session.get(Venta, venta_id)
+    if venta is not None:
+        return venta, VentaDetalle.query.filter_by(venta_id=venta.id).all()
+
+    archivada = db.session.get(VentaArchivada, venta_id)
+    if archivada is not None:
+        return archivada, list(archivada.detalles)
+    return None, []
+
+
+# --------------------------------------------------
+# ARCHIVADO POR LOTES
+# --------------------------------------------------
+def fecha_corte(dias=ARCHIVO_VENTAS_DIAS):
+    return datetime.utcnow() - timedelta(days=max(dias, DIAS_MINIMOS))
+
+
+def contar_archivables(dias=ARCHIVO_VENTAS_DIAS):
+    from models import Venta
+
+    return db.session.execute(
+        select(func.count(Venta.id)).where(Venta.estado == "cerrada", Venta.fecha < fecha_corte(dias))
+    ).scalar()
+
+
+def archivar_lote(ids, ahora=None):
+    """Copia las ventas indicadas (y sus detalles) al archivo y las borra de las calientes. No hace commit."""
+    from models import Venta, VentaDetalle, VentaArchivada, VentaDetalleArchivada
+
+    ahora = ahora or datetime.utcnow()
+    ventas = Venta.__table__
+    detalles = VentaDetalle.__table__
+
+    db.session.execute(
+        insert(VentaArchivada.__table__).from_select(
+            list(COLUMNAS_VENTA) + ["archivada_en"],
+            select(*(ventas.c[n] for n in COLUMNAS_VENTA), literal(ahora, DateTime))
+            .where(ventas.c.id.in_(ids))
+        )
+    )
+    db.session.execute(
+        insert(VentaDetalleArchivada.__table__).from_select(
+            list(COLUMNAS_DETALLE),
+            select(*(detalles.c[n] for n in COLUMNAS_DETALLE)).where(detalles.c.venta_id.in_(ids))
+        )
+    )
+    movidos = db.session.execute(delete(detalles).where(detalles.c.venta_id.in_(ids))).rowcount
+    db.session.execute(delete(ventas).where(ventas.c.id.in_(ids)))
+    return movidos
+
+
+def archivar_ventas(dias=ARCHIVO_VENTAS_DIAS, lote=ARCHIVO_VENTAS_LOTE, maximo=None, al_avanzar=None):
+    """
+    Mueve al archivo las ventas cerradas anteriores al corte, en lotes de
+    `lote` ventas con un commit por lote. `maximo` limita cuántas ventas
+    mover en esta corrida; `al_avanzar(ventas, detalles)` se llama tras
+    cada lote. Retorna (ventas, detalles) archivados.
+    """
+    from models import Venta
+
+    corte = fecha_corte(dias)
+    total_ventas = total_detalles = 0
+
+    while maximo is None or total_ventas < maximo:
+        tamano = lote if maximo is None else min(lote, maximo - total_ventas)
+        ids = db.session.execute(
+            select(Venta.id)
+            .where(Venta.estado == "cerrada", Venta.fecha < corte)
+            .order_by(Venta.id)
+            .limit(tamano)
+        ).scalars().all()
+        if not ids:
+            break
+
+        try:
+            total_detalles += archivar_lote(ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        total_ventas += len(ids)
+        if al_avanzar:
+            al_avanzar(total_ventas, total_detalles)
+
+    return total_ventas, total_detalles
@@ -0,0 +1,400 @@
+import logging
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from config import basedir
+from utils.metricas import registrar_cache
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# ======================================================
+# CACHE COMPARTIDO ENTRE WORKERS
+# ======================================================
+# Cada entrada guarda su valor junto con la versión de sus etiquetas al
+# momento de guardarse. Invalidar una etiqueta solo sube su versión: las
+# entradas viejas dejan de valer sin tener que buscarlas ni borrarlas.
+#
+# Backends (CACHE_BACKEND):
+#   sqlite  - archivo local compartido por todos los workers de la máquina (defecto)
+#   memoria - LRU dentro del proceso (cada worker tiene el suyo)
+#   redis   - CACHE_REDIS_URL, para varias máquinas (requiere el paquete redis)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").lower()
+CACHE_SQLITE_RUTA = os.getenv("CACHE_SQLITE_RUTA", os.path.join(basedir, "instance", "cache.sqlite3"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_MEMORIA_MAX = int(os.getenv("CACHE_MEMORIA_MAX", "2048"))
+CACHE_TTL_DEFECTO = int(os.getenv("CACHE_TTL_DEFECTO", "300"))
+
+# Etiquetas que se invalidan solas al confirmar cambios en cada modelo
+ETIQUETAS_MODELO = {
+    "Producto": ("catalogo",),
+    "Factura": ("proveedores",),
+    "Gasto": ("proveedores",),
+    "Abono": ("proveedores",),
+    "Usuario": ("usuarios",),
+}
+
+# Columnas con etiqueta propia. Cada venta mueve el stock de Producto, y eso
+# no debe tirar las búsquedas del catálogo ni sus ETags: un cambio en estas
+# columnas solo invalida su etiqueta; el resto de columnas usa la del modelo.
+ETIQUETAS_COLUMNA = {
+    "Producto": {"cantidad": ("stock",)},
+}
+
+logger = logging.getLogger("sanroque.cache")
+
+
+# --------------------------------------------------
+# BACKENDS
+# --------------------------------------------------
+class CacheMemoria:
+    """LRU en memoria del proceso."""
+
+    def __init__(self, maximo=CACHE_MEMORIA_MAX):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._versiones = {}
+        self._lock = threading.Lock()
+
+    def leer(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            expira, datos = entrada
+            if expira is not None and expira < time.time():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return datos
+
+    def guardar(self, clave, datos, ttl):
+        expira = time.time() + ttl if ttl else None
+        with self._lock:
+            self._datos[clave] = (expira, datos)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def agregar(self, clave, datos, ttl):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and (entrada[0] is None or entrada[0] >= time.time()):
+                return False
+            self._datos[clave] = (time.time() + ttl if ttl else None, datos)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+            return True
+
+    def borrar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def versiones(self, etiquetas):
+        with self._lock:
+            return {e: self._versiones.get(e, 0) for e in etiquetas}
+
+    def incrementar(self, etiqueta):
+        with self._lock:
+            self._versiones[etiqueta] = self._versiones.get(etiqueta, 0) + 1
+            return self._versiones[etiqueta]
+
+
+class CacheSQLite:
+    """Archivo SQLite local: lo comparten todos los workers de la máquina."""
+
+    ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        clave TEXT PRIMARY KEY,
+        valor BLOB NOT NULL,
+        expira REAL
+    );
+    CREATE TABLE IF NOT EXISTS versiones (
+        etiqueta TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    """
+
+    def __init__(self, ruta=CACHE_SQLITE_RUTA):
+        self.ruta = ruta
+        self._local = threading.local()
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso (los workers nacen con fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.ESQUEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def leer(self, clave):
+        fila = self._conexion().execute(
+            "SELECT valor, expira FROM cache WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila is None or (fila[1] is not None and fila[1] < time.time()):
+            return None
+        return fila[0]
+
+    def guardar(self, clave, datos, ttl):
+        conn = self._conexion()
+        ahora = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)",
+            (clave, sqlite3.Binary(datos), ahora + ttl if ttl else None)
+        )
+        # Limpieza ocasional de entradas vencidas
+        if random.random() < 0.01:
+            conn.execute("DELETE FROM cache WHERE expira < ?", (ahora,))
+
+    def agregar(self, clave, datos, ttl):
+        conn = self._conexion()
+        ahora = time.time()
+        conn.execute("DELETE FROM cache WHERE clave = ? AND expira < ?", (clave, ahora))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO cache (clave, valor, expira) VALUES (?, ?, ?)",
+            (clave, sqlite3.Binary(datos), ahora + ttl if ttl else None)
+        )
+        return cursor.rowcount == 1
+
+    def borrar(self, clave):
+        self._conexion().execute("DELETE FROM cache WHERE clave = ?", (clave,))
+
+    def versiones(self, etiquetas):
+        marcas = ",".join("?" * len(etiquetas))
+        filas = self._conexion().execute(
+            f"SELECT etiqueta, version FROM versiones WHERE etiqueta IN ({marcas})", list(etiquetas)
+        ).fetchall()
+        encontradas = dict(filas)
+        return {e: encontradas.get(e, 0) for e in etiquetas}
+
+    def incrementar(self, etiqueta):
+        conn = self._conexion()
+        conn.execute(
+            "INSERT INTO versiones (etiqueta, version) VALUES (?, 1) "
+            "ON CONFLICT(etiqueta) DO UPDATE SET version = version + 1",
+            (etiqueta,)
+        )
+        return conn.execute("SELECT version FROM versiones WHERE etiqueta = ?", (etiqueta,)).fetchone()[0]
+
+
+class CacheRedis:
+    """Redis compartido (varias máquinas)."""
+
+    PREFIJO = "sanroque:"
+
+    def __init__(self, url=CACHE_REDIS_URL):
+        self.cliente = redis.Redis.from_url(url)
+
+    def leer(self, clave):
+        return self.cliente.get(self.PREFIJO + clave)
+
+    def guardar(self, clave, datos, ttl):
+        self.cliente.set(self.PREFIJO + clave, datos, ex=ttl or None)
+
+    def agregar(self, clave, datos, ttl):
+        return bool(self.cliente.set(self.PREFIJO + clave, datos, ex=ttl or None, nx=True))
+
+    def borrar(self, clave):
+        self.cliente.delete(self.PREFIJO + clave)
+
+    def versiones(self, etiquetas):
+        valores = self.cliente.mget([f"{self.PREFIJO}v:{e}" for e in etiquetas])
+        return {e: int(v or 0) for e, v in zip(etiquetas, valores)}
+
+    def incrementar(self, etiqueta):
+        return self.cliente.incr(f"{self.PREFIJO}v:{etiqueta}")
+
+
+def _crear_backend(nombre):
+    if nombre == "memoria":
+        return CacheMemoria()
+    if nombre == "redis":
+        if redis is not None:
+            return CacheRedis()
+        logger.warning("CACHE_BACKEND=redis pero el paquete redis no está instalado; se usa sqlite")
+    return CacheSQLite()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def obtener_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _crear_backend(CACHE_BACKEND)
+    return _backend
+
+
+def configurar_cache(backend):
+    """Reemplaza el backend (benchmarks o scripts)."""
+    global _backend
+    _backend = backend
+
+
+# --------------------------------------------------
+# API
+# --------------------------------------------------
+_FALTA = object()
+
+
+def cache_obtener(clave, defecto=None):
+    """Valor guardado o `defecto` si no existe, venció o alguna etiqueta cambió."""
+    backend = obtener_backend()
+    try:
+        datos = backend.leer(clave)
+        if datos is None:
+            return defecto
+        valor, versiones = pickle.loads(datos)
+        if versiones and backend.versiones(list(versiones)) != versiones:
+            return defecto
+        return valor
+    except Exception as e:
+        # Un cache caído nunca debe tumbar la petición
+        logger.warning("cache: no se pudo leer %s: %s", clave, e)
+        return defecto
+
+
+def cache_guardar(clave, valor, ttl=CACHE_TTL_DEFECTO, etiquetas=()):
+    backend = obtener_backend()
+    try:
+        versiones = backend.versiones(list(etiquetas)) if etiquetas else {}
+        backend.guardar(clave, pickle.dumps((valor, versiones), pickle.HIGHEST_PROTOCOL), ttl)
+    except Exception as e:
+        logger.warning("cache: no se pudo guardar %s: %s", clave, e)
+
+
+def cache_agregar(clave, valor, ttl=CACHE_TTL_DEFECTO):
+    """Guarda solo si la clave no existe (atómico entre workers). True si la guardó."""
+    backend = obtener_backend()
+    try:
+        return backend.agregar(clave, pickle.dumps((valor, {}), pickle.HIGHEST_PROTOCOL), ttl)
+    except Exception as e:
+        # Sin cache no hay cómo coordinar: se deja pasar la petición
+        logger.warning("cache: no se pudo agregar %s: %s", clave, e)
+        return True
+
+
+def cache_borrar(clave):
+    try:
+        obtener_backend().borrar(clave)
+    except Exception as e:
+        logger.warning("cache: no se pudo borrar %s: %s", clave, e)
+
+
+def memorizar(clave, calcular, ttl=CACHE_TTL_DEFECTO, etiquetas=(), metrica=None):
+    """Devuelve el valor cacheado o lo calcula con `calcular()` y lo guarda."""
+    valor = cache_obtener(clave, _FALTA)
+    if metrica:
+        registrar_cache(metrica, valor is not _FALTA)
+    if valor is _FALTA:
+        valor = calcular()
+        cache_guardar(clave, valor, ttl, etiquetas)
+    return valor
+
+
+def version_etiqueta(etiqueta):
+    """Versión vigente de una etiqueta (sirve como sello para ETags)."""
+    try:
+        return obtener_backend().versiones([etiqueta])[etiqueta]
+    except Exception as e:
+        logger.warning("cache: no se pudo leer la versión de %s: %s", etiqueta, e)
+        return 0
+
+
+def invalidar_etiqueta(*etiquetas):
+    """Invalida de inmediato todas las entradas con esas etiquetas, en todos los workers."""
+    backend = obtener_backend()
+    for etiqueta in etiquetas:
+        try:
+            backend.incrementar(etiqueta)
+        except Exception as e:
+            logger.error("cache: no se pudo invalidar %s: %s", etiqueta, e)
+
+
+def invalidar_al_confirmar(*etiquetas):
+    """Invalida las etiquetas cuando la sesión actual haga commit (no si hace rollback)."""
+    from database import db
+
+    db.session.info.setdefault("cache_etiquetas", set()).update(etiquetas)
+
+
+# --------------------------------------------------
+# INVALIDACIÓN AUTOMÁTICA POR MODELO
+# --------------------------------------------------
+def _marcar(session, nombre_modelo, columnas=None):
+    """Marca las etiquetas a invalidar; `columnas` None significa cualquier columna."""
+    por_columna = ETIQUETAS_COLUMNA.get(nombre_modelo, {})
+    etiquetas = set()
+    if columnas is None:
+        etiquetas.update(ETIQUETAS_MODELO.get(nombre_modelo, ()))
+        for propias in por_columna.values():
+            etiquetas.update(propias)
+    else:
+        for columna in columnas:
+            etiquetas.update(por_columna.get(columna, ETIQUETAS_MODELO.get(nombre_modelo, ())))
+    if etiquetas:
+        session.info.setdefault("cache_etiquetas", set()).update(etiquetas)
+
+
+def _columnas_modificadas(obj):
+    estado = inspect(obj)
+    return [
+        atributo.key for atributo in estado.mapper.column_attrs
+        if estado.attrs[atributo.key].history.has_changes()
+    ]
+
+
+@event.listens_for(Session, "before_flush", propagate=True)
+def _detectar_cambios(session, flush_context, instances):
+    for obj in list(session.new) + list(session.deleted):
+        _marcar(session, type(obj).__name__)
+    for obj in session.dirty:
+        nombre = type(obj).__name__
+        if nombre in ETIQUETAS_COLUMNA:
+            _marcar(session, nombre, _columnas_modificadas(obj))
+        else:
+            _marcar(session, nombre)
+
+
+@event.listens_for(Session, "do_orm_execute", propagate=True)
+def _detectar_sentencias(orm_execute_state):
+    # UPDATE/INSERT/DELETE masivos (session.execute(update(Producto)...)) no pasan por el flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is None:
+            return
+        columnas = None
+        valores = getattr(orm_execute_state.statement, "_values", None)
+        if orm_execute_state.is_update and valores:
+            columnas = [getattr(c, "key", c) for c in valores]
+        _marcar(orm_execute_state.session, mapper.class_.__name__, columnas)
+
+
+@event.listens_for(Session, "after_commit", propagate=True)
+def _invalidar_tras_commit(session):
+    etiquetas = session.info.pop("cache_etiquetas", None)
+    if etiquetas:
+        invalidar_etiqueta(*etiquetas)
+
+
+@event.listens_for(Session, "after_rollback", propagate=True)
+def _limpiar_tras_rollback(session):
+    session.info.pop("cache_etiquetas", None)
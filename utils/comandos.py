@@ -0,0 +1,401 @@
+import functools
+import time
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, exists, func, select, text, update
+from sqlalchemy.exc import OperationalError
+
+from database import db
+
+# ======================================================
+# MANTENIMIENTO DE LA BASE DE DATOS (flask sanroque ...)
+# ======================================================
+# Reemplaza los scripts sueltos (reparar_db.py, crear_admin.py,
+# ver_usuario.py, routes/fix_db.py, routes/limpiar_db.py). Los cambios de
+# esquema van por Alembic (flask db upgrade); aquí solo hay tareas de
+# mantenimiento que se pueden correr con el local abierto:
+#   - Cada comando trabaja en transacciones cortas o en lotes.
+#   - En Postgres nada toma bloqueos exclusivos (VACUUM sin FULL,
+#     REINDEX CONCURRENTLY).
+#   - En SQLite (WAL) las lecturas siguen; las escrituras esperan
+#     busy_timeout mientras dura cada paso.
+sanroque_cli = AppGroup("sanroque", help="Mantenimiento de la base de datos de San Roque.")
+
+LOTE_DEFECTO = 5000
+
+# (tabla hija, columna, tabla padre): filas cuyo padre ya no existe
+RELACIONES_HUERFANAS = (
+    ("venta_detalles", "venta_id", "ventas"),
+    ("venta_detalles_archivo", "venta_id", "ventas_archivo"),
+    ("mesa_items", "mesa_id", "mesas"),
+    ("mesa_items", "producto_id", "productos"),
+    ("credito_items", "credito_id", "creditos"),
+    ("abonos_credito", "credito_id", "creditos"),
+    ("abonos", "factura_id", "facturas"),
+    ("abonos", "gasto_id", "gastos"),
+    ("movimientos_stock", "producto_id", "productos"),
+    ("clientes_resumen", "cliente_id", "clientes"),
+    ("clientes_productos", "cliente_id", "clientes"),
+)
+
+
+def _dialecto():
+    return db.engine.dialect.name
+
+
+def _cronometrado(funcion):
+    """Imprime cuánto tardó el comando."""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            click.echo(f"⏱  {time.perf_counter() - inicio:.2f} s")
+    return envoltura
+
+
+def _autocommit():
+    """Conexión fuera de transacción (VACUUM y REINDEX CONCURRENTLY la exigen)."""
+    return db.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _tablas():
+    return [t for t in db.metadata.sorted_tables if t.name != "alembic_version"]
+
+
+# --------------------------------------------------
+# HUÉRFANOS
+# --------------------------------------------------
+def _condicion_huerfana(hija, columna, padre):
+    return hija.c[columna].isnot(None) & ~exists().where(padre.c.id == hija.c[columna])
+
+
+def contar_huerfanos():
+    """Retorna [(tabla, columna, padre, filas)] con las relaciones rotas."""
+    tablas = db.metadata.tables
+    resultado = []
+    for nombre_hija, columna, nombre_padre in RELACIONES_HUERFANAS:
+        hija, padre = tablas[nombre_hija], tablas[nombre_padre]
+        filas = db.session.execute(
+            select(func.count()).select_from(hija).where(_condicion_huerfana(hija, columna, padre))
+        ).scalar()
+        resultado.append((nombre_hija, columna, nombre_padre, filas))
+    return resultado
+
+
+def borrar_huerfanos(nombre_hija, columna, nombre_padre, lote=LOTE_DEFECTO):
+    """Borra por lotes (un commit por lote) para no retener el bloqueo de escritura. Retorna filas borradas."""
+    tablas = db.metadata.tables
+    hija, padre = tablas[nombre_hija], tablas[nombre_padre]
+    pk = list(hija.primary_key.columns)[0]
+
+    # Alias: el subquery no debe correlacionarse con la tabla del DELETE
+    interna = hija.alias()
+    ids = (
+        select(interna.c[pk.name])
+        .where(_condicion_huerfana(interna, columna, padre))
+        .limit(lote)
+    )
+
+    total = 0
+    while True:
+        borradas = db.session.execute(delete(hija).where(pk.in_(ids))).rowcount
+        db.session.commit()
+        total += borradas
+        if borradas < lote:
+            return total
+
+
+# --------------------------------------------------
+# COMANDOS
+# --------------------------------------------------
+@sanroque_cli.command("optimizar")
+@click.option("--vacuum", is_flag=True, help="Compacta el archivo (SQLite) o limpia filas muertas (Postgres).")
+@_cronometrado
+def optimizar(vacuum):
+    """Actualiza estadísticas del planificador (ANALYZE) y opcionalmente VACUUM."""
+    if _dialecto() == "postgresql":
+        with _autocommit() as conn:
+            conn.execute(text("VACUUM ANALYZE" if vacuum else "ANALYZE"))
+        click.echo("✅ VACUUM ANALYZE" if vacuum else "✅ ANALYZE")
+        return
+
+    with _autocommit() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.execute(text("PRAGMA optimize"))
+        click.echo("✅ ANALYZE + PRAGMA optimize")
+        if vacuum:
+            # VACUUM reescribe el archivo: las ventas esperan (busy_timeout) mientras dura
+            antes = conn.execute(text("PRAGMA page_count")).scalar() * conn.execute(text("PRAGMA page_size")).scalar()
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+            conn.execute(text("VACUUM"))
+            despues = conn.execute(text("PRAGMA page_count")).scalar() * conn.execute(text("PRAGMA page_size")).scalar()
+            click.echo(f"✅ VACUUM: {antes / 1048576:.1f} MB -> {despues / 1048576:.1f} MB")
+
+
+@sanroque_cli.command("reindexar")
+@click.argument("tablas", nargs=-1)
+@_cronometrado
+def reindexar(tablas):
+    """Reconstruye los índices, tabla por tabla (todas si no se indican)."""
+    nombres = tablas or [t.name for t in _tablas()]
+    postgres = _dialecto() == "postgresql"
+    with _autocommit() as conn:
+        for nombre in nombres:
+            inicio = time.perf_counter()
+            if postgres:
+                conn.execute(text(f'REINDEX TABLE CONCURRENTLY "{nombre}"'))
+            else:
+                conn.execute(text(f'REINDEX "{nombre}"'))
+            click.echo(f"  {nombre:<24} {(time.perf_counter() - inicio) * 1000:8.1f} ms")
+
+
+@sanroque_cli.command("verificar")
+@click.option("--completo", is_flag=True, help="SQLite: integrity_check en vez de quick_check (más lento).")
+@_cronometrado
+def verificar(completo):
+    """Revisa la integridad del archivo y las relaciones huérfanas. Sale con código 1 si hay problemas."""
+    problemas = 0
+
+    if _dialecto() == "sqlite":
+        pragma = "integrity_check" if completo else "quick_check"
+        filas = [r[0] for r in db.session.execute(text(f"PRAGMA {pragma}"))]
+        if filas == ["ok"]:
+            click.echo(f"✅ {pragma}: ok")
+        else:
+            problemas += len(filas)
+            click.echo(f"❌ {pragma}:")
+            for fila in filas[:50]:
+                click.echo(f"   {fila}")
+
+    for tabla, columna, padre, filas in contar_huerfanos():
+        if filas:
+            problemas += filas
+            click.echo(f"❌ {tabla}.{columna}: {filas} filas sin {padre}")
+    if not problemas:
+        click.echo("✅ Sin relaciones huérfanas")
+    else:
+        click.echo("👉 Ejecute 'flask sanroque limpiar-huerfanos --aplicar' para borrarlas.")
+
+    db.session.rollback()
+    if problemas:
+        raise SystemExit(1)
+
+
+@sanroque_cli.command("tamanos")
+@_cronometrado
+def tamanos():
+    """Filas y espacio en disco por tabla (índices incluidos cuando el motor lo permite)."""
+    espacio = {}
+    if _dialecto() == "postgresql":
+        espacio = dict(db.session.execute(text(
+            "SELECT relname, pg_total_relation_size(relid) FROM pg_catalog.pg_statio_user_tables"
+        )).all())
+    else:
+        try:
+            # dbstat cuenta por tabla e índice: se suman los índices a su tabla
+            indices = dict(db.session.execute(text(
+                "SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')"
+            )).all())
+            for nombre, bytes_ in db.session.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")):
+                tabla = indices.get(nombre, nombre)
+                espacio[tabla] = espacio.get(tabla, 0) + bytes_
+        except OperationalError:
+            # SQLite compilado sin SQLITE_ENABLE_DBSTAT_VTAB
+            db.session.rollback()
+
+    filas = []
+    for tabla in _tablas():
+        conteo = db.session.execute(select(func.count()).select_from(tabla)).scalar()
+        filas.append((tabla.name, conteo, espacio.get(tabla.name)))
+    db.session.rollback()
+
+    filas.sort(key=lambda f: (f[2] or 0, f[1]), reverse=True)
+    click.echo(f"{'TABLA':<24} {'FILAS':>12} {'MB':>10}")
+    for nombre, conteo, bytes_ in filas:
+        mb = f"{bytes_ / 1048576:.2f}" if bytes_ is not None else "-"
+        click.echo(f"{nombre:<24} {conteo:>12,} {mb:>10}")
+
+
+@sanroque_cli.command("limpiar-huerfanos")
+@click.option("--aplicar", is_flag=True, help="Sin esta opción solo se muestran los conteos.")
+@click.option("--lote", default=LOTE_DEFECTO, show_default=True, help="Filas por DELETE/commit.")
+@_cronometrado
+def limpiar_huerfanos(aplicar, lote):
+    """Borra detalles, ítems, abonos y movimientos cuyo registro padre ya no existe."""
+    pendientes = [h for h in contar_huerfanos() if h[3]]
+    db.session.rollback()
+    if not pendientes:
+        click.echo("✅ Sin relaciones huérfanas")
+        return
+
+    for tabla, columna, padre, filas in pendientes:
+        if not aplicar:
+            click.echo(f"  {tabla}.{columna}: {filas} filas sin {padre}")
+            continue
+        borradas = borrar_huerfanos(tabla, columna, padre, lote=lote)
+        click.echo(f"🗑  {tabla}.{columna}: {borradas} filas borradas")
+
+    if not aplicar:
+        click.echo("👉 Nada se borró. Repita con --aplicar.")
+
+
+@sanroque_cli.command("reconstruir")
+@_cronometrado
+def reconstruir():
+    """Recalcula los datos derivados: resúmenes de clientes, estado de las mesas y cache."""
+    from models import Mesa, Venta
+    from utils.cache import ETIQUETAS_MODELO, invalidar_etiqueta
+    from utils.resumen_clientes import reconstruir_resumenes
+
+    clientes = reconstruir_resumenes()
+    db.session.commit()
+    click.echo(f"✅ Resumen de {clientes} clientes")
+
+    # Una mesa está ocupada si y solo si tiene una pestaña abierta
+    ocupada = exists().where(Venta.mesa_id == Mesa.id, Venta.estado == "abierta")
+    liberadas = db.session.execute(
+        update(Mesa).where(Mesa.estado != "libre", ~ocupada).values(estado="libre")
+    ).rowcount
+    ocupadas = db.session.execute(
+        update(Mesa).where(Mesa.estado != "ocupada", ocupada).values(estado="ocupada")
+    ).rowcount
+    db.session.commit()
+    click.echo(f"✅ Mesas: {liberadas} liberadas, {ocupadas} marcadas como ocupadas")
+
+    etiquetas = sorted({e for grupo in ETIQUETAS_MODELO.values() for e in grupo})
+    invalidar_etiqueta(*etiquetas)
+    click.echo(f"✅ Cache invalidado: {', '.join(etiquetas)}")
+
+
+@sanroque_cli.command("archivar")
+@click.option("--dias", default=None, type=int, help="Antigüedad mínima (por defecto ARCHIVO_VENTAS_DIAS).")
+@click.option("--lote", default=None, type=int, help="Ventas por transacción (por defecto ARCHIVO_VENTAS_LOTE).")
+@click.option("--maximo", default=None, type=int, help="Máximo de ventas a mover en esta corrida.")
+@_cronometrado
+def archivar(dias, lote, maximo):
+    """Mueve las ventas cerradas antiguas (y sus detalles) a las tablas de archivo."""
+    from models import Venta, VentaDetalle
+    from utils.archivo_ventas import ARCHIVO_VENTAS_DIAS, ARCHIVO_VENTAS_LOTE, archivar_ventas, fecha_corte
+
+    dias = ARCHIVO_VENTAS_DIAS if dias is None else dias
+    lote = lote or ARCHIVO_VENTAS_LOTE
+
+    def calientes():
+        return (
+            db.session.execute(select(func.count(Venta.id))).scalar(),
+            db.session.execute(select(func.count(VentaDetalle.id))).scalar(),
+        )
+
+    antes = calientes()
+    db.session.rollback()
+    click.echo(f"Corte: ventas cerradas antes de {fecha_corte(dias):%Y-%m-%d %H:%M} (UTC)")
+
+    def avance(ventas, detalles):
+        click.echo(f"  {ventas:>10,} ventas / {detalles:>10,} detalles archivados")
+
+    ventas, detalles = archivar_ventas(dias=dias, lote=lote, maximo=maximo, al_avanzar=avance)
+    despues = calientes()
+    db.session.rollback()
+
+    click.echo(f"✅ {ventas:,} ventas y {detalles:,} detalles archivados")
+    click.echo(f"   ventas:         {antes[0]:>10,} -> {despues[0]:>10,}")
+    click.echo(f"   venta_detalles: {antes[1]:>10,} -> {despues[1]:>10,}")
+    if ventas and _dialecto() == "sqlite":
+        click.echo("👉 El espacio liberado se reutiliza; 'flask sanroque optimizar --vacuum' lo devuelve al disco.")
+
+
+@sanroque_cli.command("respaldar")
+@click.option("--incremental", is_flag=True, help="Solo lo nuevo desde el último respaldo.")
+@click.option("--jsonl", is_flag=True, help="SQLite: volcado por tabla en vez de copia del archivo.")
+@click.option("--destino", default=None, help="Carpeta de respaldos (por defecto RESPALDOS_DIR).")
+@_cronometrado
+def respaldar(incremental, jsonl, destino):
+    """Respaldo en caliente: las cajas pueden seguir vendiendo."""
+    from utils.respaldos import RESPALDOS_DIR, respaldar as crear_respaldo
+
+    def avance(tabla, filas):
+        click.echo(f"  {tabla:<24} {filas:>10,}")
+
+    manifiesto = crear_respaldo(
+        incremental=incremental, jsonl=jsonl, directorio=destino or RESPALDOS_DIR, al_avanzar=avance
+    )
+    if incremental and manifiesto["tipo"] == "completo":
+        click.echo("⚠️ Sin base incremental válida: se hizo un respaldo completo.")
+    base = f" (base {manifiesto['base']})" if manifiesto["base"] else ""
+    click.echo(f"✅ Respaldo {manifiesto['tipo']} {manifiesto['nombre']}{base}")
+
+
+@sanroque_cli.command("restaurar")
+@click.argument("carpeta", type=click.Path(exists=True, file_okay=False))
+@click.option("--si", is_flag=True, help="No pedir confirmación.")
+@_cronometrado
+def restaurar(carpeta, si):
+    """Reemplaza TODOS los datos por los del respaldo indicado (y su cadena de incrementales)."""
+    from utils.respaldos import cadena_respaldo, restaurar as cargar_respaldo
+
+    cadena = cadena_respaldo(carpeta)
+    click.echo("Cadena: " + " -> ".join(m["nombre"] for _, m in cadena))
+    if not si:
+        click.confirm(f"Se borrarán los datos actuales de {db.engine.url.render_as_string()}. ¿Continuar?", abort=True)
+
+    def avance(respaldo, tabla, filas):
+        if filas:
+            click.echo(f"  {respaldo} {tabla:<24} {filas:>10,}")
+        elif filas is None:
+            click.echo(f"  {respaldo} {tabla} copiado")
+
+    cargar_respaldo(carpeta, al_avanzar=avance)
+
+    from utils.cache import ETIQUETAS_MODELO, invalidar_etiqueta
+    invalidar_etiqueta(*{e for grupo in ETIQUETAS_MODELO.values() for e in grupo})
+    click.echo("✅ Restauración completa")
+
+
+@sanroque_cli.command("crear-admin")
+@click.option("--usuario", default="admin", show_default=True)
+@click.option("--clave", prompt=True, hide_input=True, confirmation_prompt=True)
+@click.option("--nombre", default="Administrador", show_default=True)
+@click.option("--cedula", default="00000000", show_default=True)
+@_cronometrado
+def crear_admin(usuario, clave, nombre, cedula):
+    """Crea un usuario administrador, o le cambia la clave si ya existe."""
+    from models import Usuario
+    from utils.usuarios_cache import marcar_usuario_modificado
+
+    existente = Usuario.query.filter_by(username=usuario).first()
+    if existente:
+        existente.set_password(clave)
+        existente.rol = "Administrador"
+        # Cierra las sesiones abiertas con la clave anterior
+        marcar_usuario_modificado(existente)
+        db.session.commit()
+        click.echo(f"✅ Clave de '{usuario}' actualizada")
+        return
+
+    nuevo = Usuario(username=usuario, nombre=nombre, apellido="", cedula=cedula, rol="Administrador")
+    nuevo.set_password(clave)
+    db.session.add(nuevo)
+    db.session.commit()
+    click.echo(f"✅ Usuario '{usuario}' creado")
+
+
+@sanroque_cli.command("usuarios")
+def usuarios():
+    """Lista los usuarios registrados."""
+    from models import Usuario
+
+    registros = Usuario.query.order_by(Usuario.id).all()
+    if not registros:
+        click.echo("⚠️ No hay usuarios. Ejecute 'flask sanroque crear-admin'.")
+        return
+    click.echo(f"{'ID':>4}  {'USUARIO':<20} {'ROL':<15} NOMBRE")
+    for u in registros:
+        nombre = f"{u.nombre or ''} {u.apellido or ''}".strip()
+        click.echo(f"{u.id:>4}  {u.username:<20} {u.rol or '':<15} {nombre}")
+
+
+def init_comandos(app):
+    app.cli.add_command(sanroque_cli)
@@ -0,0 +1,195 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ======================================================
+# COMPRESIÓN Y ESTÁTICOS CON HUELLA
+# ======================================================
+# - HTML/JSON/CSS/JS por encima de COMPRESION_MINIMA bytes se envían
+#   con brotli (si está instalado) o gzip según Accept-Encoding.
+# - Los CSS/JS/SVG de static/ se precomprimen al arrancar (.gz/.br al
+#   lado del original) y se sirven ya comprimidos.
+# - url_for('static', ...) agrega ?v=<hash del contenido>; con esa huella
+#   el navegador puede guardar el archivo un año sin revalidar.
+COMPRESION_MINIMA = int(os.getenv("COMPRESION_MINIMA", "1024"))
+NIVEL_GZIP = int(os.getenv("COMPRESION_NIVEL_GZIP", "6"))
+CALIDAD_BROTLI = int(os.getenv("COMPRESION_CALIDAD_BROTLI", "4"))
+UN_ANO = 365 * 24 * 3600
+
+TIPOS_COMPRIMIBLES = {
+    "text/html", "text/plain", "text/css", "text/csv",
+    "application/json", "application/javascript", "text/javascript",
+    "image/svg+xml",
+}
+EXTENSIONES_PRECOMPRIMIBLES = (".css", ".js", ".svg", ".json", ".txt")
+
+# Archivos subidos por usuarios: ni huella ni precompresión
+CARPETAS_SIN_HUELLA = ("uploads/",)
+
+logger = logging.getLogger("sanroque.compresion")
+
+_huellas = {}
+_lock = threading.Lock()
+
+
+def _codificaciones_disponibles():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _elegir_codificacion():
+    aceptadas = request.accept_encodings
+    for codificacion in _codificaciones_disponibles():
+        if aceptadas[codificacion]:
+            return codificacion
+    return None
+
+
+def _comprimir(datos, codificacion):
+    if codificacion == "br":
+        return brotli.compress(datos, quality=CALIDAD_BROTLI)
+    return gzip.compress(datos, compresslevel=NIVEL_GZIP)
+
+
+# --------------------------------------------------
+# HUELLA DE ESTÁTICOS
+# --------------------------------------------------
+def huella_estatico(app, filename):
+    """Hash corto del contenido del archivo (se recalcula si cambia su mtime)."""
+    if filename.startswith(CARPETAS_SIN_HUELLA):
+        return None
+    ruta = safe_join(app.static_folder, filename)
+    if not ruta:
+        return None
+    try:
+        mtime = os.stat(ruta).st_mtime
+    except OSError:
+        return None
+
+    with _lock:
+        guardada = _huellas.get(ruta)
+    if guardada and guardada[0] == mtime:
+        return guardada[1]
+
+    with open(ruta, "rb") as archivo:
+        huella = hashlib.md5(archivo.read()).hexdigest()[:12]
+    with _lock:
+        _huellas[ruta] = (mtime, huella)
+    return huella
+
+
+def precomprimir_estaticos(app):
+    """Genera .gz (y .br si hay brotli) de los estáticos de texto. Retorna cuántos escribió."""
+    escritos = 0
+    for raiz, carpetas, archivos in os.walk(app.static_folder):
+        carpetas[:] = [c for c in carpetas if c != "uploads"]
+        for nombre in archivos:
+            if not nombre.endswith(EXTENSIONES_PRECOMPRIMIBLES):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            if os.path.getsize(ruta) < COMPRESION_MINIMA:
+                continue
+            with open(ruta, "rb") as archivo:
+                datos = None
+                for codificacion, extension in (("gzip", ".gz"), ("br", ".br")):
+                    if codificacion not in _codificaciones_disponibles():
+                        continue
+                    destino = ruta + extension
+                    if os.path.exists(destino) and os.path.getmtime(destino) >= os.path.getmtime(ruta):
+                        continue
+                    if datos is None:
+                        datos = archivo.read()
+                    # Máxima compresión: se hace una sola vez, no por petición
+                    if codificacion == "br":
+                        comprimido = brotli.compress(datos, quality=11)
+                    else:
+                        comprimido = gzip.compress(datos, compresslevel=9, mtime=0)
+                    with open(destino, "wb") as salida:
+                        salida.write(comprimido)
+                    escritos += 1
+    return escritos
+
+
+# --------------------------------------------------
+# INTEGRACIÓN CON FLASK
+# --------------------------------------------------
+def init_compresion(app):
+    """
+    Registrar antes que los demás hooks: los after_request corren en
+    orden inverso y la compresión debe ser lo último.
+    """
+    try:
+        precomprimir_estaticos(app)
+    except OSError as e:
+        # Sistema de archivos de solo lectura: se sirven sin precomprimir
+        logger.warning("No se pudieron precomprimir los estáticos: %s", e)
+
+    @app.url_defaults
+    def _agregar_huella(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            huella = huella_estatico(app, values["filename"])
+            if huella:
+                values["v"] = huella
+
+    def servir_estatico(filename):
+        codificacion = None
+        if not filename.startswith(CARPETAS_SIN_HUELLA):
+            codificacion = _elegir_codificacion()
+
+        response = None
+        if codificacion:
+            extension = ".br" if codificacion == "br" else ".gz"
+            ruta = safe_join(app.static_folder, filename + extension)
+            if ruta and os.path.isfile(ruta):
+                tipo = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                response = send_from_directory(app.static_folder, filename + extension, mimetype=tipo)
+                response.headers["Content-Encoding"] = codificacion
+
+        if response is None:
+            response = app.send_static_file(filename)
+
+        response.vary.add("Accept-Encoding")
+        version = request.args.get("v")
+        if version and version == huella_estatico(app, filename):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = UN_ANO
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions["static"] = servir_estatico
+
+    @app.after_request
+    def _comprimir_respuesta(response):
+        if (
+            request.method == "HEAD"
+            or response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in TIPOS_COMPRIMIBLES
+        ):
+            return response
+
+        datos = response.get_data()
+        if len(datos) < COMPRESION_MINIMA:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        codificacion = _elegir_codificacion()
+        if not codificacion:
+            return response
+
+        response.set_data(_comprimir(datos, codificacion))
+        response.headers["Content-Encoding"] = codificacion
+        return response
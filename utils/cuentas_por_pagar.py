@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+import os
+
+from sqlalchemy import func, case, literal, select, union_all
+
+from database import db
+from utils.cache import memorizar, invalidar_etiqueta
+from utils.time_utils import fecha_colombia_string
+
+# ======================================================
+# CUENTAS POR PAGAR (PROVEEDORES)
+# ======================================================
+# Las facturas no guardan fecha de vencimiento, así que se asume
+# un plazo fijo de pago (por defecto 30 días) desde la fecha de la factura.
+PLAZO_PAGO_DIAS = int(os.getenv("PLAZO_PAGO_PROVEEDORES_DIAS", "30"))
+SEMANAS_PROYECCION = 8
+
+# Rangos de antigüedad en días: (etiqueta, desde, hasta)
+RANGOS_ANTIGUEDAD = [
+    ("0_30", 0, 30),
+    ("31_60", 31, 60),
+    ("61_90", 61, 90),
+    ("mas_90", 91, None),
+]
+
+# Las facturas, gastos y abonos invalidan la etiqueta "proveedores" al
+# confirmarse (utils/cache.py); el TTL solo limita la antigüedad de los
+# rangos de días.
+CACHE_TTL_SEGUNDOS = 300
+
+
+def invalidar_cuentas_por_pagar():
+    """Marca el resumen como desactualizado."""
+    invalidar_etiqueta("proveedores")
+
+
+def _documentos_con_saldo():
+    """Subconsulta (acreedor, fecha, saldo) de facturas y gastos con abonos agrupados."""
+    from models import Factura, Gasto, Abono
+
+    abonos_factura = (
+        select(Abono.factura_id.label("doc_id"), func.sum(Abono.monto).label("abonado"))
+        .where(Abono.factura_id.isnot(None))
+        .group_by(Abono.factura_id)
+        .subquery()
+    )
+    abonos_gasto = (
+        select(Abono.gasto_id.label("doc_id"), func.sum(Abono.monto).label("abonado"))
+        .where(Abono.gasto_id.isnot(None))
+        .group_by(Abono.gasto_id)
+        .subquery()
+    )
+
+    saldo_factura = func.coalesce(Factura.total, 0) - func.coalesce(abonos_factura.c.abonado, 0)
+    saldo_gasto = func.coalesce(Gasto.total, 0) - func.coalesce(abonos_gasto.c.abonado, 0)
+
+    facturas = (
+        select(
+            Factura.proveedor.label("acreedor"),
+            Factura.fecha.label("fecha"),
+            saldo_factura.label("saldo"),
+        )
+        .outerjoin(abonos_factura, abonos_factura.c.doc_id == Factura.id)
+        .where(saldo_factura > 0)
+    )
+    gastos = (
+        select(
+            (literal("GASTO: ") + Gasto.categoria).label("acreedor"),
+            Gasto.fecha.label("fecha"),
+            saldo_gasto.label("saldo"),
+        )
+        .outerjoin(abonos_gasto, abonos_gasto.c.doc_id == Gasto.id)
+        .where(saldo_gasto > 0)
+    )
+
+    return union_all(facturas, gastos).subquery("documentos")
+
+
+def _calcular_resumen(ahora):
+    # 'ahora' va en UTC sin zona, igual que las fechas guardadas (default=datetime.utcnow)
+    docs = _documentos_con_saldo()
+
+    # Antigüedad: los cortes se calculan en Python para no depender
+    # de funciones de fecha propias de SQLite o PostgreSQL.
+    columnas = [
+        docs.c.acreedor,
+        func.count().label("documentos"),
+        func.sum(docs.c.saldo).label("saldo"),
+        func.min(docs.c.fecha).label("mas_antigua"),
+    ]
+    for etiqueta, desde, hasta in RANGOS_ANTIGUEDAD:
+        condicion = docs.c.fecha <= ahora - timedelta(days=desde)
+        if hasta is not None:
+            condicion = condicion & (docs.c.fecha > ahora - timedelta(days=hasta + 1))
+        columnas.append(func.sum(case((condicion, docs.c.saldo), else_=0)).label(etiqueta))
+
+    # Proyección semanal: un documento vence en fecha + plazo, así que
+    # la semana N agrupa las facturas emitidas en [inicio_N - plazo, fin_N - plazo).
+    # La semana 0 incluye además todo lo ya vencido.
+    inicio_semana = datetime.combine(ahora.date() - timedelta(days=ahora.weekday()), datetime.min.time())
+    plazo = timedelta(days=PLAZO_PAGO_DIAS)
+    semanas = []
+    for n in range(SEMANAS_PROYECCION):
+        desde = inicio_semana + timedelta(weeks=n)
+        hasta = desde + timedelta(weeks=1)
+        condicion = docs.c.fecha < hasta - plazo
+        if n > 0:
+            condicion = condicion & (docs.c.fecha >= desde - plazo)
+        columnas.append(func.sum(case((condicion, docs.c.saldo), else_=0)).label(f"semana_{n}"))
+        semanas.append(desde.date())
+
+    filas = db.session.execute(
+        select(*columnas)
+        .group_by(docs.c.acreedor)
+        .order_by(func.sum(docs.c.saldo).desc())
+    ).all()
+
+    acreedores = []
+    totales = {"saldo": 0.0, "documentos": 0}
+    totales.update({r[0]: 0.0 for r in RANGOS_ANTIGUEDAD})
+    proyeccion = [0.0] * SEMANAS_PROYECCION
+
+    for fila in filas:
+        datos = fila._mapping
+        item = {
+            "acreedor": datos["acreedor"] or "SIN NOMBRE",
+            "documentos": int(datos["documentos"] or 0),
+            "saldo": float(datos["saldo"] or 0),
+            "mas_antigua": datos["mas_antigua"],
+            "semanas": [float(datos[f"semana_{n}"] or 0) for n in range(SEMANAS_PROYECCION)],
+        }
+        for etiqueta, _, _ in RANGOS_ANTIGUEDAD:
+            item[etiqueta] = float(datos[etiqueta] or 0)
+            totales[etiqueta] += item[etiqueta]
+        for n, valor in enumerate(item["semanas"]):
+            proyeccion[n] += valor
+        totales["saldo"] += item["saldo"]
+        totales["documentos"] += item["documentos"]
+        acreedores.append(item)
+
+    return {
+        "acreedores": acreedores,
+        "totales": totales,
+        "semanas": [{"inicio": s, "total": proyeccion[n]} for n, s in enumerate(semanas)],
+        "plazo_dias": PLAZO_PAGO_DIAS,
+        "generado": fecha_colombia_string(ahora),
+    }
+
+
+def obtener_cuentas_por_pagar():
+    """Resumen de cartera con proveedores, cacheado hasta que cambie una factura, gasto o abono."""
+    return memorizar(
+        "cuentas_por_pagar",
+        lambda: _calcular_resumen(datetime.utcnow()),
+        ttl=CACHE_TTL_SEGUNDOS,
+        etiquetas=("proveedores",),
+        metrica="cuentas_por_pagar"
+    )
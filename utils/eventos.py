@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utils.cache import CACHE_SQLITE_RUTA, CACHE_REDIS_URL
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# ======================================================
+# EVENTOS EN VIVO DE MESAS Y PESTAÑAS (SSE)
+# ======================================================
+# Cada cambio en una pestaña (abrir, agregar producto, cerrar, eliminar)
+# publica un evento pequeño tras el commit. Las terminales abiertas lo
+# reciben por /ventas/eventos (Server-Sent Events) y parchean su vista
+# sin recargar la página ni volver a consultar mesas y ventas.
+#
+# Backends (EVENTOS_BACKEND), igual que el cache:
+#   sqlite  - tabla de eventos en el archivo local del cache, que sondea cada worker (defecto)
+#   memoria - solo el proceso actual (un único worker o pruebas)
+#   redis   - stream de Redis, para varias máquinas (requiere el paquete redis)
+#
+# Cada conexión SSE ocupa un hilo de Gunicorn (gthread), así que los flujos
+# duran como máximo SSE_MAX_SEGUNDOS (el navegador se reconecta solo con
+# Last-Event-ID sin perder eventos) y hay un tope de flujos por worker:
+# por defecto GUNICORN_THREADS - 2, para que siempre queden dos hilos a las
+# peticiones del POS. Si el worker ya está lleno, responde 429 y la página
+# reintenta más tarde (Gunicorn no reparte por hilos libres, así que puede
+# tocarle a otro worker). Ver el costo en capacidad en gunicorn.conf.py.
+EVENTOS_BACKEND = os.getenv("EVENTOS_BACKEND", os.getenv("CACHE_BACKEND", "sqlite")).lower()
+EVENTOS_SQLITE_RUTA = os.getenv("EVENTOS_SQLITE_RUTA", CACHE_SQLITE_RUTA)
+EVENTOS_REDIS_URL = os.getenv("EVENTOS_REDIS_URL", CACHE_REDIS_URL)
+EVENTOS_RETENCION_S = int(os.getenv("EVENTOS_RETENCION_S", "900"))
+EVENTOS_SONDEO_S = float(os.getenv("EVENTOS_SONDEO_S", "0.5"))
+SSE_MAX_SEGUNDOS = int(os.getenv("SSE_MAX_SEGUNDOS", "50"))
+SSE_MAX_FLUJOS = int(os.getenv(
+    "SSE_MAX_FLUJOS", str(max(1, int(os.getenv("GUNICORN_THREADS", "4")) - 2))
+))
+
+# Comentario para que proxies (Render) no corten una conexión en silencio
+LATIDO_S = 15
+# Milisegundos que espera el navegador antes de reconectar
+REINTENTO_MS = 2000
+
+logger = logging.getLogger("sanroque.eventos")
+
+
+# --------------------------------------------------
+# BACKENDS
+# --------------------------------------------------
+class EventosMemoria:
+    """Cola circular en memoria; solo la ven los hilos del mismo proceso."""
+
+    def __init__(self, maximo=1000):
+        self._eventos = deque(maxlen=maximo)
+        self._ultimo = 0
+        self._condicion = threading.Condition()
+
+    def publicar(self, tipo, datos):
+        with self._condicion:
+            self._ultimo += 1
+            self._eventos.append((str(self._ultimo), tipo, datos))
+            self._condicion.notify_all()
+            return str(self._ultimo)
+
+    def ultimo_id(self):
+        return str(self._ultimo)
+
+    def _posteriores(self, desde):
+        desde = int(desde)
+        if self._eventos and int(self._eventos[0][0]) > desde + 1:
+            return None
+        return [e for e in self._eventos if int(e[0]) > desde]
+
+    def esperar(self, desde, segundos):
+        with self._condicion:
+            if self._ultimo <= int(desde):
+                self._condicion.wait(segundos)
+            return self._posteriores(desde)
+
+
+class EventosSQLite:
+    """Tabla de eventos en un archivo local que todos los workers sondean."""
+
+    ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS eventos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        datos TEXT NOT NULL,
+        creado REAL NOT NULL
+    );
+    """
+
+    def __init__(self, ruta=EVENTOS_SQLITE_RUTA):
+        self.ruta = ruta
+        self._local = threading.local()
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.ESQUEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def publicar(self, tipo, datos):
+        conn = self._conexion()
+        ahora = time.time()
+        cursor = conn.execute(
+            "INSERT INTO eventos (tipo, datos, creado) VALUES (?, ?, ?)",
+            (tipo, json.dumps(datos), ahora)
+        )
+        # Poda de eventos viejos: ninguna terminal desconectada tanto tiempo los necesita
+        if cursor.lastrowid % 200 == 0:
+            conn.execute("DELETE FROM eventos WHERE creado < ?", (ahora - EVENTOS_RETENCION_S,))
+        return str(cursor.lastrowid)
+
+    def ultimo_id(self):
+        fila = self._conexion().execute("SELECT COALESCE(MAX(id), 0) FROM eventos").fetchone()
+        return str(fila[0])
+
+    def _posteriores(self, desde):
+        conn = self._conexion()
+        filas = conn.execute(
+            "SELECT id, tipo, datos FROM eventos WHERE id > ? ORDER BY id LIMIT 500", (int(desde),)
+        ).fetchall()
+        if filas and filas[0][0] > int(desde) + 1:
+            # Hueco: ¿se podaron eventos que esta terminal no vio?
+            minimo = conn.execute("SELECT MIN(id) FROM eventos").fetchone()[0]
+            if minimo > int(desde) + 1:
+                return None
+        return [(str(i), t, json.loads(d)) for i, t, d in filas]
+
+    def esperar(self, desde, segundos):
+        limite = time.monotonic() + segundos
+        while True:
+            eventos = self._posteriores(desde)
+            if eventos is None or eventos or time.monotonic() >= limite:
+                return eventos
+            time.sleep(EVENTOS_SONDEO_S)
+
+
+class EventosRedis:
+    """Stream de Redis recortado a los últimos ~1000 eventos."""
+
+    CLAVE = "sanroque:eventos"
+
+    def __init__(self, url=EVENTOS_REDIS_URL):
+        self.cliente = redis.Redis.from_url(url, decode_responses=True)
+
+    def publicar(self, tipo, datos):
+        return self.cliente.xadd(
+            self.CLAVE, {"tipo": tipo, "datos": json.dumps(datos)}, maxlen=1000, approximate=True
+        )
+
+    def ultimo_id(self):
+        ultimos = self.cliente.xrevrange(self.CLAVE, count=1)
+        return ultimos[0][0] if ultimos else "0-0"
+
+    def esperar(self, desde, segundos):
+        respuesta = self.cliente.xread({self.CLAVE: desde}, count=500, block=int(segundos * 1000))
+        if not respuesta:
+            return []
+        return [(i, c["tipo"], json.loads(c["datos"])) for i, c in respuesta[0][1]]
+
+
+def _crear_backend(nombre):
+    if nombre == "memoria":
+        return EventosMemoria()
+    if nombre == "redis":
+        if redis is not None:
+            return EventosRedis()
+        logger.warning("EVENTOS_BACKEND=redis pero el paquete redis no está instalado; se usa sqlite")
+    return EventosSQLite()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_flujos = threading.BoundedSemaphore(SSE_MAX_FLUJOS)
+
+
+def obtener_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _crear_backend(EVENTOS_BACKEND)
+    return _backend
+
+
+def configurar_eventos(backend):
+    """Reemplaza el backend (benchmarks o scripts)."""
+    global _backend
+    _backend = backend
+
+
+# --------------------------------------------------
+# PUBLICACIÓN
+# --------------------------------------------------
+def publicar(tipo, **datos):
+    """Publica de inmediato. Un fallo no debe tumbar la venta: solo se registra."""
+    try:
+        return obtener_backend().publicar(tipo, datos)
+    except Exception as e:
+        logger.error("eventos: no se pudo publicar %s: %s", tipo, e)
+        return None
+
+
+def publicar_al_confirmar(tipo, **datos):
+    """Publica cuando la sesión actual haga commit (no si hace rollback)."""
+    from database import db
+
+    db.session.info.setdefault("eventos_pendientes", []).append((tipo, datos))
+
+
+@event.listens_for(Session, "after_commit", propagate=True)
+def _publicar_tras_commit(session):
+    for tipo, datos in session.info.pop("eventos_pendientes", ()):
+        publicar(tipo, **datos)
+
+
+@event.listens_for(Session, "after_rollback", propagate=True)
+def _descartar_tras_rollback(session):
+    session.info.pop("eventos_pendientes", None)
+
+
+def datos_pestana(venta):
+    """Lo que una terminal necesita para dibujar la pestaña de una venta."""
+    return {
+        "venta_id": venta.id,
+        "mesa_id": venta.mesa_id,
+        "nombre_cliente": venta.nombre_cliente,
+        "total": venta.total or 0,
+    }
+
+
+# --------------------------------------------------
+# FLUJO SSE
+# --------------------------------------------------
+def _mensaje(id_evento, tipo, datos):
+    return f"id: {id_evento}\nevent: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+def tomar_flujo():
+    """Reserva un lugar para un flujo en este worker; False si ya están todos ocupados."""
+    return _flujos.acquire(blocking=False)
+
+
+def soltar_flujo():
+    _flujos.release()
+
+
+def flujo_eventos(desde=None, max_segundos=SSE_MAX_SEGUNDOS):
+    """Generador de la respuesta SSE. Sin 'desde' solo envía eventos nuevos."""
+    backend = obtener_backend()
+    if not desde or (not isinstance(backend, EventosRedis) and not str(desde).isdigit()):
+        desde = backend.ultimo_id()
+    yield f"retry: {REINTENTO_MS}\n\n"
+
+    fin = time.monotonic() + max_segundos
+    latido = time.monotonic() + LATIDO_S
+    while True:
+        restante = fin - time.monotonic()
+        if restante <= 0:
+            return
+        eventos = backend.esperar(desde, min(restante, LATIDO_S, 5))
+        if eventos is None:
+            # La terminal estuvo fuera más que la retención: que recargue una vez
+            desde = backend.ultimo_id()
+            yield _mensaje(desde, "reiniciar", {})
+            continue
+        for id_evento, tipo, datos in eventos:
+            desde = id_evento
+            yield _mensaje(id_evento, tipo, datos)
+        if time.monotonic() >= latido:
+            latido = time.monotonic() + LATIDO_S
+            yield ": latido\n\n"
@@ -0,0 +1,78 @@
+import hashlib
+import os
+from functools import wraps
+
+from flask import request, session, make_response, current_app
+from flask_login import current_user
+
+from utils.metricas import registrar_cache
+
+# ======================================================
+# CACHE HTTP CONDICIONAL (ETag / 304)
+# ======================================================
+# El ETag se arma con un "sello" barato de calcular (versión del
+# catálogo, estado de la venta, último cierre...) en lugar de generar la
+# respuesta completa. Si el navegador ya tiene esa versión se responde
+# 304 sin ejecutar la vista. Las respuestas dependen del usuario, así
+# que son privadas y el navegador revalida siempre (no-cache).
+#
+# Solo para JSON y fragmentos: una página completa recibe de base.html y
+# de las utilidades de plantilla (menú, nombre del usuario, ahora_col)
+# cosas que el sello no ve, y un 304 las mostraría viejas.
+#
+# Cambia con cada despliegue para no servir plantillas viejas
+VERSION_DESPLIEGUE = os.getenv("APP_VERSION") or os.getenv("RENDER_GIT_COMMIT", "")
+
+
+def _etag(sello):
+    usuario = f"{current_user.get_id()}:{getattr(current_user, 'rol', '')}" if current_user.is_authenticated else "-"
+    base = "|".join((
+        VERSION_DESPLIEGUE,
+        request.endpoint or "",
+        request.query_string.decode("latin-1"),
+        usuario,
+        str(sello),
+    ))
+    return hashlib.sha1(base.encode("utf-8")).hexdigest()[:20]
+
+
+def _cabeceras(response, max_age):
+    response.headers["Cache-Control"] = f"private, no-cache, max-age={max_age}" if max_age else "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+
+def respuesta_condicional(sello, max_age=0):
+    """
+    Decorador para vistas GET de solo lectura que devuelven JSON o fragmentos.
+    `sello(*args, **kwargs)` recibe los mismos argumentos que la vista y
+    retorna un valor que cambia cuando cambia la respuesta, o None si la
+    respuesta no debe cachearse (por ejemplo, una venta todavía abierta).
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            # Un mensaje flash pendiente hace que la página cambie
+            if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+                return vista(*args, **kwargs)
+
+            valor = sello(*args, **kwargs)
+            if valor is None:
+                return vista(*args, **kwargs)
+
+            etag = _etag(valor)
+            if request.if_none_match.contains_weak(etag):
+                registrar_cache("http", True)
+                response = current_app.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                return _cabeceras(response, max_age)
+
+            registrar_cache("http", False)
+            response = make_response(vista(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                _cabeceras(response, max_age)
+            return response
+
+        return envoltura
+    return decorador
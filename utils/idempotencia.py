@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import time
+from functools import wraps
+
+from flask import request, jsonify, make_response, current_app
+from flask_login import current_user
+
+from utils.cache import cache_agregar, cache_obtener, cache_guardar, cache_borrar
+from utils.metricas import registrar_cache
+
+# ======================================================
+# SOLICITUDES IDEMPOTENTES
+# ======================================================
+# Con Wi-Fi lento el cajero toca dos veces o el navegador reintenta, y la
+# misma operación llega repetida: doble descuento de stock, abonos
+# duplicados. El cliente manda una clave única por operación (cabecera
+# Idempotency-Key o campo de formulario 'clave_idempotencia'):
+#   - la primera petición reserva la clave y se ejecuta; su respuesta se
+#     guarda en el cache compartido por IDEMPOTENCIA_TTL segundos;
+#   - las repeticiones reciben esa misma respuesta sin volver a ejecutar;
+#   - si la primera sigue en curso, se espera un momento y si no termina
+#     se responde 409 para que el cliente reintente con la misma clave.
+# Sin clave la vista se ejecuta como siempre.
+IDEMPOTENCIA_TTL = int(os.getenv("IDEMPOTENCIA_TTL", "3600"))
+IDEMPOTENCIA_ESPERA_S = float(os.getenv("IDEMPOTENCIA_ESPERA_S", "5"))
+
+# Si el proceso muere a mitad de camino la reserva se libera sola
+TTL_EN_CURSO = 60
+CABECERA = "Idempotency-Key"
+CAMPO = "clave_idempotencia"
+
+
+def clave_de_peticion():
+    clave = request.headers.get(CABECERA) or request.form.get(CAMPO)
+    return clave.strip()[:100] if clave else None
+
+
+def _huella():
+    """Resumen del contenido: la misma clave con otros datos es un error del cliente."""
+    datos = request.get_json(silent=True)
+    if datos is None:
+        datos = sorted((k, v) for k, v in request.form.items(multi=True) if k != CAMPO)
+    base = json.dumps(datos, sort_keys=True, default=str)
+    return hashlib.sha1(base.encode("utf-8")).hexdigest()
+
+
+def _reproducir(guardada):
+    response = current_app.response_class(
+        guardada["cuerpo"], status=guardada["status"], mimetype=guardada["mimetype"]
+    )
+    if guardada.get("location"):
+        response.headers["Location"] = guardada["location"]
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _esperar(clave):
+    """Espera a que termine la petición original; None si sigue en curso."""
+    limite = time.monotonic() + IDEMPOTENCIA_ESPERA_S
+    while time.monotonic() < limite:
+        guardada = cache_obtener(clave)
+        if guardada is None:
+            # La original falló y liberó la clave
+            return None
+        if guardada["estado"] == "listo":
+            return guardada
+        time.sleep(0.1)
+    return None
+
+
+def idempotente(vista):
+    """Decorador para vistas POST que cambian datos."""
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        clave_cliente = clave_de_peticion()
+        if not clave_cliente:
+            return vista(*args, **kwargs)
+
+        clave = f"idem:{current_user.get_id()}:{request.endpoint}:{clave_cliente}"
+        huella = _huella()
+
+        if not cache_agregar(clave, {"estado": "en_curso", "huella": huella}, TTL_EN_CURSO):
+            registrar_cache("idempotencia", True)
+            guardada = cache_obtener(clave)
+            if guardada and guardada["huella"] != huella:
+                return jsonify({"success": False, "message": "Clave de idempotencia reutilizada con otros datos"}), 422
+            if guardada and guardada["estado"] != "listo":
+                guardada = _esperar(clave)
+            if guardada is None or guardada["estado"] != "listo":
+                response = jsonify({"success": False, "message": "La operación anterior sigue en proceso"})
+                response.status_code = 409
+                response.headers["Retry-After"] = "1"
+                return response
+            return _reproducir(guardada)
+
+        registrar_cache("idempotencia", False)
+        try:
+            response = make_response(vista(*args, **kwargs))
+        except Exception:
+            cache_borrar(clave)
+            raise
+
+        if response.status_code >= 500 or response.is_streamed:
+            # Un error del servidor se puede reintentar con la misma clave
+            cache_borrar(clave)
+        else:
+            cache_guardar(clave, {
+                "estado": "listo",
+                "huella": huella,
+                "status": response.status_code,
+                "mimetype": response.mimetype,
+                "location": response.headers.get("Location"),
+                "cuerpo": response.get_data(),
+            }, IDEMPOTENCIA_TTL)
+        return response
+
+    return envoltura
@@ -0,0 +1,60 @@
+from sqlalchemy import select, update
+
+from database import db
+from models import Mesa
+from utils.eventos import publicar_al_confirmar
+
+# ======================================================
+# ASIGNACIÓN ATÓMICA DE MESAS
+# ======================================================
+# Mesa.estado es la única fuente de verdad de qué mesa está ocupada.
+# Ocupar y liberar son UPDATE condicionales sobre el estado: si dos cajeros
+# piden mesa a la vez, la base deja pasar a uno solo y el otro toma la
+# siguiente (o recibe None), sin leer las ventas abiertas en Python.
+#
+# En Postgres la subconsulta usa FOR UPDATE SKIP LOCKED: la segunda
+# petición salta la fila que la primera está tomando en vez de esperarla.
+# En SQLite las escrituras ya son serializadas y la cláusula se omite.
+
+
+def ocupar_mesa_libre():
+    """Ocupa la primera mesa libre en una sola sentencia. Retorna su id o None."""
+    candidata = (
+        select(Mesa.id)
+        .where(Mesa.estado == "libre")
+        .order_by(Mesa.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return db.session.execute(
+        update(Mesa)
+        .where(Mesa.id == candidata, Mesa.estado == "libre")
+        .values(estado="ocupada")
+        .returning(Mesa.id)
+    ).scalar()
+
+
+def ocupar_mesa(mesa_id):
+    """Ocupa una mesa concreta si está libre. True si esta petición la tomó."""
+    resultado = db.session.execute(
+        update(Mesa)
+        .where(Mesa.id == mesa_id, Mesa.estado == "libre")
+        .values(estado="ocupada")
+    )
+    return resultado.rowcount == 1
+
+
+def liberar_mesa(mesa_id):
+    """Libera la mesa y avisa a las terminales tras el commit. True si estaba ocupada."""
+    if not mesa_id:
+        return False
+    resultado = db.session.execute(
+        update(Mesa)
+        .where(Mesa.id == mesa_id, Mesa.estado != "libre")
+        .values(estado="libre")
+    )
+    if resultado.rowcount:
+        publicar_al_confirmar("mesa_liberada", mesa_id=mesa_id)
+        return True
+    return False
@@ -0,0 +1,181 @@
+import hmac
+import os
+import time
+
+from flask import g, request, Response
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+# ======================================================
+# MÉTRICAS PROMETHEUS
+# ======================================================
+# Con varios workers de Gunicorn, PROMETHEUS_MULTIPROC_DIR apunta a una
+# carpeta donde cada proceso escribe sus contadores en archivos mmap;
+# /metrics los suma. Sin esa variable (flask run) se usa el registro
+# normal en memoria. Si prometheus_client no está instalado las
+# métricas quedan desactivadas.
+#
+# /metrics expone ventas, ingresos y stock, y en Render la URL es pública:
+# solo responde con METRICAS_TOKEN configurado y la cabecera
+# "Authorization: Bearer <token>". Sin token la ruta responde 404.
+try:
+    from prometheus_client import (
+        Counter, Gauge, Histogram, CollectorRegistry,
+        generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+    )
+    from prometheus_client import multiprocess
+except ImportError:
+    Counter = None
+
+MULTIPROCESO = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+if Counter is not None:
+    PETICIONES = Counter(
+        "sanroque_http_requests_total",
+        "Peticiones HTTP atendidas",
+        ["endpoint", "metodo", "estado"]
+    )
+    LATENCIA = Histogram(
+        "sanroque_http_request_duration_seconds",
+        "Duración de las peticiones HTTP por endpoint",
+        ["endpoint"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    )
+    CHECKOUTS_POOL = Counter(
+        "sanroque_db_pool_checkouts_total",
+        "Conexiones tomadas del pool de la base de datos"
+    )
+    CONEXIONES_EN_USO = Gauge(
+        "sanroque_db_pool_checked_out",
+        "Conexiones del pool en uso",
+        multiprocess_mode="livesum"
+    )
+    CACHE = Counter(
+        "sanroque_cache_requests_total",
+        "Consultas a caches internos",
+        ["cache", "resultado"]
+    )
+    VENTAS_CERRADAS = Counter(
+        "sanroque_ventas_cerradas_total",
+        "Ventas cerradas"
+    )
+    MONTO_VENDIDO = Counter(
+        "sanroque_ventas_monto_total",
+        "Monto total de las ventas cerradas (COP)"
+    )
+    RENDER_PLANTILLAS = Histogram(
+        "sanroque_template_render_seconds",
+        "Tiempo de render por plantilla",
+        ["plantilla"],
+        buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+    )
+    PRODUCTOS_AGOTADOS_EVENTOS = Counter(
+        "sanroque_productos_agotados_total",
+        "Veces que una venta dejó un producto sin stock"
+    )
+
+
+def metricas_activas():
+    return Counter is not None
+
+
+# --------------------------------------------------
+# REGISTRO DESDE EL CÓDIGO DE LA APP
+# --------------------------------------------------
+def registrar_cache(nombre, acierto):
+    if Counter is not None:
+        CACHE.labels(nombre, "acierto" if acierto else "fallo").inc()
+
+
+def registrar_venta_cerrada(total):
+    if Counter is not None:
+        VENTAS_CERRADAS.inc()
+        MONTO_VENDIDO.inc(max(float(total or 0), 0))
+
+
+def registrar_render(plantilla, segundos):
+    if Counter is not None:
+        RENDER_PLANTILLAS.labels(plantilla).observe(segundos)
+
+
+def registrar_producto_agotado():
+    if Counter is not None:
+        PRODUCTOS_AGOTADOS_EVENTOS.inc()
+
+
+# --------------------------------------------------
+# POOL DE CONEXIONES
+# --------------------------------------------------
+@event.listens_for(Pool, "checkout")
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    if Counter is not None:
+        CHECKOUTS_POOL.inc()
+        CONEXIONES_EN_USO.inc()
+
+
+@event.listens_for(Pool, "checkin")
+def _checkin(dbapi_connection, connection_record):
+    if Counter is not None:
+        CONEXIONES_EN_USO.dec()
+
+
+# --------------------------------------------------
+# MIDDLEWARE
+# --------------------------------------------------
+def init_metricas(app):
+    if Counter is None:
+        return
+
+    @app.before_request
+    def _inicio_metricas():
+        g.metricas_inicio = time.perf_counter()
+
+    @app.after_request
+    def _fin_metricas(response):
+        inicio = g.pop("metricas_inicio", None)
+        endpoint = request.endpoint or "sin_endpoint"
+        # No medir el propio scrape
+        if inicio is not None and endpoint != "metricas":
+            LATENCIA.labels(endpoint).observe(time.perf_counter() - inicio)
+            PETICIONES.labels(endpoint, request.method, str(response.status_code)).inc()
+        return response
+
+
+def _metricas_de_negocio():
+    """Gauges calculados al momento del scrape (iguales para todos los workers)."""
+    from database import db
+    from models import Venta, Producto
+
+    abiertas = db.session.query(db.func.count(Venta.id)).filter(Venta.estado == "abierta").scalar() or 0
+    agotados = db.session.query(db.func.count(Producto.id)).filter(Producto.cantidad <= 0).scalar() or 0
+
+    return (
+        "# HELP sanroque_pestanas_abiertas Ventas (pestañas) abiertas\n"
+        "# TYPE sanroque_pestanas_abiertas gauge\n"
+        f"sanroque_pestanas_abiertas {abiertas}\n"
+        "# HELP sanroque_productos_sin_stock Productos con stock en cero o negativo\n"
+        "# TYPE sanroque_productos_sin_stock gauge\n"
+        f"sanroque_productos_sin_stock {agotados}\n"
+    )
+
+
+def respuesta_metricas():
+    """Cuerpo de /metrics en formato de texto de Prometheus."""
+    token = os.getenv("METRICAS_TOKEN")
+    if not token:
+        return Response("No encontrado\n", status=404, mimetype="text/plain")
+    recibido = request.headers.get("Authorization", "").encode("utf-8", "replace")
+    if not hmac.compare_digest(recibido, f"Bearer {token}".encode("utf-8")):
+        return Response("No autorizado\n", status=401, mimetype="text/plain")
+
+    if Counter is None:
+        return Response("prometheus_client no instalado\n", status=503, mimetype="text/plain")
+
+    if MULTIPROCESO:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+
+    cuerpo = generate_latest(registro).decode("utf-8") + _metricas_de_negocio()
+    return Response(cuerpo, mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,113 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+from datetime import datetime
+
+from flask import g, request, current_app
+from flask_login import current_user
+
+# ======================================================
+# PERFILADO BAJO DEMANDA (SOLO ADMIN)
+# ======================================================
+# Un administrador agrega ?_perfilar=1 a la URL (o el header
+# X-Perfilar: 1) y esa petición corre bajo cProfile. El resultado se
+# guarda en instance/perfiles/ en formato pstats (.prof), que abren
+# snakeviz, gprof2dot o flameprof para ver el flamegraph.
+PARAMETRO = "_perfilar"
+HEADER = "X-Perfilar"
+MAX_PERFILES = int(os.getenv("PERFILES_MAXIMOS", "50"))
+
+# Un solo perfil a la vez: cProfile mide el hilo actual y dos perfiles
+# simultáneos se estorban
+_en_curso = threading.Lock()
+
+_NOMBRE_VALIDO = re.compile(r"^[\w.\-]+\.prof$")
+
+
+def carpeta_perfiles(app=None):
+    app = app or current_app
+    ruta = os.path.join(app.instance_path, "perfiles")
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+
+def _es_admin():
+    return (
+        current_user.is_authenticated
+        and (getattr(current_user, "rol", "") or "").lower() == "administrador"
+    )
+
+
+def _solicitado():
+    return request.args.get(PARAMETRO) == "1" or request.headers.get(HEADER) == "1"
+
+
+def init_perfilador(app):
+
+    @app.before_request
+    def _iniciar_perfil():
+        if not _solicitado() or not _es_admin():
+            return
+        if not _en_curso.acquire(blocking=False):
+            return
+        perfil = cProfile.Profile()
+        g.perfil = perfil
+        perfil.enable()
+
+    @app.teardown_request
+    def _guardar_perfil(exc=None):
+        perfil = g.pop("perfil", None)
+        if perfil is None:
+            return
+        try:
+            perfil.disable()
+            marca = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            endpoint = (request.endpoint or "sin_endpoint").replace(".", "-")
+            ruta = os.path.join(carpeta_perfiles(app), f"{marca}_{endpoint}.prof")
+            perfil.dump_stats(ruta)
+            _limpiar_antiguos(app)
+        finally:
+            _en_curso.release()
+
+
+def _limpiar_antiguos(app):
+    archivos = sorted(
+        f for f in os.listdir(carpeta_perfiles(app)) if f.endswith(".prof")
+    )
+    for viejo in archivos[:-MAX_PERFILES]:
+        os.remove(os.path.join(carpeta_perfiles(app), viejo))
+
+
+def listar_perfiles():
+    """Perfiles guardados, del más reciente al más antiguo."""
+    ruta = carpeta_perfiles()
+    perfiles = []
+    for nombre in sorted(os.listdir(ruta), reverse=True):
+        if not _NOMBRE_VALIDO.match(nombre):
+            continue
+        info = os.stat(os.path.join(ruta, nombre))
+        perfiles.append({
+            "nombre": nombre,
+            "fecha": datetime.fromtimestamp(info.st_mtime),
+            "tamano_kb": round(info.st_size / 1024, 1),
+        })
+    return perfiles
+
+
+def ruta_perfil(nombre):
+    """Ruta segura de un perfil o None si el nombre no es válido."""
+    if not _NOMBRE_VALIDO.match(nombre or ""):
+        return None
+    ruta = os.path.join(carpeta_perfiles(), nombre)
+    return ruta if os.path.isfile(ruta) else None
+
+
+def resumen_perfil(ruta, limite=40):
+    """Texto con las funciones de mayor tiempo acumulado."""
+    salida = io.StringIO()
+    estadisticas = pstats.Stats(ruta, stream=salida)
+    estadisticas.strip_dirs().sort_stats("cumulative").print_stats(limite)
+    return salida.getvalue()
@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.metricas import registrar_render
+
+# ======================================================
+# INSTRUMENTACIÓN POR PETICIÓN
+# ======================================================
+# Por cada petición: tiempo total, tiempo en base de datos, número de
+# consultas y las sentencias más lentas. Las peticiones que superan el
+# umbral se registran en JSON; los percentiles por endpoint se guardan
+# en memoria (por worker) y se ven en /admin/rendimiento.
+UMBRAL_PETICION_MS = float(os.getenv("RENDIMIENTO_UMBRAL_MS", "500"))
+UMBRAL_SQL_MS = float(os.getenv("RENDIMIENTO_SQL_LENTA_MS", "100"))
+VENTANA_MUESTRAS = int(os.getenv("RENDIMIENTO_VENTANA", "500"))
+MAX_SENTENCIAS = 5
+# Quién recibe el header Server-Timing (revela tiempos y número de consultas):
+#   admin - solo administradores autenticados (defecto)
+#   todos - cualquier respuesta, para pruebas de carga locales
+#   no    - nadie
+RENDIMIENTO_SERVER_TIMING = (os.getenv("RENDIMIENTO_SERVER_TIMING") or "admin").lower()
+
+logger = logging.getLogger("sanroque.rendimiento")
+
+_muestras = defaultdict(lambda: deque(maxlen=VENTANA_MUESTRAS))
+_totales = defaultdict(lambda: {"peticiones": 0, "lentas": 0})
+_lock = threading.Lock()
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[k]
+
+
+def _registrar_log(datos):
+    logger.warning(json.dumps(datos, ensure_ascii=False, default=str))
+
+
+# --------------------------------------------------
+# EVENTOS DE SQLALCHEMY
+# --------------------------------------------------
+# El inicio se guarda en el contexto de ejecución de cada sentencia y no en
+# la conexión: una sentencia que falla no deja restos en la conexión del pool
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.inicio_consulta = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "inicio_consulta", None)
+    if inicio is None:
+        return
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    if not has_request_context():
+        return
+    medicion = g.get("rendimiento")
+    if medicion is None:
+        return
+
+    medicion["consultas"] += 1
+    medicion["db_ms"] += duracion_ms
+
+    sentencias = medicion["sentencias"]
+    if len(sentencias) < MAX_SENTENCIAS or duracion_ms > sentencias[-1]["ms"]:
+        sentencias.append({"ms": round(duracion_ms, 2), "sql": " ".join(statement.split())[:300]})
+        sentencias.sort(key=lambda s: s["ms"], reverse=True)
+        del sentencias[MAX_SENTENCIAS:]
+
+    if duracion_ms >= UMBRAL_SQL_MS:
+        _registrar_log({
+            "evento": "sql_lenta",
+            "endpoint": request.endpoint,
+            "ms": round(duracion_ms, 2),
+            "sql": " ".join(statement.split())[:1000],
+        })
+
+
+# --------------------------------------------------
+# RENDER DE PLANTILLAS
+# --------------------------------------------------
+def _inicio_render(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault("renders_en_curso", []).append(time.perf_counter())
+
+
+def _fin_render(sender, template, context, **extra):
+    if not has_request_context():
+        return
+    pila = g.get("renders_en_curso")
+    if not pila:
+        return
+    segundos = time.perf_counter() - pila.pop()
+    registrar_render(template.name or "sin_nombre", segundos)
+
+    medicion = g.get("rendimiento")
+    if medicion is not None:
+        medicion["render_ms"] += segundos * 1000
+
+
+# --------------------------------------------------
+# MIDDLEWARE
+# --------------------------------------------------
+def init_rendimiento(app):
+    """Registra los hooks de medición en la app."""
+    if not logger.handlers and not logging.getLogger().handlers:
+        manejador = logging.StreamHandler()
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(manejador)
+        logger.setLevel(logging.INFO)
+
+    before_render_template.connect(_inicio_render, app)
+    template_rendered.connect(_fin_render, app)
+
+    @app.before_request
+    def _iniciar_medicion():
+        g.rendimiento = {
+            "inicio": time.perf_counter(),
+            "consultas": 0,
+            "db_ms": 0.0,
+            "render_ms": 0.0,
+            "sentencias": [],
+        }
+
+    @app.after_request
+    def _cerrar_medicion(response):
+        medicion = g.pop("rendimiento", None)
+        if medicion is None:
+            return response
+
+        total_ms = (time.perf_counter() - medicion["inicio"]) * 1000
+        endpoint = request.endpoint or "sin_endpoint"
+
+        registrar_muestra(endpoint, total_ms, medicion["db_ms"], medicion["consultas"])
+
+        if _enviar_server_timing():
+            response.headers["Server-Timing"] = (
+                f'app;dur={total_ms:.1f}, db;dur={medicion["db_ms"]:.1f};desc="{medicion["consultas"]} consultas", '
+                f'tpl;dur={medicion["render_ms"]:.1f}'
+            )
+
+        if total_ms >= UMBRAL_PETICION_MS:
+            with _lock:
+                _totales[endpoint]["lentas"] += 1
+            _registrar_log({
+                "evento": "peticion_lenta",
+                "endpoint": endpoint,
+                "metodo": request.method,
+                "ruta": request.path,
+                "estado": response.status_code,
+                "total_ms": round(total_ms, 2),
+                "db_ms": round(medicion["db_ms"], 2),
+                "render_ms": round(medicion["render_ms"], 2),
+                "consultas": medicion["consultas"],
+                "sentencias_lentas": medicion["sentencias"],
+            })
+
+        return response
+
+
+def _enviar_server_timing():
+    if RENDIMIENTO_SERVER_TIMING == "todos":
+        return True
+    if RENDIMIENTO_SERVER_TIMING != "admin" or not current_user.is_authenticated:
+        return False
+    return (getattr(current_user, "rol", "") or "").lower() in ("administrador", "administradora")
+
+
+def registrar_muestra(endpoint, total_ms, db_ms, consultas):
+    with _lock:
+        _muestras[endpoint].append((total_ms, db_ms, consultas))
+        _totales[endpoint]["peticiones"] += 1
+
+
+def resumen_endpoints():
+    """Percentiles por endpoint sobre la ventana reciente de este worker."""
+    with _lock:
+        copia = {e: list(m) for e, m in _muestras.items()}
+        totales = {e: dict(t) for e, t in _totales.items()}
+
+    filas = []
+    for endpoint, muestras in copia.items():
+        tiempos = [m[0] for m in muestras]
+        n = len(muestras)
+        filas.append({
+            "endpoint": endpoint,
+            "peticiones": totales[endpoint]["peticiones"],
+            "lentas": totales[endpoint]["lentas"],
+            "p50_ms": round(_percentil(tiempos, 50), 1),
+            "p95_ms": round(_percentil(tiempos, 95), 1),
+            "p99_ms": round(_percentil(tiempos, 99), 1),
+            "max_ms": round(max(tiempos), 1) if tiempos else 0.0,
+            "db_ms_prom": round(sum(m[1] for m in muestras) / n, 1) if n else 0.0,
+            "consultas_prom": round(sum(m[2] for m in muestras) / n, 1) if n else 0.0,
+        })
+
+    filas.sort(key=lambda f: f["p95_ms"], reverse=True)
+    return filas
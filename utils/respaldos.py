@@ -0,0 +1,415 @@
+import gzip
+import json
+import os
+import sqlite3
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import Date, DateTime, Numeric, cast, create_engine, delete, func, select, text
+
+from config import basedir
+from database import db
+
+# ======================================================
+# RESPALDOS EN CALIENTE E INCREMENTALES
+# ======================================================
+# Cada respaldo es una carpeta en RESPALDOS_DIR con un manifiesto.json:
+#
+#   completo    SQLite: copia con la API de backup (sanroque.db).
+#               Postgres (o --jsonl): una tabla por archivo .jsonl.gz,
+#               leída con cursor del lado del servidor.
+#   incremental Solo las filas nuevas de las tablas grandes (ver
+#               INCREMENTALES) desde el respaldo anterior, más una copia
+#               entera de las tablas chicas. Se encadena a su base.
+#
+# restaurar() vacía todas las tablas de una vez (TRUNCATE ... CASCADE en
+# Postgres) y arma el estado final de la cadena: de cada tabla grande, las
+# filas de cada respaldo hasta el corte del siguiente; de las chicas, la
+# copia del último. Carga padres antes que hijos, con inserciones por lotes,
+# así las llaves foráneas se cumplen en todo momento.
+#
+# Límite: las filas por debajo del corte se dan por inmutables. Antes de un
+# incremental se compara su conteo y unas sumas de control (SUMAS_CONTROL);
+# si cambiaron (venta borrada, archivada o con otro total) se hace un
+# respaldo completo. Un cambio que no mueve esas sumas (por ejemplo solo el
+# método de pago de una venta vieja) no llega al incremental.
+RESPALDOS_DIR = os.getenv("RESPALDOS_DIR", os.path.join(basedir, "instance", "respaldos"))
+# Páginas por paso de la API de backup cuando la base no está en WAL
+RESPALDO_PAGINAS = int(os.getenv("RESPALDO_PAGINAS", "2048"))
+RESPALDO_LOTE = int(os.getenv("RESPALDO_LOTE", "5000"))
+
+MANIFIESTO = "manifiesto.json"
+SNAPSHOT = "sanroque.db"
+
+# tabla -> (columna de corte, tabla que define el corte)
+# Las filas con columna >= corte se consideran nuevas o modificables. Las
+# ventas cambian mientras están abiertas: su corte es la abierta más vieja.
+INCREMENTALES = {
+    "ventas": ("id", "ventas"),
+    "venta_detalles": ("venta_id", "ventas"),
+    "ventas_archivo": ("id", "ventas_archivo"),
+    "venta_detalles_archivo": ("venta_id", "ventas_archivo"),
+    "movimientos_stock": ("id", "movimientos_stock"),
+}
+
+
+# Columnas sumadas junto al conteo de filas bajo el corte para detectar
+# ediciones de filas viejas (ver _filas_bajo_corte)
+SUMAS_CONTROL = {
+    "ventas": ("total",),
+    "venta_detalles": ("cantidad", "subtotal"),
+    "ventas_archivo": ("total",),
+    "venta_detalles_archivo": ("cantidad", "subtotal"),
+    "movimientos_stock": ("cantidad", "producto_id"),
+}
+
+
+class RespaldoError(Exception):
+    pass
+
+
+def _tablas():
+    return list(db.metadata.sorted_tables)
+
+
+def _serializar(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+def _conversores(tabla):
+    """Columnas de fecha: en JSONL viajan como texto ISO."""
+    conversores = {}
+    for columna in tabla.columns:
+        if isinstance(columna.type, DateTime):
+            conversores[columna.name] = datetime.fromisoformat
+        elif isinstance(columna.type, Date):
+            conversores[columna.name] = date.fromisoformat
+    return conversores
+
+
+def _leer_manifiesto(carpeta):
+    with open(os.path.join(carpeta, MANIFIESTO), encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def listar_respaldos(directorio=RESPALDOS_DIR):
+    """Manifiestos de los respaldos existentes, del más viejo al más nuevo."""
+    if not os.path.isdir(directorio):
+        return []
+    respaldos = []
+    for nombre in sorted(os.listdir(directorio)):
+        if os.path.isfile(os.path.join(directorio, nombre, MANIFIESTO)):
+            respaldos.append(_leer_manifiesto(os.path.join(directorio, nombre)))
+    return respaldos
+
+
+# --------------------------------------------------
+# CORTES INCREMENTALES
+# --------------------------------------------------
+def _cortes(conn):
+    """Próximo corte por tabla de origen: todo lo que esté por debajo ya no cambia."""
+    tablas = db.metadata.tables
+    cortes = {}
+    for origen in {o for _, o in INCREMENTALES.values()}:
+        tabla = tablas[origen]
+        siguiente = (conn.execute(select(func.max(tabla.c.id))).scalar() or 0) + 1
+        if origen == "ventas":
+            abierta = conn.execute(
+                select(func.min(tabla.c.id)).where(tabla.c.estado == "abierta")
+            ).scalar()
+            if abierta is not None:
+                siguiente = min(siguiente, abierta)
+        cortes[origen] = siguiente
+    return cortes
+
+
+def _filas_bajo_corte(conn, cortes):
+    """Conteo y sumas de control bajo el corte: si cambian, algo se borró, se archivó o se editó."""
+    tablas = db.metadata.tables
+    conteos = {}
+    for nombre, (columna, origen) in INCREMENTALES.items():
+        tabla = tablas[nombre]
+        sumas = [
+            func.round(cast(func.coalesce(func.sum(tabla.c[c]), 0), Numeric), 2)
+            for c in SUMAS_CONTROL.get(nombre, ())
+        ]
+        fila = conn.execute(
+            select(func.count(), *sumas).select_from(tabla).where(tabla.c[columna] < cortes[origen])
+        ).one()
+        conteos[nombre] = [fila[0]] + [float(v) for v in fila[1:]]
+    return conteos
+
+
+# --------------------------------------------------
+# RESPALDAR
+# --------------------------------------------------
+def _snapshot_sqlite(destino, al_avanzar=None):
+    """
+    Copia la base con la API de backup de SQLite.
+    En WAL se copia en un solo paso: es una transacción de lectura y las
+    cajas siguen escribiendo. En otros modos se copia por tramos de
+    RESPALDO_PAGINAS para soltar el bloqueo entre tramos.
+    """
+    crudo = db.engine.raw_connection()
+    try:
+        origen = crudo.driver_connection
+        modo = origen.execute("PRAGMA journal_mode").fetchone()[0]
+        paginas = -1 if modo.lower() == "wal" else RESPALDO_PAGINAS
+
+        def progreso(estado, restantes, total):
+            if al_avanzar:
+                al_avanzar(SNAPSHOT, total - restantes)
+
+        copia = sqlite3.connect(destino)
+        try:
+            origen.backup(copia, pages=paginas, progress=progreso, sleep=0.01)
+        finally:
+            copia.close()
+    finally:
+        crudo.close()
+
+
+def _volcar_tabla(conn, tabla, ruta, condicion=None):
+    consulta = select(tabla)
+    if condicion is not None:
+        consulta = consulta.where(condicion)
+    # stream_results: cursor del lado del servidor en Postgres
+    resultado = conn.execution_options(stream_results=True, yield_per=RESPALDO_LOTE).execute(consulta)
+    filas = 0
+    with gzip.open(ruta, "wt", encoding="utf-8", compresslevel=6) as archivo:
+        for fila in resultado.mappings():
+            archivo.write(json.dumps(dict(fila), default=_serializar, ensure_ascii=False))
+            archivo.write("\n")
+            filas += 1
+    return filas
+
+
+def respaldar(incremental=False, jsonl=False, directorio=RESPALDOS_DIR, al_avanzar=None):
+    """
+    Crea un respaldo en `directorio` y retorna su manifiesto.
+    Si se pide incremental pero no hay base válida (o se borraron/archivaron
+    filas por debajo del último corte) se hace uno completo.
+    """
+    motor = db.engine.dialect.name
+    previo = None
+    if incremental:
+        anteriores = listar_respaldos(directorio)
+        previo = anteriores[-1] if anteriores else None
+
+    inicio = time.perf_counter()
+    nombre = base_nombre = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sufijo = 1
+    while os.path.exists(os.path.join(directorio, nombre)):
+        sufijo += 1
+        nombre = f"{base_nombre}_{sufijo}"
+    carpeta = os.path.join(directorio, nombre)
+    os.makedirs(carpeta)
+
+    opciones = {"isolation_level": "REPEATABLE READ"} if motor == "postgresql" else {}
+    with db.engine.connect().execution_options(**opciones) as conn:
+        if motor == "sqlite":
+            # Una sola transacción de lectura: todas las tablas del mismo instante
+            conn.exec_driver_sql("BEGIN")
+
+        if previo is not None:
+            if _filas_bajo_corte(conn, previo["cortes"]) != previo["bajo_corte"]:
+                previo = None
+
+        cortes = _cortes(conn)
+        manifiesto = {
+            "nombre": nombre,
+            "tipo": "incremental" if previo else "completo",
+            "base": previo["nombre"] if previo else None,
+            "motor": motor,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "desde": previo["cortes"] if previo else None,
+            "cortes": cortes,
+            "bajo_corte": _filas_bajo_corte(conn, cortes),
+            "tablas": {},
+        }
+
+        if not previo and motor == "sqlite" and not jsonl:
+            conn.rollback()
+            manifiesto["formato"] = "sqlite"
+            _snapshot_sqlite(os.path.join(carpeta, SNAPSHOT), al_avanzar)
+        else:
+            manifiesto["formato"] = "jsonl"
+            for tabla in _tablas():
+                condicion = None
+                if previo and tabla.name in INCREMENTALES:
+                    columna, origen = INCREMENTALES[tabla.name]
+                    condicion = tabla.c[columna] >= previo["cortes"][origen]
+                filas = _volcar_tabla(conn, tabla, os.path.join(carpeta, f"{tabla.name}.jsonl.gz"), condicion)
+                manifiesto["tablas"][tabla.name] = filas
+                if al_avanzar:
+                    al_avanzar(tabla.name, filas)
+            conn.rollback()
+
+    manifiesto["segundos"] = round(time.perf_counter() - inicio, 2)
+    with open(os.path.join(carpeta, MANIFIESTO), "w", encoding="utf-8") as archivo:
+        json.dump(manifiesto, archivo, indent=2, ensure_ascii=False)
+    return manifiesto
+
+
+# --------------------------------------------------
+# RESTAURAR
+# --------------------------------------------------
+def cadena_respaldo(carpeta):
+    """[completo, incremental, ...] hasta el respaldo indicado."""
+    directorio = os.path.dirname(os.path.abspath(carpeta))
+    cadena = []
+    actual = os.path.abspath(carpeta)
+    while True:
+        manifiesto = _leer_manifiesto(actual)
+        cadena.append((actual, manifiesto))
+        if manifiesto["tipo"] == "completo":
+            break
+        actual = os.path.join(directorio, manifiesto["base"])
+        if not os.path.isdir(actual):
+            raise RespaldoError(f"Falta el respaldo base {manifiesto['base']}")
+    return list(reversed(cadena))
+
+
+def _filas_jsonl(tabla, ruta):
+    conversores = _conversores(tabla)
+    columnas = set(tabla.c.keys())
+    with gzip.open(ruta, "rt", encoding="utf-8") as archivo:
+        for linea in archivo:
+            fila = json.loads(linea)
+            for nombre, conversor in conversores.items():
+                if fila.get(nombre) is not None:
+                    fila[nombre] = conversor(fila[nombre])
+            yield {k: v for k, v in fila.items() if k in columnas}
+
+
+def _filas_snapshot(motor_snapshot, tabla):
+    with motor_snapshot.connect() as conn:
+        existentes = {c["name"] for c in conn.execute(text(f'PRAGMA table_info("{tabla.name}")')).mappings()}
+        if not existentes:
+            return
+        columnas = [c for c in tabla.columns if c.name in existentes]
+        resultado = conn.execution_options(yield_per=RESPALDO_LOTE).execute(select(*columnas))
+        for fila in resultado.mappings():
+            yield dict(fila)
+
+
+def _cargar(conn, tabla, filas):
+    total = 0
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= RESPALDO_LOTE:
+            conn.execute(tabla.insert(), lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        conn.execute(tabla.insert(), lote)
+        total += len(lote)
+    return total
+
+
+def _ajustar_secuencias(conn):
+    """Postgres: las secuencias de id quedan detrás de los datos cargados."""
+    for tabla in _tablas():
+        if "id" not in tabla.c or not tabla.c.id.autoincrement:
+            continue
+        secuencia = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": tabla.name}).scalar()
+        if secuencia:
+            conn.execute(
+                text(f'SELECT setval(:s, COALESCE((SELECT MAX(id) FROM "{tabla.name}"), 0) + 1, false)'),
+                {"s": secuencia},
+            )
+
+
+def _vaciar(conn, tablas, motor):
+    """Borra todas las tablas de la app en un solo paso que respeta las llaves foráneas."""
+    if motor == "postgresql":
+        nombres = ", ".join(f'"{tabla.name}"' for tabla in tablas)
+        conn.execute(text(f"TRUNCATE {nombres} RESTART IDENTITY CASCADE"))
+    else:
+        # Hijos antes que padres
+        for tabla in reversed(tablas):
+            conn.execute(delete(tabla))
+
+
+def _fuentes(cadena, tabla):
+    """[(ruta, manifiesto, hasta)] de donde sale cada tabla; `hasta` es el corte del siguiente respaldo."""
+    if tabla.name not in INCREMENTALES:
+        # Cada respaldo trae la copia entera de las tablas chicas: vale la del último
+        ruta, manifiesto = cadena[-1]
+        return [(ruta, manifiesto, None)]
+
+    _, origen = INCREMENTALES[tabla.name]
+    fuentes = []
+    for posicion, (ruta, manifiesto) in enumerate(cadena):
+        siguiente = cadena[posicion + 1][1] if posicion + 1 < len(cadena) else None
+        fuentes.append((ruta, manifiesto, siguiente["desde"][origen] if siguiente else None))
+    return fuentes
+
+
+def restaurar(carpeta, al_avanzar=None):
+    """
+    Reemplaza el contenido de la base actual por el del respaldo (y su
+    cadena de incrementales). Retorna {tabla: filas cargadas}.
+    """
+    cadena = cadena_respaldo(carpeta)
+    motor = db.engine.dialect.name
+    tablas = _tablas()
+    cargadas = {}
+
+    base_ruta, base = cadena[0]
+    db.session.remove()
+
+    if len(cadena) == 1 and base["formato"] == "sqlite" and motor == "sqlite":
+        # Copia de página a página: lo más rápido para SQLite -> SQLite
+        origen = sqlite3.connect(os.path.join(base_ruta, SNAPSHOT))
+        crudo = db.engine.raw_connection()
+        try:
+            origen.backup(crudo.driver_connection)
+        finally:
+            crudo.close()
+            origen.close()
+        db.engine.dispose()
+        if al_avanzar:
+            al_avanzar(base["nombre"], SNAPSHOT, None)
+        return cargadas
+
+    motores_snapshot = {}
+    try:
+        with db.engine.begin() as conn:
+            _vaciar(conn, tablas, motor)
+
+            for tabla in tablas:
+                for ruta, manifiesto, hasta in _fuentes(cadena, tabla):
+                    if manifiesto["formato"] == "sqlite":
+                        if ruta not in motores_snapshot:
+                            motores_snapshot[ruta] = create_engine("sqlite:///" + os.path.join(ruta, SNAPSHOT))
+                        filas = _filas_snapshot(motores_snapshot[ruta], tabla)
+                    else:
+                        archivo = os.path.join(ruta, f"{tabla.name}.jsonl.gz")
+                        if not os.path.exists(archivo):
+                            continue
+                        filas = _filas_jsonl(tabla, archivo)
+
+                    if hasta is not None:
+                        # Lo que está desde el corte siguiente lo trae (actualizado) el siguiente respaldo
+                        columna = INCREMENTALES[tabla.name][0]
+                        filas = (f for f in filas if f[columna] < hasta)
+
+                    total = _cargar(conn, tabla, filas)
+                    cargadas[tabla.name] = cargadas.get(tabla.name, 0) + total
+                    if al_avanzar:
+                        al_avanzar(manifiesto["nombre"], tabla.name, total)
+
+            if motor == "postgresql":
+                _ajustar_secuencias(conn)
+    finally:
+        for motor_snapshot in motores_snapshot.values():
+            motor_snapshot.dispose()
+
+    return cargadas
@@ -0,0 +1,215 @@
+import os
+
+from sqlalchemy import insert, select, func, case
+from sqlalchemy.dialects.postgresql import insert as insert_postgresql
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+
+from database import db
+
+# ======================================================
+# ACUMULADOS DE COMPRA POR CLIENTE
+# ======================================================
+TOP_PRODUCTOS = 5
+
+# Reglas de ascenso automático a premium (0 = desactivado)
+PREMIUM_GASTO_MINIMO = float(os.getenv("PREMIUM_GASTO_MINIMO", "0"))
+PREMIUM_VISITAS_MINIMAS = int(os.getenv("PREMIUM_VISITAS_MINIMAS", "0"))
+
+# INSERT ... ON CONFLICT DO UPDATE: la primera venta de un cliente nuevo
+# cerrada a la vez en dos cajas no choca con la clave primaria
+INSERT_CON_CONFLICTO = {"postgresql": insert_postgresql, "sqlite": insert_sqlite}
+
+
+def _insertar_o_sumar(modelo, filas, claves, sumar):
+    """Inserta las filas; si ya existen, aplica `sumar(existente, nueva)` -> {columna: expresión}."""
+    sentencia = INSERT_CON_CONFLICTO[db.session.get_bind().dialect.name](modelo).values(filas)
+    db.session.execute(
+        sentencia.on_conflict_do_update(
+            index_elements=claves,
+            set_=sumar(modelo.__table__.c, sentencia.excluded)
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def registrar_venta_cliente(venta):
+    """
+    Suma una venta cerrada a los acumulados de su cliente.
+    Se llama dentro de la transacción de cierre; no hace commit.
+    Cada acumulado es un upsert relativo (total = total + x) para que dos
+    cajas cerrando ventas del mismo cliente no se pisen ni choquen.
+    """
+    from models import ClienteResumen, ClienteProducto, VentaDetalle
+
+    if not venta.cliente_id:
+        return None
+
+    fecha = venta.fecha
+    total = venta.total or 0
+
+    _insertar_o_sumar(
+        ClienteResumen,
+        [{
+            "cliente_id": venta.cliente_id,
+            "total_gastado": total,
+            "visitas": 1,
+            "primera_visita": fecha,
+            "ultima_visita": fecha
+        }],
+        ["cliente_id"],
+        lambda existente, nueva: {
+            "total_gastado": existente.total_gastado + nueva.total_gastado,
+            "visitas": existente.visitas + 1,
+            "ultima_visita": case(
+                (existente.ultima_visita > nueva.ultima_visita, existente.ultima_visita),
+                else_=nueva.ultima_visita
+            )
+        }
+    )
+
+    # Productos de la venta agrupados (una fila por producto)
+    lineas = db.session.query(
+        VentaDetalle.producto_id,
+        func.sum(VentaDetalle.cantidad),
+        func.sum(VentaDetalle.subtotal)
+    ).filter(
+        VentaDetalle.venta_id == venta.id,
+        VentaDetalle.producto_id.isnot(None)
+    ).group_by(VentaDetalle.producto_id).all()
+
+    if lineas:
+        _insertar_o_sumar(
+            ClienteProducto,
+            [
+                {
+                    "cliente_id": venta.cliente_id,
+                    "producto_id": producto_id,
+                    "cantidad": cantidad or 0,
+                    "total": subtotal or 0
+                }
+                for producto_id, cantidad, subtotal in lineas
+            ],
+            ["cliente_id", "producto_id"],
+            lambda existente, nueva: {
+                "cantidad": existente.cantidad + nueva.cantidad,
+                "total": existente.total + nueva.total
+            }
+        )
+
+    return aplicar_promocion_premium(venta.cliente_id)
+
+
+def aplicar_promocion_premium(cliente_id):
+    """Pasa el cliente a premium si cumple las reglas configuradas. Retorna True si ascendió."""
+    from models import Cliente, ClienteResumen
+
+    if PREMIUM_GASTO_MINIMO <= 0 and PREMIUM_VISITAS_MINIMAS <= 0:
+        return False
+
+    resumen = db.session.query(ClienteResumen).populate_existing().get(cliente_id)
+    if not resumen:
+        return False
+
+    if (resumen.total_gastado or 0) < PREMIUM_GASTO_MINIMO:
+        return False
+    if (resumen.visitas or 0) < PREMIUM_VISITAS_MINIMAS:
+        return False
+
+    cliente = Cliente.query.get(cliente_id)
+    if cliente and cliente.tipo != "premium":
+        cliente.tipo = "premium"
+        return True
+    return False
+
+
+def obtener_resumenes(cliente_ids, top=TOP_PRODUCTOS):
+    """
+    Acumulados y productos favoritos para una página de clientes,
+    en dos consultas sin importar cuántos clientes haya.
+    """
+    from models import ClienteResumen, ClienteProducto, Producto
+
+    if not cliente_ids:
+        return {}
+
+    resumenes = {
+        r.cliente_id: {
+            "total_gastado": r.total_gastado or 0,
+            "visitas": r.visitas or 0,
+            "primera_visita": r.primera_visita,
+            "ultima_visita": r.ultima_visita,
+            "favoritos": []
+        }
+        for r in ClienteResumen.query.filter(ClienteResumen.cliente_id.in_(cliente_ids))
+    }
+
+    filas = db.session.query(
+        ClienteProducto.cliente_id, Producto.nombre, ClienteProducto.cantidad
+    ).join(Producto, Producto.id == ClienteProducto.producto_id).filter(
+        ClienteProducto.cliente_id.in_(list(resumenes))
+    ).order_by(
+        ClienteProducto.cliente_id, ClienteProducto.cantidad.desc()
+    ).all() if resumenes else []
+
+    for cliente_id, nombre, cantidad in filas:
+        favoritos = resumenes[cliente_id]["favoritos"]
+        if len(favoritos) < top:
+            favoritos.append({"nombre": nombre, "cantidad": cantidad or 0})
+
+    return resumenes
+
+
+def reconstruir_resumenes():
+    """Recalcula todos los acumulados desde las ventas cerradas (incluidas las archivadas). Retorna el número de clientes."""
+    from models import ClienteResumen, ClienteProducto
+    from utils.archivo_ventas import tabla_ventas, tabla_detalles
+
+    db.session.query(ClienteProducto).delete(synchronize_session=False)
+    db.session.query(ClienteResumen).delete(synchronize_session=False)
+
+    ventas = tabla_ventas()
+    totales = db.session.execute(
+        select(
+            ventas.c.cliente_id,
+            func.coalesce(func.sum(ventas.c.total), 0),
+            func.count(ventas.c.id),
+            func.min(ventas.c.fecha),
+            func.max(ventas.c.fecha)
+        ).where(
+            ventas.c.cliente_id.isnot(None),
+            ventas.c.estado == "cerrada"
+        ).group_by(ventas.c.cliente_id)
+    ).all()
+
+    if totales:
+        db.session.execute(insert(ClienteResumen), [
+            {
+                "cliente_id": cid,
+                "total_gastado": total,
+                "visitas": visitas,
+                "primera_visita": primera,
+                "ultima_visita": ultima
+            }
+            for cid, total, visitas, primera, ultima in totales
+        ])
+
+    detalles = tabla_detalles()
+    productos = db.session.execute(
+        select(
+            ventas.c.cliente_id,
+            detalles.c.producto_id,
+            func.coalesce(func.sum(detalles.c.cantidad), 0),
+            func.coalesce(func.sum(detalles.c.subtotal), 0)
+        ).join(detalles, detalles.c.venta_id == ventas.c.id).where(
+            ventas.c.cliente_id.isnot(None),
+            ventas.c.estado == "cerrada",
+            detalles.c.producto_id.isnot(None)
+        ).group_by(ventas.c.cliente_id, detalles.c.producto_id)
+    ).all()
+
+    if productos:
+        db.session.execute(insert(ClienteProducto), [
+            {"cliente_id": cid, "producto_id": pid, "cantidad": cant, "total": total}
+            for cid, pid, cant, total in productos
+        ])
+
+    return len(totales)
@@ -0,0 +1,15 @@
+import unicodedata
+
+
+def normalizar_nombre(texto):
+    """
+    Clave de búsqueda para nombres: sin tildes, en mayúsculas y con
+    espacios simples. 'José  Pérez' -> 'JOSE PEREZ'.
+    """
+    if not texto:
+        return ""
+    sin_tildes = "".join(
+        c for c in unicodedata.normalize("NFKD", str(texto))
+        if not unicodedata.combining(c)
+    )
+    return " ".join(sin_tildes.upper().split())
@@ -76,4 +76,3 @@ def cerrar_turno_anterior_si_pendiente(usuario_id=None):
     # Aquí podrías crear el cierre automático si quieres
     return True, "Turno validado sin cierre automático"
 
-print("✅ time_utils cargado correctamente")
@@ -0,0 +1,274 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app, jsonify, redirect, request, url_for
+from sqlalchemy import update
+
+from config import basedir
+from database import db
+
+# ======================================================
+# TRABAJOS EN SEGUNDO PLANO
+# ======================================================
+# Importaciones, exportaciones y correos largos no corren dentro de la
+# petición: la ruta crea una fila en 'trabajos', la encola en un pool de
+# hilos del worker y responde de inmediato con el id. La página
+# /trabajos/<id> consulta el estado hasta que termina y ofrece el archivo
+# resultante.
+#
+# Las tareas se registran con @tarea("nombre") junto a la ruta que las
+# encola. Reciben un Progreso y los parámetros (solo valores JSON).
+#
+# Mientras un worker tiene trabajos activos, un hilo actualiza su latido
+# cada TRABAJOS_LATIDO_S. En Render cada reinicio o despliegue cambia el
+# hostname, así que no se puede preguntar por el proceso: un trabajo
+# activo sin latido en TRABAJOS_LATIDO_VENCIDO_S se da por interrumpido.
+TRABAJOS_HILOS = int(os.getenv("TRABAJOS_HILOS", "2"))
+TRABAJOS_DIR = os.getenv("TRABAJOS_DIR", os.path.join(basedir, "instance", "trabajos"))
+TRABAJOS_RETENCION_DIAS = int(os.getenv("TRABAJOS_RETENCION_DIAS", "7"))
+TRABAJOS_LATIDO_S = int(os.getenv("TRABAJOS_LATIDO_S", "30"))
+TRABAJOS_LATIDO_VENCIDO_S = int(os.getenv("TRABAJOS_LATIDO_VENCIDO_S", "120"))
+
+# Mínimo entre escrituras de progreso en la base
+INTERVALO_PROGRESO_S = 0.5
+
+ESTADOS_ACTIVOS = ("pendiente", "ejecutando")
+
+logger = logging.getLogger("sanroque.trabajos")
+
+_TAREAS = {}
+_pool = None
+_pool_pid = None
+_lock = threading.Lock()
+_latidor = None
+_latidor_lock = threading.Lock()
+
+
+def tarea(nombre):
+    """Registra una función como tarea encolable."""
+    def registrar(funcion):
+        _TAREAS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+def _identidad():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _obtener_pool():
+    """Un pool por proceso (con preload de Gunicorn se crea después del fork)."""
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=TRABAJOS_HILOS, thread_name_prefix="trabajo")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _latir(app):
+    """Marca el latido de los trabajos activos de este proceso; termina cuando no queda ninguno."""
+    from models import Trabajo
+
+    global _latidor
+    identidad = _identidad()
+    while True:
+        time.sleep(TRABAJOS_LATIDO_S)
+        with _latidor_lock:
+            try:
+                with app.app_context(), db.engine.begin() as conn:
+                    activos = conn.execute(
+                        update(Trabajo)
+                        .where(Trabajo.trabajador == identidad, Trabajo.estado.in_(ESTADOS_ACTIVOS))
+                        .values(latido_en=datetime.utcnow())
+                    ).rowcount
+            except Exception as e:
+                logger.warning("trabajos: no se pudo registrar el latido: %s", e)
+                continue
+            if not activos:
+                _latidor = None
+                return
+
+
+def _asegurar_latido(app):
+    global _latidor
+    with _latidor_lock:
+        if _latidor is None or _latidor[0] != os.getpid():
+            hilo = threading.Thread(target=_latir, args=(app,), name="trabajos-latido", daemon=True)
+            hilo.start()
+            _latidor = (os.getpid(), hilo)
+
+
+def _actualizar(trabajo_id, **valores):
+    """Escribe en su propia transacción: no depende de la sesión de la tarea."""
+    from models import Trabajo
+
+    with db.engine.begin() as conn:
+        conn.execute(update(Trabajo).where(Trabajo.id == trabajo_id).values(**valores))
+
+
+# --------------------------------------------------
+# PROGRESO
+# --------------------------------------------------
+class Progreso:
+    """Lo que recibe cada tarea para informar avance y dejar su archivo."""
+
+    def __init__(self, trabajo_id):
+        self.trabajo_id = trabajo_id
+        self.resultado_ruta = None
+        self.resultado_nombre = None
+        self._ultimo = 0.0
+
+    def avanzar(self, porcentaje, mensaje=None):
+        ahora = time.monotonic()
+        if ahora - self._ultimo < INTERVALO_PROGRESO_S and porcentaje < 100:
+            return
+        self._ultimo = ahora
+        valores = {"progreso": max(0, min(100, int(porcentaje))), "latido_en": datetime.utcnow()}
+        if mensaje is not None:
+            valores["mensaje"] = mensaje[:255]
+        _actualizar(self.trabajo_id, **valores)
+
+    def archivo_resultado(self, nombre):
+        """Ruta donde la tarea debe escribir su resultado descargable."""
+        os.makedirs(TRABAJOS_DIR, exist_ok=True)
+        self.resultado_nombre = nombre
+        self.resultado_ruta = os.path.join(TRABAJOS_DIR, f"{self.trabajo_id}_{nombre}")
+        return self.resultado_ruta
+
+
+def ruta_entrada(nombre):
+    """Ruta para guardar un archivo subido que procesará una tarea."""
+    carpeta = os.path.join(TRABAJOS_DIR, "entradas")
+    os.makedirs(carpeta, exist_ok=True)
+    return os.path.join(carpeta, f"{time.time_ns()}_{os.path.basename(nombre)}")
+
+
+# --------------------------------------------------
+# EJECUCIÓN
+# --------------------------------------------------
+def _ejecutar(app, trabajo_id, tipo, parametros):
+    with app.app_context():
+        progreso = Progreso(trabajo_id)
+        _actualizar(trabajo_id, estado="ejecutando", iniciado_en=datetime.utcnow(), latido_en=datetime.utcnow())
+        inicio = time.perf_counter()
+        try:
+            mensaje = _TAREAS[tipo](progreso, **parametros)
+            _actualizar(
+                trabajo_id,
+                estado="terminado",
+                progreso=100,
+                mensaje=(mensaje or "Listo")[:255],
+                resultado_ruta=progreso.resultado_ruta,
+                resultado_nombre=progreso.resultado_nombre,
+                terminado_en=datetime.utcnow(),
+            )
+            logger.info("Trabajo %s (%s) terminado en %.1f s", trabajo_id, tipo, time.perf_counter() - inicio)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Trabajo %s (%s) falló", trabajo_id, tipo)
+            _actualizar(trabajo_id, estado="error", error=str(e), terminado_en=datetime.utcnow())
+        finally:
+            db.session.remove()
+
+
+def encolar(tipo, **parametros):
+    """Crea el trabajo, lo envía al pool y lo retorna (estado 'pendiente')."""
+    from flask_login import current_user
+    from models import Trabajo
+
+    if tipo not in _TAREAS:
+        raise KeyError(f"Tarea desconocida: {tipo}")
+
+    limpiar_resultados_viejos()
+    trabajo = Trabajo(
+        tipo=tipo,
+        estado="pendiente",
+        progreso=0,
+        parametros=json.dumps(parametros),
+        trabajador=_identidad(),
+        usuario_id=current_user.id if current_user and current_user.is_authenticated else None,
+    )
+    db.session.add(trabajo)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _obtener_pool().submit(_ejecutar, app, trabajo.id, tipo, parametros)
+    _asegurar_latido(app)
+    return trabajo
+
+
+def responder_encolado(trabajo, mensaje=None):
+    """JSON 202 para clientes de API; redirección a la página del trabajo para el navegador."""
+    if request.is_json or request.accept_mimetypes.best == "application/json":
+        return jsonify({
+            "trabajo_id": trabajo.id,
+            "estado_url": url_for("trabajos.estado", trabajo_id=trabajo.id),
+        }), 202
+    if mensaje:
+        from flask import flash
+        flash(mensaje, "info")
+    return redirect(url_for("trabajos.ver", trabajo_id=trabajo.id))
+
+
+# --------------------------------------------------
+# CONSULTA
+# --------------------------------------------------
+def _huerfano(trabajo):
+    """True si el worker que tenía el trabajo ya no existe."""
+    host, _, pid = (trabajo.trabajador or "").rpartition(":")
+    if host == socket.gethostname() and pid.isdigit():
+        # Mismo servidor: se puede preguntar directamente por el proceso
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+    latido = trabajo.latido_en or trabajo.iniciado_en or trabajo.creado_en
+    return latido is not None and (datetime.utcnow() - latido).total_seconds() > TRABAJOS_LATIDO_VENCIDO_S
+
+
+def marcar_si_huerfano(trabajo):
+    """Un trabajo activo cuyo worker ya no existe (reinicio, despliegue, timeout) queda en error."""
+    if trabajo.estado in ESTADOS_ACTIVOS and _huerfano(trabajo):
+        trabajo.estado = "error"
+        trabajo.error = "Interrumpido: el proceso que lo ejecutaba se reinició."
+        trabajo.terminado_en = datetime.utcnow()
+        db.session.commit()
+    return trabajo
+
+
+def estado_trabajo(trabajo):
+    return {
+        "id": trabajo.id,
+        "tipo": trabajo.tipo,
+        "estado": trabajo.estado,
+        "progreso": trabajo.progreso,
+        "mensaje": trabajo.mensaje,
+        "error": trabajo.error,
+        "descargable": bool(trabajo.resultado_ruta and os.path.exists(trabajo.resultado_ruta)),
+        "creado_en": trabajo.creado_en.isoformat() if trabajo.creado_en else None,
+        "terminado_en": trabajo.terminado_en.isoformat() if trabajo.terminado_en else None,
+    }
+
+
+def limpiar_resultados_viejos():
+    """Borra archivos de resultados y entradas con más de TRABAJOS_RETENCION_DIAS."""
+    limite = time.time() - TRABAJOS_RETENCION_DIAS * 86400
+    for carpeta in (TRABAJOS_DIR, os.path.join(TRABAJOS_DIR, "entradas")):
+        if not os.path.isdir(carpeta):
+            continue
+        for nombre in os.listdir(carpeta):
+            ruta = os.path.join(carpeta, nombre)
+            try:
+                if os.path.isfile(ruta) and os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+            except OSError:
+                pass
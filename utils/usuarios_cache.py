@@ -0,0 +1,80 @@
+import os
+
+from flask import session
+
+from database import db
+from utils.cache import cache_obtener, cache_guardar, invalidar_etiqueta, invalidar_al_confirmar
+from utils.metricas import registrar_cache
+
+# ======================================================
+# CACHE DE USUARIOS (FLASK-LOGIN)
+# ======================================================
+# Se guarda una copia desconectada del usuario en el cache compartido
+# (utils/cache.py), así las peticiones normales (incluidas las AJAX del
+# POS) no consultan la tabla usuarios. Cualquier cambio confirmado en un
+# Usuario invalida la etiqueta "usuarios" en todos los workers.
+USUARIO_CACHE_TTL = int(os.getenv("USUARIO_CACHE_TTL", "300"))
+
+# Clave en la sesión con la versión del usuario al iniciar sesión
+SESION_VERSION_KEY = "usuario_version"
+
+
+
+def _leer_usuario(usuario_id):
+    from models import Usuario
+
+    usuario = db.session.get(Usuario, usuario_id)
+    if usuario is not None:
+        # Copia desconectada: sus atributos siguen disponibles después del commit
+        db.session.expunge(usuario)
+    return usuario
+
+
+def obtener_usuario(usuario_id):
+    """Usuario desde el cache o desde la base de datos si venció o cambió."""
+    clave = f"usuario:{usuario_id}"
+
+    usuario = cache_obtener(clave)
+    registrar_cache("usuarios", usuario is not None)
+    if usuario is not None:
+        return usuario
+
+    usuario = _leer_usuario(usuario_id)
+    if usuario is not None:
+        cache_guardar(clave, usuario, USUARIO_CACHE_TTL, etiquetas=("usuarios",))
+    return usuario
+
+
+def invalidar_usuario(usuario_id):
+    """Invalida los usuarios cacheados en todos los workers."""
+    invalidar_etiqueta("usuarios")
+
+
+def cargar_usuario_sesion(usuario_id):
+    """
+    user_loader de Flask-Login. Si la versión del usuario cambió desde que
+    inició sesión (edición, eliminación o cambio de clave) la sesión deja de ser válida.
+    """
+    usuario = obtener_usuario(int(usuario_id))
+    if usuario is None:
+        return None
+
+    version_sesion = session.get(SESION_VERSION_KEY)
+    if version_sesion is None:
+        # Sesiones abiertas antes de existir la versión: se adoptan
+        session[SESION_VERSION_KEY] = usuario.version_sesion
+    elif version_sesion != usuario.version_sesion:
+        return None
+
+    return usuario
+
+
+def registrar_version_sesion(usuario):
+    """Guarda en la sesión la versión vigente del usuario (al hacer login)."""
+    session[SESION_VERSION_KEY] = usuario.version_sesion
+
+
+def marcar_usuario_modificado(usuario):
+    """Sube la versión del usuario para invalidar sus sesiones y su cache."""
+    usuario.version_sesion = (usuario.version_sesion or 0) + 1
+    invalidar_al_confirmar("usuarios")